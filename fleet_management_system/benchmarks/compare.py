@@ -0,0 +1,65 @@
+"""Compare two benchmark result files written by benchmarks.run.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 if any metric got worse by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+HIGHER_IS_BETTER = ("plans_per_s", "requests_per_s", "ticks_per_s", "robot_ticks_per_s", "tasks_completed")
+LOWER_IS_BETTER = ("p50_us", "p99_us", "plan_p50_us", "plan_p99_us", "load_s", "compile_s", "peak_rss_mb")
+
+def load_results(path: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    with open(path) as f:
+        data = json.load(f)
+    return data.get("environment", {}), {result["name"]: result["metrics"] for result in data["results"]}
+
+def compare(baseline: Dict[str, Dict[str, Any]], candidate: Dict[str, Dict[str, Any]],
+            threshold: float) -> List[Tuple[str, str, float, float, float, bool]]:
+    """(case, metric, before, after, change %, regressed) for every metric both files have"""
+    rows = []
+    for name in sorted(baseline.keys() & candidate.keys()):
+        before_metrics, after_metrics = baseline[name], candidate[name]
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            before, after = before_metrics.get(metric), after_metrics.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100.0
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            rows.append((name, metric, before, after, change, worse > threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+    parser.add_argument("--all", action="store_true", help="Show unchanged metrics too")
+    args = parser.parse_args()
+
+    baseline_env, baseline = load_results(args.baseline)
+    candidate_env, candidate = load_results(args.candidate)
+    print(f"baseline  {baseline_env.get('commit', '?')[:12]}  {baseline_env.get('timestamp', '')}")
+    print(f"candidate {candidate_env.get('commit', '?')[:12]}  {candidate_env.get('timestamp', '')}")
+    if baseline_env.get("machine") != candidate_env.get("machine") or \
+            baseline_env.get("cpu_count") != candidate_env.get("cpu_count"):
+        print("Warning: results were measured on different machines")
+
+    rows = compare(baseline, candidate, args.threshold)
+    regressions = 0
+    for name, metric, before, after, change, regressed in rows:
+        regressions += regressed
+        if regressed or args.all or abs(change) > args.threshold:
+            flag = "REGRESSION" if regressed else ""
+            print(f"{name:45} {metric:18} {before:>14.3f} {after:>14.3f} {change:+8.1f}%  {flag}")
+    missing = sorted(baseline.keys() - candidate.keys())
+    if missing:
+        print(f"Not in candidate: {', '.join(missing)}")
+    print(f"{regressions} regression(s) over {args.threshold:g}% in {len(rows)} metrics")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
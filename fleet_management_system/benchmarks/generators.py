@@ -0,0 +1,86 @@
+import json
+import math
+import os
+import random
+from typing import Any, Callable, Dict, List, Tuple
+from src.models.spatial_index import SpatialGrid
+
+GraphDocument = Dict[str, Any]
+
+def _document(name: str, points: List[Tuple[float, float]], lanes: List[Tuple[int, int]]) -> GraphDocument:
+    """A navigation graph file with one level; lanes are written once, as the planner reads them undirected"""
+    return {
+        "building_name": name,
+        "levels": {
+            "L1": {
+                "vertices": [[x, y, {"name": f"v{i}"}] for i, (x, y) in enumerate(points)],
+                "lanes": [[a, b, {"speed_limit": 0}] for a, b in lanes],
+            }
+        },
+    }
+
+def grid_graph(n: int, seed: int = 0) -> GraphDocument:
+    """A square grid of about n vertices, each joined to its four neighbours"""
+    side = max(2, round(math.sqrt(n)))
+    points = [(float(col), float(row)) for row in range(side) for col in range(side)]
+    lanes = []
+    for row in range(side):
+        for col in range(side):
+            v = row * side + col
+            if col + 1 < side:
+                lanes.append((v, v + 1))
+            if row + 1 < side:
+                lanes.append((v, v + side))
+    return _document(f"grid-{side}x{side}", points, lanes)
+
+def corridor_graph(n: int, seed: int = 0, cross_every: int = 10) -> GraphDocument:
+    """
+    A warehouse floor of about n vertices: long parallel aisles that are
+    only joined by cross corridors every cross_every columns, so most paths
+    have to detour to a cross corridor.
+    """
+    side = max(2, round(math.sqrt(n)))
+    points = [(float(col), float(row)) for row in range(side) for col in range(side)]
+    lanes = []
+    for row in range(side):
+        for col in range(side):
+            v = row * side + col
+            if col + 1 < side:
+                lanes.append((v, v + 1))
+            if row + 1 < side and (col % cross_every == 0 or col == side - 1):
+                lanes.append((v, v + side))
+    return _document(f"corridors-{side}x{side}", points, lanes)
+
+def random_geometric_graph(n: int, seed: int = 0, degree: float = 6.0) -> GraphDocument:
+    """
+    n vertices placed uniformly at random, each joined to every vertex within
+    the radius that gives about the requested average degree
+    """
+    rng = random.Random(seed)
+    side = math.sqrt(n)
+    points = [(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(n)]
+    radius = math.sqrt(degree / math.pi)
+    grid = SpatialGrid.from_points(((i, x, y) for i, (x, y) in enumerate(points)), cell_size=radius)
+    lanes = [
+        (i, j)
+        for i, (x, y) in enumerate(points)
+        for j in grid.query_radius(x, y, radius) if j > i
+    ]
+    return _document(f"rgg-{n}", points, lanes)
+
+GENERATORS: Dict[str, Callable[..., GraphDocument]] = {
+    "grid": grid_graph,
+    "corridors": corridor_graph,
+    "rgg": random_geometric_graph,
+}
+
+def generated_graph_file(kind: str, n: int, data_dir: str, seed: int = 0) -> str:
+    """Path of a generated graph file, writing it on first use"""
+    path = os.path.join(data_dir, f"{kind}-{n}-{seed}.json")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        document = GENERATORS[kind](n, seed)
+        with open(path + ".tmp", "w") as f:
+            json.dump(document, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+    return path
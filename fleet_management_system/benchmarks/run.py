@@ -0,0 +1,190 @@
+"""Benchmark harness for pathfinding, lane traffic, fleet ticks and task dispatch.
+
+Run from the fleet_management_system directory:
+
+    python -m benchmarks.run --preset quick
+    python -m benchmarks.run --suite pathfinding --filter grid --output before.json
+    python -m benchmarks.compare before.json after.json
+
+Synthetic graphs are generated once into benchmarks/.data. Every case runs
+in a fresh worker process, so its peak RSS is its own and one case's caches
+cannot warm up the next one. Results are written as JSON together with the
+commit, interpreter and machine they were measured on.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from typing import Any, Dict, List, Optional
+import numpy as np
+from benchmarks.generators import GENERATORS, generated_graph_file
+from benchmarks.suites import SUITES, Metrics
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+DATA_DIR = os.path.join(BENCHMARK_DIR, ".data")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "quick": {
+        "graph_sizes": [100, 1000],
+        "queries": 100,
+        "traffic_robots": [10, 100],
+        "traffic_operations": 20000,
+        "fleet_sizes": [1, 10, 100],
+        "ticks": 100,
+        "dispatch_robots": [10, 100],
+        "dispatch_ticks": 1000,
+    },
+    "default": {
+        "graph_sizes": [100, 1000, 10000, 100000],
+        "queries": 200,
+        "traffic_robots": [10, 100, 1000],
+        "traffic_operations": 100000,
+        "fleet_sizes": [1, 10, 100, 1000],
+        "ticks": 200,
+        "dispatch_robots": [10, 100, 1000],
+        "dispatch_ticks": 2000,
+    },
+    "full": {
+        "graph_sizes": [100, 1000, 10000, 100000, 1000000],
+        "queries": 200,
+        "traffic_robots": [10, 100, 1000, 10000],
+        "traffic_operations": 200000,
+        "fleet_sizes": [1, 10, 100, 1000, 10000],
+        "ticks": 200,
+        "dispatch_robots": [10, 100, 1000],
+        "dispatch_ticks": 4000,
+    },
+}
+
+def build_cases(preset: Dict[str, Any], seed: int) -> List[Dict[str, Any]]:
+    """Every case of a preset as {name, suite, params}; graph files are generated lazily by the worker"""
+    cases = []
+    shipped = sorted(glob(os.path.join(PROJECT_DIR, "data", "nav_graph_*.json")))
+    for path in shipped:
+        name = os.path.splitext(os.path.basename(path))[0]
+        cases.append({"name": f"pathfinding/{name}", "suite": "pathfinding",
+                      "params": {"graph_file": os.path.relpath(path, PROJECT_DIR), "queries": preset["queries"],
+                                 "seed": seed}})
+    for kind in GENERATORS:
+        for n in preset["graph_sizes"]:
+            cases.append({"name": f"pathfinding/{kind}-{n}", "suite": "pathfinding",
+                          "graph": {"kind": kind, "n": n},
+                          "params": {"queries": preset["queries"], "seed": seed}})
+    for robots in preset["traffic_robots"]:
+        lanes = max(100, robots * 10)
+        cases.append({"name": f"traffic/robots-{robots}", "suite": "traffic",
+                      "params": {"robots": robots, "lanes": lanes,
+                                 "operations": preset["traffic_operations"], "seed": seed}})
+    for robots in preset["fleet_sizes"]:
+        # Keep the floor at about 25 vertices per robot so traffic density is comparable
+        n = max(1000, robots * 25)
+        cases.append({"name": f"fleet/grid-{n}/robots-{robots}", "suite": "fleet",
+                      "graph": {"kind": "grid", "n": n},
+                      "params": {"robots": robots, "ticks": preset["ticks"], "seed": seed}})
+    for robots in preset["dispatch_robots"]:
+        n = max(1000, robots * 25)
+        cases.append({"name": f"dispatch/grid-{n}/robots-{robots}", "suite": "dispatch",
+                      "graph": {"kind": "grid", "n": n},
+                      "params": {"robots": robots, "ticks": preset["dispatch_ticks"], "seed": seed}})
+    return cases
+
+def run_case(case: Dict[str, Any], data_dir: str) -> Metrics:
+    """Run one case in the current process"""
+    params = dict(case["params"])
+    graph = case.get("graph")
+    if "graph_file" in params:
+        params["graph_file"] = os.path.join(PROJECT_DIR, params["graph_file"])
+    if graph is not None:
+        params["graph_file"] = generated_graph_file(graph["kind"], graph["n"], data_dir, params.get("seed", 0))
+    started = time.perf_counter()
+    metrics = SUITES[case["suite"]](**params)
+    metrics["wall_s"] = round(time.perf_counter() - started, 4)
+    if resource is not None:
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        metrics["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1)
+    return metrics
+
+def environment() -> Dict[str, Any]:
+    """What the numbers were measured on, so result files can be compared across commits"""
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=PROJECT_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark pathfinding, lane traffic, fleet ticks and task dispatch")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="default", help="Sizes to run")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="Only run this suite (may be given more than once)")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for graphs, queries and fleets")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Where generated graphs are kept")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Run cases in this process (faster, but peak memory is cumulative)")
+    parser.add_argument("--list", action="store_true", help="List the selected cases and exit")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    cases = [
+        case for case in build_cases(PRESETS[args.preset], args.seed)
+        if (not args.suite or case["suite"] in args.suite) and (not args.filter or args.filter in case["name"])
+    ]
+    if args.list:
+        for case in cases:
+            print(case["name"])
+        return
+
+    env = environment()
+    results = []
+    for case in cases:
+        print(f"{case['name']} ...", end=" ", flush=True)
+        if args.in_process:
+            metrics = run_case(case, args.data_dir)
+        else:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                metrics = executor.submit(run_case, case, args.data_dir).result()
+        headline = {key: metrics[key] for key in ("plans_per_s", "requests_per_s", "ticks_per_s", "tasks_completed",
+                                                  "p50_us", "p99_us", "peak_rss_mb") if metrics.get(key) is not None}
+        print(", ".join(f"{key}={value}" for key, value in headline.items()))
+        results.append({"name": case["name"], "suite": case["suite"], "params": case["params"],
+                        "graph": case.get("graph"), "metrics": metrics})
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{(env['commit'] or 'unknown')[:8]}.json")
+    with open(output, "w") as f:
+        json.dump({"environment": env, "preset": args.preset, "seed": args.seed, "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {output}")
+
+if __name__ == "__main__":
+    main()
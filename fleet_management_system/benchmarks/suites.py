@@ -0,0 +1,198 @@
+import random
+import time
+from collections import deque
+from typing import Any, Dict, List
+import numpy as np
+from src.controllers.dispatcher import TaskDispatcher
+from src.controllers.simulator import Simulator
+from src.controllers.traffic_manager import TrafficManager
+from src.models.nav_graph import NavGraph
+
+Metrics = Dict[str, Any]
+
+def latency_stats(samples_ns: List[int]) -> Metrics:
+    """p50, p99 and mean of per-operation latencies, in microseconds"""
+    if not samples_ns:
+        return {"p50_us": None, "p99_us": None, "mean_us": None}
+    samples = np.asarray(samples_ns, dtype=np.float64) / 1000.0
+    p50, p99 = np.percentile(samples, [50, 99])
+    return {"p50_us": round(float(p50), 3), "p99_us": round(float(p99), 3), "mean_us": round(float(samples.mean()), 3)}
+
+def bench_pathfinding(graph_file: str, queries: int = 200, seed: int = 0, time_budget: float = 30.0) -> Metrics:
+    """find_path between random vertex pairs with the path cache off, so every query is a full A*"""
+    started = time.perf_counter()
+    nav_graph = NavGraph(graph_file, path_cache_size=0)
+    load_s = time.perf_counter() - started
+    level_name = nav_graph.get_level_names()[0]
+    started = time.perf_counter()
+    graph = nav_graph.get_compiled(level_name)
+    compile_s = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    n = graph.num_vertices
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]
+    latencies = []
+    expansions = 0
+    found = 0
+    deadline = time.perf_counter() + time_budget
+    for start_idx, end_idx in pairs:
+        t0 = time.perf_counter_ns()
+        _, path_indices = nav_graph.find_path(level_name, start_idx, end_idx)
+        latencies.append(time.perf_counter_ns() - t0)
+        expansions += nav_graph.last_expansions
+        found += bool(path_indices)
+        if time.perf_counter() > deadline:
+            break
+    total_s = sum(latencies) / 1e9
+    return {
+        "vertices": n,
+        "edges": len(graph.indices) // 2,
+        "load_s": round(load_s, 4),
+        "compile_s": round(compile_s, 4),
+        "queries": len(latencies),
+        "found": found,
+        "plans_per_s": round(len(latencies) / total_s, 2) if total_s else None,
+        "mean_expansions": round(expansions / len(latencies), 1) if latencies else None,
+        **latency_stats(latencies),
+    }
+
+def bench_traffic(robots: int = 100, lanes: int = 1000, operations: int = 100000, seed: int = 0) -> Metrics:
+    """
+    Random lane requests against TrafficManager: a granted robot keeps its
+    two most recent lanes, a refused one queues for the lane until its next
+    request. Latency covers the request and the queueing or release it causes.
+    """
+    rng = random.Random(seed)
+    held: Dict[int, deque] = {robot_id: deque() for robot_id in range(robots)}
+    traffic_manager = TrafficManager(on_lane_granted=lambda robot_id, lane: held[robot_id].append(lane))
+    lane_list = [(i, i + 1) for i in range(lanes)]
+    ops = [(rng.randrange(robots), lane_list[rng.randrange(lanes)]) for _ in range(operations)]
+    latencies = []
+    granted = 0
+    started = time.perf_counter()
+    for robot_id, lane in ops:
+        t0 = time.perf_counter_ns()
+        traffic_manager.cancel_wait(robot_id)
+        if traffic_manager.request_lane(robot_id, lane):
+            granted += 1
+            robot_lanes = held[robot_id]
+            robot_lanes.append(lane)
+            while len(robot_lanes) > 2:
+                traffic_manager.release_lane(robot_lanes.popleft(), robot_id)
+        else:
+            traffic_manager.add_waiting_robot(robot_id, lane)
+        latencies.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+    return {
+        "operations": operations,
+        "granted": granted,
+        "deadlocks_detected": traffic_manager.deadlocks_detected,
+        "requests_per_s": round(operations / elapsed, 2),
+        **latency_stats(latencies),
+    }
+
+def _nearby_vertex(graph, start: int, hops: int, rng: random.Random) -> int:
+    """End of a random walk, so destinations stay local and setup does not dominate large fleets"""
+    vertex = start
+    for _ in range(hops):
+        degree = graph._indptr[vertex + 1] - graph._indptr[vertex]
+        if not degree:
+            break
+        vertex = graph._indices[graph._indptr[vertex] + rng.randrange(degree)]
+    return vertex
+
+def bench_fleet(graph_file: str, robots: int = 100, ticks: int = 200, seed: int = 0, hops: int = 30) -> Metrics:
+    """
+    Simulator ticks with a busy fleet: robots start on random vertices and
+    idle ones are sent to a vertex a random walk of hops lanes away. Tick
+    latency is Simulator.step() alone; re-planning is timed separately.
+    """
+    rng = random.Random(seed)
+    sim = Simulator(graph_file)
+    level_name = sim.current_level
+    graph = sim.nav_graph.get_compiled(level_name)
+    started = time.perf_counter()
+    for _ in range(robots):
+        sim.spawn_robot(rng.randrange(graph.num_vertices))
+    setup_s = time.perf_counter() - started
+
+    tick_latencies = []
+    plan_latencies = []
+    for _ in range(ticks):
+        for robot in sim.robots.values():
+            if robot.status != "idle":
+                continue
+            start_idx = sim.find_closest_vertex(robot.position)
+            target = sim.nav_graph.get_vertex_by_index(level_name, _nearby_vertex(graph, start_idx, hops, rng))
+            t0 = time.perf_counter_ns()
+            sim.assign_destination(robot.id, (target[0], target[1]))
+            plan_latencies.append(time.perf_counter_ns() - t0)
+        t0 = time.perf_counter_ns()
+        sim.step()
+        tick_latencies.append(time.perf_counter_ns() - t0)
+    sim.close()
+
+    tick_s = sum(tick_latencies) / 1e9
+    plan_s = sum(plan_latencies) / 1e9
+    tick_stats = latency_stats(tick_latencies)
+    plan_stats = latency_stats(plan_latencies)
+    return {
+        "vertices": graph.num_vertices,
+        "robots": robots,
+        "setup_s": round(setup_s, 4),
+        "ticks": ticks,
+        "ticks_per_s": round(ticks / tick_s, 2) if tick_s else None,
+        "robot_ticks_per_s": round(ticks * robots / tick_s, 2) if tick_s else None,
+        "plans": len(plan_latencies),
+        "plans_per_s": round(len(plan_latencies) / plan_s, 2) if plan_s else None,
+        "deadlocks_detected": sim.traffic_manager.deadlocks_detected,
+        **tick_stats,
+        **{f"plan_{key}": value for key, value in plan_stats.items()},
+    }
+
+def bench_dispatch(graph_file: str, robots: int = 100, ticks: int = 200, seed: int = 0, stations: int = 50,
+                   every: int = 10) -> Metrics:
+    """
+    TaskDispatcher on a fleet kept about as busy as it can be: a task
+    between two random stations arrives for every robot every 200 ticks.
+    Latency is one dispatch() round, including path planning; the number of
+    tasks completed measures the assignments' quality.
+    """
+    rng = random.Random(seed)
+    sim = Simulator(graph_file)
+    level_name = sim.current_level
+    n = sim.nav_graph.get_vertex_count(level_name)
+    for _ in range(robots):
+        sim.spawn_robot(rng.randrange(n))
+    station_vertices = [rng.randrange(n) for _ in range(stations)]
+    dispatcher = TaskDispatcher(sim)
+    arrivals = 0.0
+    latencies = []
+    for tick in range(ticks):
+        arrivals += robots / 200.0
+        while arrivals >= 1.0:
+            dispatcher.submit(rng.choice(station_vertices), rng.choice(station_vertices))
+            arrivals -= 1.0
+        if tick % every == 0:
+            t0 = time.perf_counter_ns()
+            dispatcher.dispatch()
+            latencies.append(time.perf_counter_ns() - t0)
+        sim.step()
+    sim.close()
+    stats = dispatcher.stats()
+    return {
+        "robots": robots,
+        "ticks": ticks,
+        "rounds": len(latencies),
+        "tasks_completed": stats["completed"],
+        "tasks_queued": stats["queued"],
+        "mean_wait_ticks": stats["mean_wait_ticks"],
+        **latency_stats(latencies),
+    }
+
+SUITES = {
+    "pathfinding": bench_pathfinding,
+    "traffic": bench_traffic,
+    "fleet": bench_fleet,
+    "dispatch": bench_dispatch,
+}
@@ -0,0 +1,158 @@
+from typing import Dict, Optional, Sequence, Set
+import numpy as np
+from src.models.charger_field import ChargerField
+from src.models.fleet_state import IDLE
+from src.utils.logger import log_robot_action
+
+class _Booking:
+    __slots__ = ("charger", "charging")
+
+    def __init__(self, charger: int):
+        self.charger = charger
+        self.charging = False
+
+class ChargerScheduler:
+    """Books charger slots for robots running low and sends them there.
+
+    Idle robots below low_battery that are not on a task wait for a slot,
+    lowest battery first. Each is booked into the nearest charger with a
+    free slot (a charger has ``charger_slots`` of them, default 1) and only
+    then driven there, so a dock never gets more robots than it can charge;
+    the rest go to a farther free dock that is still within their range, or
+    wait where they stand, instead of queueing at the same one. A robot arriving at its charger charges until
+    it reaches charged, then it is idle again and its slot is released.
+
+    Nearest-charger questions are answered from the level's ChargerField;
+    when the nearest charger is full, the free ones are compared using
+    their cached distance fields.
+    """
+
+    def __init__(self, simulator, low_battery: float = 0.25, charged: float = 0.95):
+        self.simulator = simulator
+        self.low_battery = low_battery
+        self.charged = charged
+        self.bookings: Dict[int, _Booking] = {}
+        self.waiting: Set[int] = set()
+        self._occupancy: Dict[int, int] = {}
+        self._slots: Dict[int, int] = {}
+        self._slots_field: Optional[ChargerField] = None
+        self.charges_completed = 0
+
+    @property
+    def field(self) -> ChargerField:
+        return self.simulator.nav_graph.get_charger_field(self.simulator.current_level)
+
+    def claims(self, robot_id: int) -> bool:
+        """True if the robot is waiting for, driving to or sitting at a charger"""
+        return robot_id in self.bookings or robot_id in self.waiting
+
+    def can_finish(self, robot_ids: Sequence[int], distances: np.ndarray, end_vertices: Sequence[int]) -> np.ndarray:
+        """
+        Whether each robot can drive distances more, ending at end_vertices,
+        and still reach a charger from there. distances has one row per
+        robot, either a single trip each or one column per candidate trip,
+        with end_vertices then giving each column's end.
+        """
+        robots = self.simulator.robots
+        ranges = np.array([robots[robot_id].range_left() for robot_id in robot_ids])
+        needed = distances + self.field.distance[np.asarray(end_vertices, dtype=np.int64)]
+        return needed <= ranges.reshape((-1,) + (1,) * (needed.ndim - 1))
+
+    def nearest_free_charger(self, vertex: int, reach: float = float('inf')) -> Optional[int]:
+        """The closest charger to vertex with a free slot, or None if there is none within reach"""
+        field = self.field
+        slots = self._get_slots(field)
+        nearest = int(field.nearest[vertex])
+        if nearest < 0 or field.distance[vertex] > reach:
+            return None
+        if self._occupancy.get(nearest, 0) < slots[nearest]:
+            return nearest
+        free = [charger for charger, count in slots.items() if self._occupancy.get(charger, 0) < count]
+        if not free:
+            return None
+        nav_graph, level_name = self.simulator.nav_graph, self.simulator.current_level
+        distances = [nav_graph.distance_field(level_name, charger)[vertex] for charger in free]
+        best = int(np.argmin(distances))
+        return free[best] if distances[best] <= reach else None
+
+    def _get_slots(self, field: ChargerField) -> Dict[int, int]:
+        if field is not self._slots_field:
+            self._slots = dict(zip(field.chargers.tolist(), field.slots.tolist()))
+            self._slots_field = field
+        return self._slots
+
+    def update(self):
+        """Move bookings along, then book slots for robots that need one"""
+        simulator = self.simulator
+        robots = simulator.robots
+        for robot_id, booking in list(self.bookings.items()):
+            robot = robots[robot_id]
+            status = robot.status
+            if booking.charging:
+                if status != "charging":
+                    # Sent somewhere else while charging
+                    self._release(robot_id)
+                elif robot.battery >= self.charged:
+                    simulator.fleet_manager.set_status(robot_id, "idle")
+                    self._release(robot_id)
+                    self.charges_completed += 1
+                    log_robot_action(robot_id, "Charged", "to %.0f%%", robot.battery * 100)
+            elif status in ("idle", "error"):
+                if status == "idle" and simulator.find_closest_vertex(robot.position) == booking.charger:
+                    self._start_charging(robot_id, booking)
+                else:
+                    self._release(robot_id)
+
+        state = simulator.fleet_manager.fleet_state
+        n = state.size
+        low = np.flatnonzero((state.status[:n] == IDLE) & (state.battery[:n] < self.low_battery))
+        dispatcher = simulator.dispatcher
+        for robot_id in state.ids[low].tolist():
+            if robot_id not in self.bookings and (dispatcher is None or dispatcher.task_of(robot_id) is None):
+                self.waiting.add(robot_id)
+        if self.waiting:
+            self._book()
+
+    def _book(self):
+        simulator = self.simulator
+        robots = simulator.robots
+        for robot_id in sorted(self.waiting, key=lambda robot_id: robots[robot_id].battery):
+            robot = robots[robot_id]
+            if robot.status != "idle":
+                self.waiting.discard(robot_id)
+                continue
+            vertex = simulator.find_closest_vertex(robot.position)
+            # A robot that cannot make it to a free charger waits for one in range to free up
+            charger = self.nearest_free_charger(vertex, robot.range_left())
+            if charger is None:
+                continue
+            self.waiting.discard(robot_id)
+            booking = _Booking(charger)
+            self.bookings[robot_id] = booking
+            self._occupancy[charger] = self._occupancy.get(charger, 0) + 1
+            if vertex == charger:
+                self._start_charging(robot_id, booking)
+                continue
+            target = simulator.nav_graph.get_vertex_by_index(simulator.current_level, charger)
+            if simulator.assign_destination(robot_id, (target[0], target[1])):
+                log_robot_action(robot_id, "Heading to charger", "%s at %.0f%%", charger, robot.battery * 100)
+            else:
+                self._release(robot_id)
+
+    def _start_charging(self, robot_id: int, booking: _Booking):
+        booking.charging = True
+        self.simulator.fleet_manager.set_status(robot_id, "charging")
+        log_robot_action(robot_id, "Charging", "at %s", booking.charger)
+
+    def _release(self, robot_id: int):
+        booking = self.bookings.pop(robot_id)
+        self._occupancy[booking.charger] -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "waiting": len(self.waiting),
+            "heading": sum(not booking.charging for booking in self.bookings.values()),
+            "charging": sum(booking.charging for booking in self.bookings.values()),
+            "charges_completed": self.charges_completed,
+            "chargers": len(self.field),
+        }
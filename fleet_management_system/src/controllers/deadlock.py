@@ -0,0 +1,75 @@
+from typing import Callable, Dict, List, Tuple
+from src.utils.logger import log_robot_action
+
+class DeadlockPolicy:
+    """Resolves a wait-for cycle reported by the TrafficManager.
+
+    resolve() gets the FleetManager and the robots in the cycle, in wait-for
+    order, and returns True if it broke the cycle.
+    """
+
+    name = "none"
+
+    def resolve(self, fleet_manager, cycle: List[int]) -> bool:
+        return False
+
+    @staticmethod
+    def youngest(fleet_manager, cycle: List[int]) -> int:
+        """The robot in the cycle that started waiting most recently"""
+        return max(cycle, key=lambda robot_id: (fleet_manager.robots[robot_id].waiting_since or 0.0, robot_id))
+
+class BackOffPolicy(DeadlockPolicy):
+    """
+    The youngest robot gives up the lanes it holds and re-joins the back of
+    its queue, still waiting; the robot behind it in the cycle gets its lane.
+    """
+
+    name = "back_off"
+
+    def resolve(self, fleet_manager, cycle: List[int]) -> bool:
+        victim = self.youngest(fleet_manager, cycle)
+        traffic_manager = fleet_manager.traffic_manager
+        lane = traffic_manager.waiting_robots.get(victim)
+        if not traffic_manager.back_off(victim):
+            return False
+        log_robot_action(victim, "Backing off", "to break deadlock on lane %s", lane)
+        return True
+
+class PreemptPolicy(DeadlockPolicy):
+    """The youngest robot takes the lane it waits for away from its holder"""
+
+    name = "preempt"
+
+    def resolve(self, fleet_manager, cycle: List[int]) -> bool:
+        victim = self.youngest(fleet_manager, cycle)
+        traffic_manager = fleet_manager.traffic_manager
+        lane = traffic_manager.waiting_robots.get(victim)
+        if lane is None:
+            return False
+        traffic_manager.preempt_lane(lane, victim)
+        return True
+
+class ReplanYoungestPolicy(DeadlockPolicy):
+    """
+    The youngest robot is re-routed around the lane it waits for, through the
+    replan(robot_id, blocked_lane) callback. If no detour exists it backs off.
+    """
+
+    name = "replan_youngest"
+
+    def __init__(self, replan: Callable[[int, Tuple[int, int]], bool]):
+        self.replan = replan
+
+    def resolve(self, fleet_manager, cycle: List[int]) -> bool:
+        victim = self.youngest(fleet_manager, cycle)
+        lane = fleet_manager.traffic_manager.waiting_robots.get(victim)
+        if lane is not None and self.replan(victim, lane):
+            log_robot_action(victim, "Re-planned", "around lane %s to break deadlock", lane)
+            return True
+        return BackOffPolicy().resolve(fleet_manager, cycle)
+
+DEADLOCK_POLICIES: Dict[str, type] = {
+    BackOffPolicy.name: BackOffPolicy,
+    PreemptPolicy.name: PreemptPolicy,
+    ReplanYoungestPolicy.name: ReplanYoungestPolicy,
+}
@@ -0,0 +1,208 @@
+from collections import OrderedDict
+from concurrent.futures import wait
+from typing import Any, Dict, Optional
+import numpy as np
+from src.models.assignment import solve_assignment
+from src.models.fleet_state import ERROR, IDLE
+from src.utils.logger import log_system_event
+
+QUEUED = "queued"
+TO_PICKUP = "to_pickup"
+TO_DROPOFF = "to_dropoff"
+DONE = "done"
+FAILED = "failed"
+
+class Task:
+    """A pickup and drop between two vertices of the simulated level"""
+
+    __slots__ = ("id", "pickup", "dropoff", "created_tick", "assigned_tick", "robot_id", "stage", "attempts")
+
+    def __init__(self, task_id: int, pickup: int, dropoff: int, created_tick: int):
+        self.id = task_id
+        self.pickup = pickup
+        self.dropoff = dropoff
+        self.created_tick = created_tick
+        self.assigned_tick: Optional[int] = None
+        self.robot_id: Optional[int] = None
+        self.stage = QUEUED
+        self.attempts = 0
+
+    def __repr__(self) -> str:
+        return f"Task({self.id}, {self.pickup}->{self.dropoff}, {self.stage}, robot={self.robot_id})"
+
+class TaskDispatcher:
+    """Hands queued pickup/drop tasks to idle robots in optimal batches.
+
+    Each dispatch() round takes the robots that are idle and not on a task,
+    and the oldest max_batch queued tasks, and solves the assignment that
+    minimises the total distance from robots to pickups with the Hungarian
+    method. The cost matrix is gathered from the level's distance field of
+    each pickup vertex, which NavGraph caches, so a round only runs Dijkstra
+    for pickups it has not seen before. Rounds are incremental: robots keep
+    the tasks they have, and the next round only matches the robots that
+    became idle since against what is still queued.
+
+    A robot arriving at a pickup is sent on to the drop-off; one that stops
+    anywhere else (no path, re-routed by hand) or breaks down gives its task
+    back to the queue, up to max_attempts times before the task fails. Paths for a
+    round are planned as one batch through Simulator.assign_destinations.
+    """
+
+    def __init__(self, simulator, max_batch: int = 256, max_attempts: int = 3):
+        self.simulator = simulator
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        # Queued and active tasks; finished ones are only kept by whoever submitted them
+        self.tasks: Dict[int, Task] = {}
+        self.next_task_id = 1
+        self._queued: "OrderedDict[int, Task]" = OrderedDict()
+        self._active: Dict[int, Task] = {}
+        self.completed = 0
+        self.failed = 0
+        self.rounds = 0
+        self._wait_ticks = 0
+
+    def submit(self, pickup: int, dropoff: int) -> Task:
+        """Queue a task between two vertex indices of the simulated level"""
+        count = self.simulator.nav_graph.get_vertex_count(self.simulator.current_level)
+        for vertex in (pickup, dropoff):
+            if not 0 <= vertex < count:
+                raise ValueError(f"Vertex {vertex} is not on level {self.simulator.current_level}")
+        task = Task(self.next_task_id, pickup, dropoff, self.simulator.fleet_manager.tick)
+        self.next_task_id += 1
+        self.tasks[task.id] = task
+        self._queued[task.id] = task
+        return task
+
+    def cancel(self, task_id: int) -> bool:
+        """Drop a task that no robot has started on yet"""
+        task = self._queued.pop(task_id, None)
+        if task is None:
+            return False
+        del self.tasks[task_id]
+        return True
+
+    def task_of(self, robot_id: int) -> Optional[Task]:
+        return self._active.get(robot_id)
+
+    def dispatch(self) -> int:
+        """Move robots on their tasks along and match idle robots to queued tasks; returns how many were matched"""
+        simulator = self.simulator
+        state = simulator.fleet_manager.fleet_state
+        chargers = simulator.chargers
+        ids, status = state.ids[:state.size], state.status[:state.size]
+        if self._active:
+            # A robot that broke down (e.g. ran out of battery) will not finish its task
+            for robot_id in ids[status == ERROR].tolist():
+                task = self._active.get(robot_id)
+                if task is not None:
+                    self._requeue(task)
+        destinations: Dict[int, int] = {}
+        idle_ids = []
+        for robot_id in ids[status == IDLE].tolist():
+            task = self._active.get(robot_id)
+            if task is not None and self._advance(task, destinations):
+                continue
+            if chargers is None or not chargers.claims(robot_id):
+                idle_ids.append(robot_id)
+        matched = 0
+        if idle_ids and self._queued:
+            tasks = [task for _, task in zip(range(self.max_batch), self._queued.values())]
+            robot_vertices = np.array([simulator.find_closest_vertex(simulator.robots[robot_id].position)
+                                       for robot_id in idle_ids])
+            level_name = simulator.current_level
+            nav_graph = simulator.nav_graph
+            cost = np.column_stack([nav_graph.distance_field(level_name, task.pickup)[robot_vertices] for task in tasks])
+            if chargers is not None:
+                # Rule out tasks that would leave a robot unable to reach a charger after the drop-off
+                carry = np.array([nav_graph.distance_field(level_name, task.pickup)[task.dropoff] for task in tasks])
+                feasible = chargers.can_finish(idle_ids, cost + carry, [task.dropoff for task in tasks])
+                cost = np.where(feasible, cost, np.inf)
+            rows, cols = solve_assignment(cost)
+            tick = simulator.fleet_manager.tick
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                task = tasks[col]
+                robot_id = idle_ids[row]
+                del self._queued[task.id]
+                task.robot_id = robot_id
+                task.assigned_tick = tick
+                self._active[robot_id] = task
+                task.stage = TO_PICKUP
+                if robot_vertices[row] == task.pickup:
+                    task.stage = TO_DROPOFF
+                    if task.pickup == task.dropoff:
+                        self._finish(task)
+                        continue
+                destinations[robot_id] = task.pickup if task.stage == TO_PICKUP else task.dropoff
+            matched = len(rows)
+            self.rounds += 1
+            log_system_event("Tasks dispatched", "%d of %d queued tasks to %d idle robots, total distance %.1f",
+                             matched, len(self._queued) + matched, len(idle_ids), float(cost[rows, cols].sum()))
+        if destinations:
+            self._send(destinations)
+        return matched
+
+    def _advance(self, task: Task, destinations: Dict[int, int]) -> bool:
+        """
+        Deal with a robot on a task that has stopped, at its pickup, its
+        drop-off or somewhere else. Returns True if it goes on to the drop-off.
+        """
+        simulator = self.simulator
+        target = task.pickup if task.stage == TO_PICKUP else task.dropoff
+        if simulator.find_closest_vertex(simulator.robots[task.robot_id].position) != target:
+            self._requeue(task)
+        elif task.stage == TO_PICKUP and task.pickup != task.dropoff:
+            task.stage = TO_DROPOFF
+            destinations[task.robot_id] = task.dropoff
+            return True
+        else:
+            self._finish(task)
+        return False
+
+    def _send(self, destinations: Dict[int, int]):
+        simulator = self.simulator
+        level_name = simulator.current_level
+        points = {}
+        for robot_id, vertex_idx in destinations.items():
+            vertex = simulator.nav_graph.get_vertex_by_index(level_name, vertex_idx)
+            points[robot_id] = (vertex[0], vertex[1])
+        futures = simulator.assign_destinations(points)
+        # Hand the paths over now rather than next tick, so a robot without one is noticed at once
+        wait(list(futures.values()))
+        simulator.apply_planned_paths()
+        for robot_id in destinations:
+            robot = simulator.robots.get(robot_id)
+            if robot is None or robot.status == "idle":
+                self._requeue(self._active[robot_id])
+
+    def _finish(self, task: Task):
+        task.stage = DONE
+        del self._active[task.robot_id]
+        del self.tasks[task.id]
+        self.completed += 1
+        self._wait_ticks += task.assigned_tick - task.created_tick
+
+    def _requeue(self, task: Task):
+        self._active.pop(task.robot_id, None)
+        task.robot_id = None
+        task.attempts += 1
+        if task.attempts >= self.max_attempts:
+            task.stage = FAILED
+            del self.tasks[task.id]
+            self.failed += 1
+            log_system_event("Warning", "Task %s failed after %d attempts", task.id, task.attempts)
+            return
+        task.stage = QUEUED
+        self._queued[task.id] = task
+        # Retried tasks keep their place among the oldest
+        self._queued.move_to_end(task.id, last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queued),
+            "active": len(self._active),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rounds": self.rounds,
+            "mean_wait_ticks": self._wait_ticks / self.completed if self.completed else None,
+        }
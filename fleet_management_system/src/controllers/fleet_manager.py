@@ -1,50 +1,149 @@
 from src.utils.logger import log_robot_action, log_system_event
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+from src.models.fleet_state import FleetState, STATUS_CODES
 from src.models.robot import Robot
+from src.models.world_state import WorldSnapshot, WorldState
 from src.controllers.traffic_manager import TrafficManager
+from src.controllers.deadlock import DeadlockPolicy, BackOffPolicy
+from src.utils.event_journal import EventJournal, RESUME
 
 class FleetManager:
-    def __init__(self):
+    def __init__(self, deadlock_policy: Optional[DeadlockPolicy] = None, journal: Optional[EventJournal] = None,
+                 dt: float = 0.05):
         self.robots: Dict[int, Robot] = {}
         self.next_robot_id = 1
-        self.traffic_manager = TrafficManager()
+        self.tick = 0
+        self.fleet_state = FleetState(dt=dt)
+        self.deadlock_policy = deadlock_policy or BackOffPolicy()
+        self.traffic_manager = TrafficManager(on_lane_granted=self._resume_robot, on_deadlock=self._resolve_deadlock)
+        self.traffic_manager.journal = journal
+        self.journal = journal
+        self._updating = False
+        self.world = WorldState(self.fleet_state, self.robots, self.traffic_manager)
         log_system_event("FleetManager initialized", "With TrafficManager")
 
     def spawn_robot(self, position: Tuple[float, float]) -> Robot:
-        robot = Robot(self.next_robot_id, position)
+        robot = Robot(self.next_robot_id, position, self.fleet_state)
         self.robots[self.next_robot_id] = robot
         self.next_robot_id += 1
-        log_system_event("Robot spawned", f"ID: {robot.id} at {position}")
+        if self.journal is not None:
+            self.journal.tick = self.tick
+            self.journal.record_spawn(robot.id, position)
+        log_system_event("Robot spawned", "ID: %s at %s", robot.id, position)
         return robot
 
-    def assign_destination(self, robot_id: int, destination: Tuple[float, float], path_indices: List[int]):
+    def assign_destination(self, robot_id: int, destination: Tuple[float, float], path_indices: List[int],
+                           departure_ticks: Optional[List[int]] = None):
         if robot_id in self.robots:
-            self.robots[robot_id].set_destination(destination, path_indices)
-            log_system_event("Destination assigned", f"Robot {robot_id} to {destination} via {path_indices}")
+            robot = self.robots[robot_id]
+            # The robot is re-routed from a vertex, so whatever it held or queued for is stale
+            self.traffic_manager.release_robot(robot_id)
+            robot.set_destination(destination, path_indices, departure_ticks)
+            if self.journal is not None:
+                # Destinations set from inside a tick (re-planning) are reproduced on replay
+                self.journal.tick = self.tick
+                self.journal.record_destination(robot_id, destination, robot.path, path_indices,
+                                                departure_ticks, commanded=not self._updating)
+            log_system_event("Destination assigned", "Robot %s to %s via %s", robot_id, destination, tuple(path_indices))
+
+    def set_status(self, robot_id: int, status: str):
+        """Change a robot's status between ticks (e.g. to start or stop charging), recorded for replay"""
+        robot = self.robots[robot_id]
+        robot.status = status
+        if self.journal is not None:
+            self.journal.tick = self.tick
+            self.journal.record_status(robot_id, STATUS_CODES[status], robot.battery)
+
+    def set_battery_rates(self, drain_per_unit: float, charge_per_second: float):
+        """Battery drained per unit of distance driven and gained per simulated second of charging"""
+        self.fleet_state.drain_per_unit = drain_per_unit
+        self.fleet_state.charge_per_second = charge_per_second
+        if self.journal is not None:
+            self.journal.tick = self.tick
+            self.journal.record_battery_rates(drain_per_unit, charge_per_second)
 
     def update_robots(self):
         """Update all robot positions and handle traffic"""
-        # First pass: update all moving robots
-        for robot in self.robots.values():
-            if robot.status == "moving":
-                robot.update_position(self.traffic_manager)
-        
-        # Second pass: check waiting robots
-        for robot in self.robots.values():
-            if robot.status == "waiting":
-                # Check if their lane is now available
-                if robot.current_path_index < len(robot.path_indices) - 1:
-                    current_idx = robot.path_indices[robot.current_path_index]
-                    next_idx = robot.path_indices[robot.current_path_index + 1]
-                    lane = (current_idx, next_idx)
-                    
-                    # Check if lane is free
-                    lane_free = True
-                    for reserved_lane, reserved_robot in self.traffic_manager.reserved_lanes.items():
-                        if (reserved_lane == lane or reserved_lane == (lane[1], lane[0])) and reserved_robot != robot.id:
-                            lane_free = False
-                            break
-                    
-                    if lane_free:
-                        robot.status = "moving"
-                        log_robot_action(robot.id, "Resuming movement", f"on lane {lane}")
\ No newline at end of file
+        # Waiting robots are resumed by _resume_robot when their lane is handed over.
+        # Lane requests and arrivals are per-robot events; the motion itself is
+        # one batched step over the fleet state.
+        state = self.fleet_state
+        journal = self.journal
+        if journal is not None:
+            journal.tick = self.tick
+        self._updating = True
+        for robot_id in state.ids[state.rows_awaiting_segment()].tolist():
+            robot = self.robots[robot_id]
+            if robot.begin_segment(self.traffic_manager, self.tick) and journal is not None:
+                journal.record_arrival(robot_id, robot.path_indices[-1])
+        arrived = state.advance()
+        state.charge()
+        for robot_id in state.ids[arrived].tolist():
+            self.robots[robot_id].finish_segment(self.traffic_manager)
+        self._updating = False
+        self.tick += 1
+        self.world.publish(self.tick)
+        if journal is not None and self.tick % journal.snapshot_interval == 0:
+            journal.tick = self.tick
+            journal.record_snapshot(self.get_state())
+
+    def get_state(self) -> Dict[str, Any]:
+        """Everything needed to resume the fleet exactly, as plain JSON-compatible data"""
+        return {
+            "tick": self.tick,
+            "next_robot_id": self.next_robot_id,
+            "fleet_state": self.fleet_state.get_state(),
+            "robots": [
+                {
+                    "id": robot.id,
+                    "destination": robot.destination,
+                    "path": robot.path,
+                    "path_indices": robot.path_indices,
+                    "current_path_index": robot.current_path_index,
+                    "departure_ticks": robot.departure_ticks,
+                    "color": robot.color,
+                    "waiting_since": robot.waiting_since,
+                }
+                for robot in self.robots.values()
+            ],
+            "traffic": self.traffic_manager.get_state(),
+        }
+
+    def set_state(self, state: Dict[str, Any]):
+        """Replace the whole fleet with a get_state() copy"""
+        self.tick = state["tick"]
+        self.next_robot_id = state["next_robot_id"]
+        self.fleet_state.set_state(state["fleet_state"])
+        self.robots.clear()
+        for fields in state["robots"]:
+            robot = Robot.attach(fields["id"], self.fleet_state)
+            destination = fields["destination"]
+            robot.destination = None if destination is None else tuple(destination)
+            robot.path = [tuple(point) for point in fields["path"]]
+            robot.path_indices = list(fields["path_indices"])
+            robot.current_path_index = fields["current_path_index"]
+            robot.departure_ticks = list(fields["departure_ticks"])
+            robot.color = fields["color"]
+            robot.waiting_since = fields["waiting_since"]
+            self.robots[robot.id] = robot
+        self.traffic_manager.set_state(state["traffic"])
+        self.world.publish(self.tick)
+
+    def publish(self) -> WorldSnapshot:
+        """Publish the current state to world readers; ticks do this on their own"""
+        return self.world.publish(self.tick)
+
+    def _resolve_deadlock(self, cycle: List[int]) -> bool:
+        resolved = self.deadlock_policy.resolve(self, cycle)
+        log_system_event("Deadlock " + ("resolved" if resolved else "unresolved"),
+                         "Policy %s on robots %s", self.deadlock_policy.name, cycle)
+        return resolved
+
+    def _resume_robot(self, robot_id: int, lane: Tuple[int, int]):
+        robot = self.robots.get(robot_id)
+        if robot is not None and robot.status == "waiting":
+            robot.status = "moving"
+            robot.waiting_since = None
+            log_robot_action(robot.id, "Resuming movement", "on lane %s", lane)
+            if self.journal is not None:
+                self.journal.record_lane(RESUME, robot_id, lane)
\ No newline at end of file
@@ -0,0 +1,209 @@
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+from src.models.nav_graph import NavGraph
+from src.controllers.traffic_manager import lane_key, LaneKey
+from src.utils.logger import log_system_event
+
+class ReservationTable:
+    """
+    Space-time reservations in planner steps: (vertex, step) and (lane, step)
+    slots, plus open-ended parking of robots that have no plan.
+    """
+
+    def __init__(self):
+        self.vertex_slots: Dict[Tuple[int, int], int] = {}
+        self.lane_slots: Dict[Tuple[LaneKey, int], int] = {}
+        self.parked: Dict[int, Tuple[int, int]] = {}
+        self._owned: Dict[int, List[Tuple[Dict, Tuple]]] = {}
+        self._parked_at: Dict[int, int] = {}
+
+    def vertex_free(self, vertex: int, step: int, robot_id: int) -> bool:
+        holder = self.vertex_slots.get((vertex, step))
+        if holder is not None and holder != robot_id:
+            return False
+        parked = self.parked.get(vertex)
+        return parked is None or parked[0] == robot_id or step < parked[1]
+
+    def park(self, vertex: int, from_step: int, robot_id: int):
+        """Hold a vertex from from_step onwards for a robot standing there without a plan"""
+        self.unpark(robot_id)
+        self.parked[vertex] = (robot_id, from_step)
+        self._parked_at[robot_id] = vertex
+
+    def unpark(self, robot_id: int):
+        vertex = self._parked_at.pop(robot_id, None)
+        if vertex is not None and self.parked.get(vertex, (None,))[0] == robot_id:
+            del self.parked[vertex]
+
+    def lane_free(self, lane: Tuple[int, int], start_step: int, end_step: int, robot_id: int) -> bool:
+        """Whether the lane (in either direction) is unreserved for steps [start_step, end_step)"""
+        key = lane_key(lane)
+        for step in range(start_step, end_step):
+            holder = self.lane_slots.get((key, step))
+            if holder is not None and holder != robot_id:
+                return False
+        return True
+
+    def _claim(self, slots: Dict, key: Tuple, robot_id: int):
+        slots[key] = robot_id
+        self._owned.setdefault(robot_id, []).append((slots, key))
+
+    def reserve_vertex(self, vertex: int, start_step: int, end_step: int, robot_id: int):
+        for step in range(start_step, end_step):
+            self._claim(self.vertex_slots, (vertex, step), robot_id)
+
+    def reserve_lane(self, lane: Tuple[int, int], start_step: int, end_step: int, robot_id: int):
+        key = lane_key(lane)
+        for step in range(start_step, end_step):
+            self._claim(self.lane_slots, (key, step), robot_id)
+
+    def release(self, robot_id: int):
+        """Drop every slot held by a robot, e.g. before it is re-planned"""
+        for slots, key in self._owned.pop(robot_id, ()):
+            if slots.get(key) == robot_id:
+                del slots[key]
+        self.unpark(robot_id)
+
+    def prune(self, before_step: int):
+        """Forget slots that are already in the past"""
+        for slots in (self.vertex_slots, self.lane_slots):
+            for key in [key for key in slots if key[1] < before_step]:
+                del slots[key]
+        for robot_id in list(self._owned):
+            owned = [(slots, key) for slots, key in self._owned[robot_id] if key[1] >= before_step]
+            if owned:
+                self._owned[robot_id] = owned
+            else:
+                del self._owned[robot_id]
+
+class CooperativePlanner:
+    """Cooperative A* over a time-expanded graph.
+
+    Each robot is planned in turn against the reservations of robots planned
+    before it, so it routes around them or waits at a vertex ahead of time
+    instead of discovering the conflict at a lane boundary. Time is discretized
+    into steps of step_ticks simulation ticks. Plans are advisory: robots still
+    request lanes from the TrafficManager as they go, which remains the
+    fallback whenever a robot falls behind its schedule.
+    """
+
+    def __init__(self, nav_graph: NavGraph, step_ticks: int = 10, horizon: int = 400, park_steps: int = 20,
+                 max_expansions: int = 20000):
+        self.nav_graph = nav_graph
+        self.step_ticks = step_ticks
+        self.horizon = horizon
+        self.max_expansions = max_expansions
+        self.park_steps = park_steps
+        self.tables: Dict[str, ReservationTable] = {}
+
+    def get_table(self, level_name: str) -> ReservationTable:
+        return self.tables.setdefault(level_name, ReservationTable())
+
+    def release(self, robot_id: int):
+        for table in self.tables.values():
+            table.release(robot_id)
+
+    def park(self, level_name: str, robot_id: int, vertex: int, tick: int):
+        """Make later plans route around a robot that is standing at a vertex"""
+        self.get_table(level_name).park(vertex, tick // self.step_ticks, robot_id)
+
+    def prune(self, tick: int):
+        for table in self.tables.values():
+            table.prune(tick // self.step_ticks)
+
+    def plan(self, level_name: str, robot_id: int, start_idx: int, end_idx: int, tick: int,
+             speed: float) -> Optional[Tuple[List[Tuple[float, float]], List[int], List[int]]]:
+        """
+        Plan and reserve a conflict-free route starting at simulation tick.
+        Returns (path_coords, path_indices, departure_ticks), where
+        departure_ticks[i] is the earliest tick to leave path_indices[i], or
+        None if no route was found within the horizon or expansion budget.
+        speed is the robot's distance per tick.
+        """
+        graph = self.nav_graph.get_compiled(level_name)
+        table = self.get_table(level_name)
+        table.release(robot_id)
+        coords = graph._coords
+        indptr, indices, lengths = graph._indptr, graph._indices, graph._lengths
+        step_distance = speed * self.step_ticks
+        goal_x, goal_y = coords[end_idx]
+
+        def heuristic(v: int) -> float:
+            x, y = coords[v]
+            return math.hypot(goal_x - x, goal_y - y) / step_distance
+
+        def duration(edge: int) -> int:
+            # One extra tick covers the pause between arriving and requesting the next lane
+            return max(1, math.ceil((lengths[edge] / speed + 1) / self.step_ticks))
+
+        start_step = -(-tick // self.step_ticks)
+        max_step = start_step + self.horizon
+        open_set = [(heuristic(start_idx), 0.0, start_step, start_idx)]
+        came_from: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        closed = set()
+
+        while open_set:
+            _, _, step, current = heapq.heappop(open_set)
+            state = (current, step)
+            if state in closed:
+                continue
+            closed.add(state)
+            if len(closed) > self.max_expansions:
+                break
+
+            # The goal must stay clear for a while, since the robot parks there
+            if current == end_idx and all(
+                table.vertex_free(current, s, robot_id) for s in range(step, step + self.park_steps)
+            ):
+                states = [state]
+                while state in came_from:
+                    state = came_from[state]
+                    states.append(state)
+                states.reverse()
+                return self._commit(level_name, robot_id, states)
+
+            if step >= max_step:
+                continue
+            successors = []
+            if table.vertex_free(current, step + 1, robot_id):
+                successors.append((current, step + 1))
+            for edge in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[edge]
+                arrival = step + duration(edge)
+                if (table.lane_free((current, neighbor), step, arrival, robot_id)
+                        and table.vertex_free(neighbor, arrival, robot_id)):
+                    successors.append((neighbor, arrival))
+            for successor in successors:
+                if successor in closed:
+                    continue
+                # g is the arrival step itself, so the first parent found is as good as any
+                if successor not in came_from:
+                    came_from[successor] = state
+                h = heuristic(successor[0])
+                heapq.heappush(open_set, (successor[1] + h, h, successor[1], successor[0]))
+
+        log_system_event("Reservation planning failed", "Robot %s from %s to %s", robot_id, start_idx, end_idx)
+        return None
+
+    def _commit(self, level_name: str, robot_id: int, states: List[Tuple[int, int]]):
+        table = self.get_table(level_name)
+        coords = self.nav_graph.get_compiled(level_name)._coords
+        path_indices: List[int] = []
+        departure_ticks: List[int] = []
+        arrived_step = states[0][1]
+        for i, (vertex, step) in enumerate(states):
+            if i + 1 < len(states) and states[i + 1][0] == vertex:
+                continue
+            # Last state at this vertex: hold it from arrival until departure
+            table.reserve_vertex(vertex, arrived_step, step + 1, robot_id)
+            path_indices.append(vertex)
+            departure_ticks.append(step * self.step_ticks)
+            if i + 1 < len(states):
+                next_vertex, next_step = states[i + 1]
+                table.reserve_lane((vertex, next_vertex), step, next_step, robot_id)
+                arrived_step = next_step
+        goal, goal_step = states[-1]
+        table.park(goal, goal_step, robot_id)
+        path_coords = [coords[idx][:2] for idx in path_indices]
+        return path_coords, path_indices, departure_ticks
@@ -0,0 +1,256 @@
+import multiprocessing
+import os
+import traceback
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.controllers.simulator import Simulator
+from src.models.fleet_state import IDLE
+from src.models.nav_graph import NavGraph
+from src.models.shared_fleet import SharedFleetBlock, SharedFleetView
+from src.utils.logger import log_system_event, setup_logging
+
+# Robots of the level at position k in the graph file get ids k * ROBOT_ID_STRIDE + 1 onwards
+ROBOT_ID_STRIDE = 1_000_000
+
+class _Shard:
+    """One level simulated inside a worker process"""
+
+    def __init__(self, simulator: Simulator, block: SharedFleetBlock):
+        self.simulator = simulator
+        self.block = block
+
+    def publish(self):
+        fleet_manager = self.simulator.fleet_manager
+        self.block.publish(fleet_manager.fleet_state, fleet_manager.tick)
+
+def _run_worker(conn, nav_graph_file: str, levels: List[Tuple[int, str, str]], dt: float, worker_logging: bool):
+    """Worker process main loop: simulate some levels and answer the coordinator's commands"""
+    if worker_logging:
+        setup_logging()
+    shards: Dict[int, _Shard] = {}
+    try:
+        nav_graph = NavGraph(nav_graph_file)
+        for level_index, level_name, block_name in levels:
+            simulator = Simulator(nav_graph_file, dt=dt, level=level_name, nav_graph=nav_graph)
+            simulator.fleet_manager.next_robot_id = level_index * ROBOT_ID_STRIDE + 1
+            shards[level_index] = _Shard(simulator, SharedFleetBlock.attach(block_name))
+            shards[level_index].publish()
+    except Exception:
+        conn.send((False, traceback.format_exc()))
+        return
+    conn.send((True, None))
+
+    def spawn(level_index: int, vertex_indices: List[int]) -> List[int]:
+        shard = shards[level_index]
+        if shard.simulator.fleet_manager.fleet_state.size + len(vertex_indices) > shard.block.capacity:
+            raise ValueError(f"Level {shard.simulator.current_level} is limited to {shard.block.capacity} robots")
+        robot_ids = [shard.simulator.spawn_robot(vertex_idx).id for vertex_idx in vertex_indices]
+        shard.publish()
+        return robot_ids
+
+    def assign(destinations: Dict[int, Tuple[float, float]]) -> Dict[int, bool]:
+        assigned = {}
+        touched = set()
+        for robot_id, destination in destinations.items():
+            shard = shards.get(robot_id // ROBOT_ID_STRIDE)
+            if shard is None:
+                assigned[robot_id] = False
+                continue
+            assigned[robot_id] = shard.simulator.assign_destination(robot_id, destination)
+            touched.add(shard)
+        for shard in touched:
+            shard.publish()
+        return assigned
+
+    def run(ticks: int) -> int:
+        for _ in range(ticks):
+            for shard in shards.values():
+                shard.simulator.step()
+                shard.publish()
+        return ticks
+
+    def deadlocks() -> Dict[str, int]:
+        totals = {"detected": 0, "resolved": 0}
+        for shard in shards.values():
+            metrics = shard.simulator.traffic_manager.get_deadlock_metrics()
+            totals["detected"] += metrics["detected"]
+            totals["resolved"] += metrics["resolved"]
+        return totals
+
+    commands = {"spawn": spawn, "assign": assign, "run": run, "deadlocks": deadlocks}
+    try:
+        while True:
+            try:
+                command, args = conn.recv()
+            except EOFError:
+                break
+            if command == "close":
+                conn.send((True, None))
+                break
+            try:
+                conn.send((True, commands[command](*args)))
+            except Exception:
+                conn.send((False, traceback.format_exc()))
+    finally:
+        for shard in shards.values():
+            shard.simulator.close()
+            shard.block.close()
+
+class ShardedSimulator:
+    """Simulates the levels of a site in parallel, one group of levels per worker process.
+
+    Robots never leave their level, so every level gets its own Simulator,
+    TrafficManager and fleet inside a worker, and workers only synchronise
+    with the coordinator between ticks. After every tick or command a worker
+    publishes each of its levels into a SharedFleetBlock, which world() and
+    any other process attached by name read without copying. Levels are
+    spread over the workers by vertex count.
+
+    Robot ids encode their level (see ROBOT_ID_STRIDE), so commands are routed
+    without a lookup. Workers are started with the spawn method and get no
+    logging unless worker_logging is set.
+    """
+
+    def __init__(self, nav_graph_file: str, levels: Optional[Sequence[str]] = None, workers: Optional[int] = None,
+                 dt: float = 0.05, max_robots_per_level: int = 4096, worker_logging: bool = False):
+        self.nav_graph = NavGraph(nav_graph_file)
+        all_levels = self.nav_graph.get_level_names()
+        self.levels = list(levels) if levels is not None else all_levels
+        unknown = set(self.levels) - set(all_levels)
+        if unknown:
+            raise ValueError(f"Unknown levels: {', '.join(sorted(unknown))}")
+        self.dt = dt
+        self.tick_count = 0
+        self._level_indexes = {level_name: all_levels.index(level_name) for level_name in self.levels}
+        self._level_names = {index: level_name for level_name, index in self._level_indexes.items()}
+        self.blocks: Dict[str, SharedFleetBlock] = {}
+        self._connections = []
+        self._processes = []
+        self._worker_of_level: Dict[str, int] = {}
+        try:
+            for level_name in self.levels:
+                self.blocks[level_name] = SharedFleetBlock.create(max_robots_per_level)
+            self._start_workers(nav_graph_file, workers or os.cpu_count() or 1, worker_logging)
+        except BaseException:
+            self.close()
+            raise
+        log_system_event("Sharded simulator initialized", "%d levels on %d workers", len(self.levels),
+                         len(self._processes))
+
+    def _start_workers(self, nav_graph_file: str, workers: int, worker_logging: bool):
+        # Largest level first onto the least loaded worker
+        groups: List[List[str]] = [[] for _ in range(min(workers, len(self.levels)))]
+        loads = [0] * len(groups)
+        for level_name in sorted(self.levels, key=self.nav_graph.get_vertex_count, reverse=True):
+            worker = loads.index(min(loads))
+            groups[worker].append(level_name)
+            loads[worker] += self.nav_graph.get_vertex_count(level_name)
+
+        context = multiprocessing.get_context("spawn")
+        for worker, group in enumerate(groups):
+            parent_conn, child_conn = context.Pipe()
+            levels = [(self._level_indexes[name], name, self.blocks[name].name) for name in group]
+            process = context.Process(target=_run_worker, name=f"level-worker-{worker}", daemon=True,
+                                      args=(child_conn, nav_graph_file, levels, self.dt, worker_logging))
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+            for level_name in group:
+                self._worker_of_level[level_name] = worker
+        for worker in range(len(groups)):
+            self._receive(worker)
+
+    def _receive(self, worker: int) -> Any:
+        try:
+            ok, result = self._connections[worker].recv()
+        except EOFError:
+            raise RuntimeError(f"Level worker {worker} exited unexpectedly") from None
+        if not ok:
+            raise RuntimeError(f"Level worker {worker} failed:\n{result}")
+        return result
+
+    def _broadcast(self, command: str, args_by_worker: Dict[int, tuple]) -> Dict[int, Any]:
+        """Send a command to several workers before waiting on any, so they run concurrently"""
+        for worker, args in args_by_worker.items():
+            self._connections[worker].send((command, args))
+        return {worker: self._receive(worker) for worker in args_by_worker}
+
+    def level_of(self, robot_id: int) -> Optional[str]:
+        return self._level_names.get(robot_id // ROBOT_ID_STRIDE)
+
+    def spawn_robots(self, level_name: str, vertex_indices: Iterable[int]) -> List[int]:
+        """Spawn robots on vertices of a level; returns their ids"""
+        worker = self._worker_of_level[level_name]
+        args = (self._level_indexes[level_name], list(vertex_indices))
+        return self._broadcast("spawn", {worker: args})[worker]
+
+    def spawn_robot(self, level_name: str, vertex_idx: int) -> int:
+        return self.spawn_robots(level_name, [vertex_idx])[0]
+
+    def assign_destinations(self, destinations: Dict[int, Tuple[float, float]]) -> Dict[int, bool]:
+        """
+        Plan paths for many robots, each on its own level; the workers plan
+        concurrently. Returns whether each robot was given a new path.
+        """
+        by_worker: Dict[int, Dict[int, Tuple[float, float]]] = {}
+        assigned = {}
+        for robot_id, destination in destinations.items():
+            level_name = self.level_of(robot_id)
+            if level_name is None:
+                log_system_event("Warning", "Invalid robot ID: %s", robot_id)
+                assigned[robot_id] = False
+                continue
+            by_worker.setdefault(self._worker_of_level[level_name], {})[robot_id] = destination
+        for result in self._broadcast("assign", {worker: (batch,) for worker, batch in by_worker.items()}).values():
+            assigned.update(result)
+        return assigned
+
+    def assign_destination(self, robot_id: int, destination: Tuple[float, float]) -> bool:
+        return self.assign_destinations({robot_id: destination})[robot_id]
+
+    def step(self):
+        """Advance every level by one tick"""
+        self.run(1)
+
+    def run(self, ticks: int) -> int:
+        """
+        Advance every level by ticks ticks, with the workers running
+        independently until all of them are done. Returns ticks.
+        """
+        self._broadcast("run", {worker: (ticks,) for worker in range(len(self._processes))})
+        self.tick_count += ticks
+        return ticks
+
+    def world(self, level_name: str) -> SharedFleetView:
+        """A level's robots as last published, as arrays over the shared memory (see SharedFleetBlock.view)"""
+        return self.blocks[level_name].view()
+
+    def idle_robots(self, level_name: str) -> List[int]:
+        view = self.blocks[level_name].read()
+        return view.ids[view.status == IDLE].tolist()
+
+    def get_deadlock_metrics(self) -> Dict[str, int]:
+        totals = {"detected": 0, "resolved": 0}
+        for metrics in self._broadcast("deadlocks", {worker: () for worker in range(len(self._processes))}).values():
+            for key in totals:
+                totals[key] += metrics[key]
+        return totals
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        for conn in self._connections:
+            try:
+                conn.send(("close", ()))
+                conn.recv()
+            except (EOFError, OSError):
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._connections = []
+        self._processes = []
+        for block in self.blocks.values():
+            block.close()
+        self.blocks = {}
@@ -0,0 +1,316 @@
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from src.models.nav_graph import NavGraph
+from src.models.robot import Robot
+from src.models.world_state import RobotSnapshot, WorldSnapshot
+from src.controllers.fleet_manager import FleetManager
+from src.controllers.reservation_planner import CooperativePlanner
+from src.controllers.charger_scheduler import ChargerScheduler
+from src.controllers.dispatcher import TaskDispatcher
+from src.controllers.deadlock import DeadlockPolicy, ReplanYoungestPolicy, DEADLOCK_POLICIES
+from src.utils.event_journal import EventJournal, JournalReader, JournalReplayer
+from src.utils.logger import log_system_event
+
+class Simulator:
+    """Headless simulation engine stepping the fleet at a fixed simulated dt.
+
+    In real-time mode each tick is paced to ``dt`` wall-clock seconds, otherwise
+    ticks run back to back as fast as the CPU allows. With cooperative planning,
+    new routes are reserved in space and time against earlier ones; the
+    reactive TrafficManager still arbitrates lanes and covers failed plans.
+    With journal_file, the run is recorded to a binary event journal that
+    replay() can play back.
+    """
+
+    def __init__(self, nav_graph_file: str, dt: float = 0.05, realtime: bool = False,
+                 precompute_paths: bool = False, cooperative: bool = False,
+                 deadlock_policy: Optional[DeadlockPolicy] = None, journal_file: Optional[str] = None,
+                 snapshot_interval: int = 500, level: Optional[str] = None,
+                 nav_graph: Optional[NavGraph] = None):
+        # Simulators of several levels of one site can share an already loaded graph
+        self.nav_graph = nav_graph or NavGraph(nav_graph_file, precompute_paths=precompute_paths)
+        deadlock_policy = deadlock_policy or ReplanYoungestPolicy(self.replan_around)
+        self.current_level = level or self.nav_graph.get_level_names()[0]
+        self.journal = None
+        if journal_file is not None:
+            self.journal = EventJournal(journal_file, {
+                "nav_graph_file": nav_graph_file,
+                "nav_graph_hash": self.nav_graph.content_hash,
+                "level": self.current_level,
+                "dt": dt,
+                "deadlock_policy": deadlock_policy.name,
+            }, snapshot_interval=snapshot_interval)
+        self.fleet_manager = FleetManager(deadlock_policy, journal=self.journal, dt=dt)
+        self.traffic_manager = self.fleet_manager.traffic_manager
+        self.dt = dt
+        self.realtime = realtime
+        self.tick_count = 0
+        self.planner = CooperativePlanner(self.nav_graph) if cooperative else None
+        self.sim_time = 0.0
+        self._running = False
+        self._pending_paths: List[Tuple[int, Future]] = []
+        self.dispatcher: Optional[TaskDispatcher] = None
+        self.dispatch_every = 1
+        self.chargers: Optional[ChargerScheduler] = None
+        log_system_event("Simulator initialized", "dt=%ss, realtime=%s", dt, realtime)
+
+    @property
+    def robots(self) -> Dict[int, Robot]:
+        return self.fleet_manager.robots
+
+    @property
+    def world(self) -> WorldSnapshot:
+        """The fleet as of the last tick or publish(), for readers that must not touch live robots"""
+        return self.fleet_manager.world.latest
+
+    def publish(self) -> WorldSnapshot:
+        """
+        Publish commands given between ticks (spawns, destinations) to world
+        readers without waiting for the next tick, e.g. while paused
+        """
+        return self.fleet_manager.publish()
+
+    def step(self):
+        """Advance the simulation by one tick of ``dt`` simulated seconds"""
+        if self.dispatcher is not None and self.tick_count % self.dispatch_every == 0:
+            self.dispatcher.dispatch()
+        if self._pending_paths:
+            self.apply_planned_paths()
+        self.fleet_manager.update_robots()
+        if self.chargers is not None:
+            # Right after the tick, so robots that just stopped low are claimed before anyone commands them again
+            self.chargers.update()
+        self.tick_count += 1
+        if self.planner is not None and self.tick_count % 100 == 0:
+            self.planner.prune(self.fleet_manager.tick)
+        self.sim_time += self.dt
+
+    def run(self, ticks: Optional[int] = None, until_idle: bool = False) -> int:
+        """Run ticks until the limit is hit, the fleet goes idle or stop() is called.
+
+        Returns the number of ticks executed.
+        """
+        self._running = True
+        executed = 0
+        next_deadline = time.perf_counter()
+        while self._running and (ticks is None or executed < ticks):
+            if until_idle and self.is_idle():
+                break
+            self.step()
+            executed += 1
+            if self.realtime:
+                next_deadline += self.dt
+                delay = next_deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind; don't try to catch up with a burst of ticks
+                    next_deadline = time.perf_counter()
+        self._running = False
+        return executed
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        """Finish the event journal, if one is being recorded"""
+        if self.journal is not None:
+            self.journal.close()
+        self.nav_graph.batch_planner.shutdown()
+
+    @classmethod
+    def replay(cls, journal_file: str, nav_graph_file: Optional[str] = None) -> Tuple["Simulator", JournalReplayer]:
+        """
+        Set up a simulator like the one that recorded journal_file and a
+        replayer that drives it; seek() and run() on the replayer move it
+        through the recorded run.
+        """
+        reader = JournalReader(journal_file)
+        header = reader.header
+        policy_class = DEADLOCK_POLICIES.get(header.get("deadlock_policy"))
+        policy = None if policy_class in (None, ReplanYoungestPolicy) else policy_class()
+        sim = cls(nav_graph_file or header["nav_graph_file"], dt=header.get("dt", 0.05),
+                  deadlock_policy=policy, level=header.get("level"))
+        if sim.nav_graph.content_hash != header.get("nav_graph_hash"):
+            log_system_event("Warning", "Navigation graph differs from the one the journal was recorded on")
+        return sim, JournalReplayer(reader, sim.fleet_manager)
+
+    def enable_dispatch(self, every: int = 1, max_batch: int = 256, max_attempts: int = 3) -> TaskDispatcher:
+        """
+        Have a TaskDispatcher give queued tasks to idle robots at the start of
+        every every-th tick; larger values collect bigger batches per round.
+        """
+        if self.dispatcher is None:
+            self.dispatcher = TaskDispatcher(self, max_batch=max_batch, max_attempts=max_attempts)
+        self.dispatch_every = max(every, 1)
+        return self.dispatcher
+
+    def enable_chargers(self, low_battery: float = 0.25, charged: float = 0.95, drain_per_unit: float = 0.0005,
+                        charge_per_second: float = 0.04) -> ChargerScheduler:
+        """
+        Turn on battery drain and have a ChargerScheduler send robots below
+        low_battery to charger slots at the end of every tick. Robots it has
+        claimed should be left alone (see ChargerScheduler.claims); any other
+        trip is refused if the robot could not reach a charger after it, and
+        the dispatcher only hands out tasks that pass the same check.
+        """
+        self.fleet_manager.set_battery_rates(drain_per_unit, charge_per_second)
+        if self.chargers is None:
+            self.chargers = ChargerScheduler(self, low_battery=low_battery, charged=charged)
+        self.chargers.low_battery = low_battery
+        self.chargers.charged = charged
+        return self.chargers
+
+    def take_dirty_robots(self) -> List[int]:
+        """Ids of robots whose position or status changed since the last call"""
+        state = self.fleet_manager.fleet_state
+        return state.ids[state.take_dirty()].tolist()
+
+    def is_idle(self) -> bool:
+        return all(robot.status == "idle" for robot in self.robots.values())
+
+    def spawn_robot(self, vertex_idx: int) -> Robot:
+        vertex = self.nav_graph.get_vertex_by_index(self.current_level, vertex_idx)
+        robot = self.fleet_manager.spawn_robot((vertex[0], vertex[1]))
+        if self.planner is not None:
+            self.planner.park(self.current_level, robot.id, vertex_idx, self.fleet_manager.tick)
+        return robot
+
+    def assign_destination(self, robot_id: int, destination: Tuple[float, float]) -> bool:
+        """Plan a path for a robot to the vertex closest to destination.
+
+        Returns True if the robot was given a new path.
+        """
+        if robot_id not in self.robots:
+            log_system_event("Warning", "Invalid robot ID: %s", robot_id)
+            return False
+
+        robot = self.robots[robot_id]
+        start_idx = self.find_closest_vertex(robot.position)
+        end_idx = self.find_closest_vertex(destination)
+
+        if start_idx == end_idx:
+            log_system_event("Warning", "Robot already at destination")
+            return False
+
+        departure_ticks = None
+        plan = None
+        if self.planner is not None:
+            plan = self.planner.plan(self.current_level, robot_id, start_idx, end_idx,
+                                     self.fleet_manager.tick, robot.speed * self.dt)
+        if plan is not None:
+            path_coords, path_indices, departure_ticks = plan
+        else:
+            path_coords, path_indices = self.nav_graph.find_path(self.current_level, start_idx, end_idx)
+
+        return self._apply_path(robot_id, path_coords, path_indices, departure_ticks)
+
+    def _apply_path(self, robot_id: int, path_coords: List[Tuple[float, float]], path_indices: List[int],
+                    departure_ticks: Optional[List[int]] = None) -> bool:
+        if not path_coords:
+            log_system_event("Warning", "No valid path found")
+            return False
+        if self.chargers is not None and not self.chargers.claims(robot_id) \
+                and not self._within_range(robot_id, path_coords, path_indices[-1]):
+            return False
+
+        robot = self.robots[robot_id]
+        robot.position = path_coords[0]
+        robot.path = path_coords
+        self.fleet_manager.assign_destination(robot_id, path_coords[-1], path_indices, departure_ticks)
+        return True
+
+    def _within_range(self, robot_id: int, path_coords: List[Tuple[float, float]], end_idx: int) -> bool:
+        """Whether the robot can drive path_coords and still reach a charger from its end.
+
+        Depends only on the fleet state and the graph, not on the
+        ChargerScheduler, so a replay makes the same decisions.
+        """
+        legs = np.diff(np.asarray(path_coords, dtype=np.float64)[:, :2], axis=0)
+        distance = float(np.hypot(legs[:, 0], legs[:, 1]).sum())
+        to_charger = self.nav_graph.get_charger_field(self.current_level).distance[end_idx]
+        if distance + to_charger <= self.robots[robot_id].range_left():
+            return True
+        log_system_event("Warning", "Robot %s cannot drive %.1f to %s and still reach a charger",
+                         robot_id, distance, end_idx)
+        return False
+
+    def assign_destinations(self, destinations: Dict[int, Tuple[float, float]],
+                            parallel: bool = False) -> Dict[int, Future]:
+        """Plan paths for many robots at once without blocking the caller.
+
+        Returns each robot's planning future; the path is handed to the robot
+        by the first step() after it is ready. With cooperative planning the
+        reservations depend on each other, so robots are planned one by one
+        right away and the futures are already done.
+        """
+        destinations = {robot_id: dest for robot_id, dest in destinations.items() if robot_id in self.robots}
+        if self.planner is not None:
+            futures = {}
+            for robot_id, destination in destinations.items():
+                future = Future()
+                robot = self.robots[robot_id]
+                assigned = self.assign_destination(robot_id, destination)
+                future.set_result((robot.path, robot.path_indices) if assigned else ([], []))
+                futures[robot_id] = future
+            return futures
+
+        requests = [
+            (self.find_closest_vertex(self.robots[robot_id].position), self.find_closest_vertex(destination))
+            for robot_id, destination in destinations.items()
+        ]
+        futures = dict(zip(destinations, self.nav_graph.find_paths(self.current_level, requests, parallel)))
+        self._pending_paths.extend(futures.items())
+        return futures
+
+    def apply_planned_paths(self) -> int:
+        """Give robots the paths from assign_destinations that are ready; returns how many were applied"""
+        applied = 0
+        pending = []
+        for robot_id, future in self._pending_paths:
+            if not future.done():
+                pending.append((robot_id, future))
+            elif future.exception() is not None:
+                log_system_event("Warning", "Path planning failed for robot %s: %s", robot_id, future.exception())
+            elif robot_id in self.robots:
+                path_coords, path_indices = future.result()
+                if len(path_indices) > 1 and self._apply_path(robot_id, path_coords, path_indices):
+                    applied += 1
+        self._pending_paths = pending
+        return applied
+
+    def replan_around(self, robot_id: int, blocked_lane: Tuple[int, int]) -> bool:
+        """Re-route a robot from its current vertex to its goal without using blocked_lane"""
+        robot = self.robots[robot_id]
+        if robot.current_path_index >= len(robot.path_indices) - 1:
+            return False
+        start_idx = robot.path_indices[robot.current_path_index]
+        end_idx = robot.path_indices[-1]
+        path_coords, path_indices = self.nav_graph.find_path(
+            self.current_level, start_idx, end_idx, avoid_lanes={tuple(blocked_lane)}
+        )
+        if not path_coords:
+            return False
+        # A detour can be much longer than the trip it replaces
+        if self.fleet_manager.fleet_state.drain_per_unit and not self._within_range(robot_id, path_coords, end_idx):
+            return False
+        if self.planner is not None:
+            self.planner.release(robot_id)
+        robot.path = path_coords
+        self.fleet_manager.assign_destination(robot_id, path_coords[-1], path_indices)
+        return True
+
+    def find_closest_vertex(self, position: Tuple[float, float]) -> int:
+        """Find the index of the vertex closest to given position"""
+        closest_idx = self.nav_graph.find_closest_vertex(self.current_level, position)
+        return 0 if closest_idx is None else closest_idx
+
+    def snapshot(self, robot_ids: Optional[Iterable[int]] = None) -> List[RobotSnapshot]:
+        """Robots of the latest published world state as named tuples.
+
+        With robot_ids, only those robots are included.
+        """
+        world = self.world
+        return [world.robot(robot_id) for robot_id in (world if robot_ids is None else robot_ids)]
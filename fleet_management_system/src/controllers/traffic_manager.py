@@ -1,49 +1,263 @@
-from typing import Dict, Set, Tuple, List
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Set, Tuple, List, Optional
 from src.utils.logger import log_system_event
+from src.utils.event_journal import LANE_RESERVED, LANE_RELEASED, WAIT
+
+LaneKey = Tuple[int, int]
+
+def lane_key(lane: Tuple[int, int]) -> LaneKey:
+    """Direction-independent key for a lane, so (a, b) and (b, a) share a reservation"""
+    a, b = lane[0], lane[1]
+    return (a, b) if a <= b else (b, a)
+
+class _CycleText:
+    """Renders a wait-for cycle as "a -> b -> c" only if the log record is actually written"""
+
+    __slots__ = ("cycle",)
+
+    def __init__(self, cycle: List[int]):
+        self.cycle = cycle
+
+    def __str__(self) -> str:
+        return " -> ".join(map(str, self.cycle))
 
 class TrafficManager:
-    def __init__(self):
-        self.reserved_lanes: Dict[Tuple[int, int], int] = {}
-        self.waiting_robots: Dict[int, Tuple[int, int]] = {}  
+    def __init__(self, on_lane_granted: Optional[Callable[[int, Tuple[int, int]], None]] = None,
+                 on_deadlock: Optional[Callable[[List[int]], bool]] = None):
+        """
+        on_lane_granted(robot_id, lane) is called when a released lane is handed
+        to the next robot in its wait queue, so the owner can resume it.
+        on_deadlock(cycle) is called with the robots of a wait-for cycle as soon
+        as a new wait closes one, and returns True if it resolved it.
+        """
+        # Reservations and wait queues are keyed by lane_key(); every operation is O(1)
+        self.on_lane_granted = on_lane_granted
+        self.on_deadlock = on_deadlock
+        self.deadlocks_detected = 0
+        self.deadlocks_resolved = 0
+        self.recent_deadlocks = deque(maxlen=20)
+        self.reserved_lanes: Dict[LaneKey, int] = {}
+        self.robot_lanes: Dict[int, Set[LaneKey]] = {}
+        self.lane_queues: Dict[LaneKey, "OrderedDict[int, None]"] = {}
+        self.waiting_robots: Dict[int, Tuple[int, int]] = {}
+        # Bumped whenever reserved_lanes changes, so readers can tell when to re-copy it
+        self.version = 0
+        self.journal = None
         log_system_event("TrafficManager initialized", "Ready to manage lane traffic")
 
+    def get_lane_holder(self, lane: Tuple[int, int]) -> Optional[int]:
+        """Robot currently holding a lane in either direction, if any"""
+        return self.reserved_lanes.get(lane_key(lane))
+
+    def is_lane_free(self, lane: Tuple[int, int], robot_id: Optional[int] = None) -> bool:
+        """
+        Whether robot_id may use the lane right now: it already holds it, or
+        nobody holds it and no other robot is ahead of it in the lane's queue.
+        """
+        key = lane_key(lane)
+        holder = self.reserved_lanes.get(key)
+        if holder is not None:
+            return holder == robot_id
+        queue = self.lane_queues.get(key)
+        return not queue or next(iter(queue)) == robot_id
+
     def request_lane(self, robot_id: int, lane: Tuple[int, int]) -> bool:
         """
         Request to reserve a lane for a robot.
         Returns True if granted, False if blocked.
         """
-        for reserved_lane, reserved_robot in self.reserved_lanes.items():
-            if reserved_lane == lane and reserved_robot != robot_id:
-                return False
-            if reserved_lane == (lane[1], lane[0]) and reserved_robot != robot_id:
-                return False
+        if not self.is_lane_free(lane, robot_id):
+            return False
 
         # If lane is free, reserve it
-        self.reserved_lanes[lane] = robot_id
-        if robot_id in self.waiting_robots:
-            del self.waiting_robots[robot_id]
-        log_system_event("Lane reserved", f"Robot {robot_id} reserved lane {lane}")
+        key = lane_key(lane)
+        if self.reserved_lanes.get(key) == robot_id:
+            return True
+        self.reserved_lanes[key] = robot_id
+        self.robot_lanes.setdefault(robot_id, set()).add(key)
+        self.version += 1
+        self.cancel_wait(robot_id)
+        log_system_event("Lane reserved", "Robot %s reserved lane %s", robot_id, lane)
+        if self.journal is not None:
+            self.journal.record_lane(LANE_RESERVED, robot_id, lane)
         return True
 
-    def release_lane(self, lane: Tuple[int, int]):
-        """Release a lane reservation and notify waiting robots"""
-        if lane in self.reserved_lanes:
-            released_robot = self.reserved_lanes[lane]
-            del self.reserved_lanes[lane]
-            # Check if any robots are waiting for this lane
-            waiting_robots = self.get_waiting_robots(lane)
-            for robot_id in waiting_robots:
-                if robot_id in self.waiting_robots:
-                    del self.waiting_robots[robot_id]
-                    log_system_event("Lane available", f"Robot {robot_id} can now proceed on lane {lane}")
-            
-            log_system_event("Lane released", f"Lane {lane} is now available (was used by robot {released_robot})")
+    def release_lane(self, lane: Tuple[int, int], robot_id: int):
+        """
+        Release robot_id's reservation of a lane and notify waiting robots.
+        Does nothing if the lane is held by someone else, e.g. a robot that
+        preempted it while robot_id was still driving it.
+        """
+        key = lane_key(lane)
+        released_robot = self.reserved_lanes.get(key)
+        if released_robot is None or released_robot != robot_id:
+            return
+        del self.reserved_lanes[key]
+        self.version += 1
+        held = self.robot_lanes.get(released_robot)
+        if held is not None:
+            held.discard(key)
+            if not held:
+                del self.robot_lanes[released_robot]
+        log_system_event("Lane released", "Lane %s is now available (was used by robot %s)", lane, released_robot)
+        if self.journal is not None:
+            self.journal.record_lane(LANE_RELEASED, released_robot, lane)
+        self._hand_over(key)
+
+    def _hand_over(self, key: LaneKey):
+        """Reserve a free lane for the head of its queue and wake that robot"""
+        if key in self.reserved_lanes:
+            return
+        queue = self.lane_queues.get(key)
+        if not queue:
+            return
+        robot_id, _ = queue.popitem(last=False)
+        if not queue:
+            del self.lane_queues[key]
+        lane = self.waiting_robots.pop(robot_id)
+        self.reserved_lanes[key] = robot_id
+        self.robot_lanes.setdefault(robot_id, set()).add(key)
+        self.version += 1
+        log_system_event("Lane available", "Robot %s can now proceed on lane %s", robot_id, lane)
+        if self.journal is not None:
+            self.journal.record_lane(LANE_RESERVED, robot_id, lane)
+        if self.on_lane_granted is not None:
+            self.on_lane_granted(robot_id, lane)
+
+    def release_robot(self, robot_id: int):
+        """Drop every reservation and wait held by a robot, e.g. when it is re-routed"""
+        for key in list(self.robot_lanes.get(robot_id, ())):
+            self.release_lane(key, robot_id)
+        self.cancel_wait(robot_id)
+
+    def back_off(self, robot_id: int) -> bool:
+        """
+        Release every lane a waiting robot holds and move it to the back of the
+        queue it waits in. Returns False if the robot is not waiting.
+        """
+        lane = self.waiting_robots.get(robot_id)
+        if lane is None:
+            return False
+        for key in list(self.robot_lanes.get(robot_id, ())):
+            self.release_lane(key, robot_id)
+        key = lane_key(lane)
+        self.lane_queues[key].move_to_end(robot_id)
+        log_system_event("Robot backed off", "Robot %s re-queued for lane %s", robot_id, lane)
+        # Nobody may hold the lane any more, e.g. if its holder was waiting on robot_id
+        self._hand_over(key)
+        return True
 
     def add_waiting_robot(self, robot_id: int, lane: Tuple[int, int]):
         """Add a robot to waiting queue for a lane"""
+        key = lane_key(lane)
+        previous = self.waiting_robots.get(robot_id)
+        if previous is not None and lane_key(previous) != key:
+            self.cancel_wait(robot_id)
         self.waiting_robots[robot_id] = lane
-        log_system_event("Robot waiting", f"Robot {robot_id} waiting for lane {lane}")
+        self.lane_queues.setdefault(key, OrderedDict())[robot_id] = None
+        log_system_event("Robot waiting", "Robot %s waiting for lane %s", robot_id, lane)
+        if self.journal is not None:
+            self.journal.record_lane(WAIT, robot_id, lane)
+        cycle = self.find_wait_cycle(robot_id)
+        if cycle:
+            self.deadlocks_detected += 1
+            self.recent_deadlocks.append(tuple(cycle))
+            log_system_event("Deadlock detected", "Wait-for cycle %s", _CycleText(cycle))
+            if self.on_deadlock is not None and self.on_deadlock(cycle):
+                self.deadlocks_resolved += 1
+
+    def waits_for(self, robot_id: int) -> Optional[int]:
+        """The robot holding the lane robot_id is waiting on, if any"""
+        lane = self.waiting_robots.get(robot_id)
+        if lane is None:
+            return None
+        holder = self.reserved_lanes.get(lane_key(lane))
+        return None if holder == robot_id else holder
+
+    def find_wait_cycle(self, robot_id: int) -> List[int]:
+        """
+        Robots in the wait-for cycle through robot_id, or [] if there is none.
+        A robot waits on at most one lane, so this is a walk along a chain.
+        """
+        chain = [robot_id]
+        seen = {robot_id}
+        current = self.waits_for(robot_id)
+        while current is not None:
+            if current == robot_id:
+                return chain
+            if current in seen:
+                # A cycle further down the chain that robot_id is only queued behind
+                return []
+            chain.append(current)
+            seen.add(current)
+            current = self.waits_for(current)
+        return []
+
+    def preempt_lane(self, lane: Tuple[int, int], robot_id: int):
+        """Take a lane away from its holder and give it to robot_id straight away"""
+        key = lane_key(lane)
+        holder = self.reserved_lanes.pop(key, None)
+        if holder is not None:
+            held = self.robot_lanes.get(holder)
+            if held is not None:
+                held.discard(key)
+                if not held:
+                    del self.robot_lanes[holder]
+        self.cancel_wait(robot_id)
+        self.reserved_lanes[key] = robot_id
+        self.robot_lanes.setdefault(robot_id, set()).add(key)
+        self.version += 1
+        log_system_event("Lane preempted", "Robot %s took lane %s from robot %s", robot_id, lane, holder)
+        if self.journal is not None:
+            if holder is not None:
+                self.journal.record_lane(LANE_RELEASED, holder, lane)
+            self.journal.record_lane(LANE_RESERVED, robot_id, lane)
+        if self.on_lane_granted is not None:
+            self.on_lane_granted(robot_id, lane)
+
+    def get_deadlock_metrics(self) -> Dict[str, Any]:
+        return {
+            "detected": self.deadlocks_detected,
+            "resolved": self.deadlocks_resolved,
+            "recent_cycles": list(self.recent_deadlocks),
+        }
+
+    def cancel_wait(self, robot_id: int):
+        """Remove a robot from whichever lane queue it is waiting in"""
+        lane = self.waiting_robots.pop(robot_id, None)
+        if lane is None:
+            return
+        key = lane_key(lane)
+        queue = self.lane_queues.get(key)
+        if queue is not None:
+            queue.pop(robot_id, None)
+            if not queue:
+                del self.lane_queues[key]
+            else:
+                self._hand_over(key)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Reservations, queues and counters as plain lists, for snapshots"""
+        return {
+            "reserved_lanes": [[a, b, robot_id] for (a, b), robot_id in self.reserved_lanes.items()],
+            "robot_lanes": [[robot_id, [list(key) for key in keys]] for robot_id, keys in self.robot_lanes.items()],
+            "lane_queues": [[a, b, list(queue)] for (a, b), queue in self.lane_queues.items()],
+            "waiting_robots": [[robot_id, lane[0], lane[1]] for robot_id, lane in self.waiting_robots.items()],
+            "deadlocks_detected": self.deadlocks_detected,
+            "deadlocks_resolved": self.deadlocks_resolved,
+            "recent_deadlocks": [list(cycle) for cycle in self.recent_deadlocks],
+        }
+
+    def set_state(self, state: Dict[str, Any]):
+        self.reserved_lanes = {(a, b): robot_id for a, b, robot_id in state["reserved_lanes"]}
+        self.version += 1
+        self.robot_lanes = {robot_id: {tuple(key) for key in keys} for robot_id, keys in state["robot_lanes"]}
+        self.lane_queues = {(a, b): OrderedDict.fromkeys(queue) for a, b, queue in state["lane_queues"]}
+        self.waiting_robots = {robot_id: (a, b) for robot_id, a, b in state["waiting_robots"]}
+        self.deadlocks_detected = state["deadlocks_detected"]
+        self.deadlocks_resolved = state["deadlocks_resolved"]
+        self.recent_deadlocks = deque((tuple(cycle) for cycle in state["recent_deadlocks"]), maxlen=20)
 
     def get_waiting_robots(self, lane: Tuple[int, int]) -> List[int]:
-        """Get all robots waiting for a specific lane"""
-        return [rid for rid, l in self.waiting_robots.items() if l == lane]
\ No newline at end of file
+        """Get all robots waiting for a specific lane, in FIFO order"""
+        return list(self.lane_queues.get(lane_key(lane), ()))
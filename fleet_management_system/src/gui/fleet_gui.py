@@ -1,28 +1,30 @@
-import math
-import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import Dict, List, Tuple, Any
-from math import sqrt
-from ..models.nav_graph import NavGraph
-from ..models.robot import Robot
-from src.controllers.traffic_manager import TrafficManager
-from src.controllers.fleet_manager import FleetManager
+from typing import Dict, List, Optional, Tuple, Any
+from src.controllers.simulator import Simulator, RobotSnapshot
+from src.controllers.traffic_manager import lane_key
+from src.gui.render_scheduler import RenderScheduler
 from src.utils.logger import log_robot_action, log_system_event
 
 class FleetManagementGUI:
+    ROBOT_COLORS = ["#e74c3c", "#3498db", "#9b59b6", "#1abc9c", "#f39c12", "#d35400"]
+    STATUS_COLORS = {
+        "idle": "#95a5a6",
+        "moving": "#2ecc71",
+        "waiting": "#f1c40f",
+        "charging": "#3498db",
+        "error": "#e74c3c"
+    }
+
     def __init__(self, root: tk.Tk, nav_graph_file: str):
         self.root = root
         self.root.title("Fleet Management System")
         self.root.geometry("1200x800")
         self.root.minsize(1000, 700)
         self.setup_styles()
-        self.nav_graph = NavGraph(nav_graph_file)
-        self.traffic_manager = TrafficManager()
-        self.fleet_manager = FleetManager()
-        self.current_level = self.nav_graph.get_level_names()[0]
-        self.robots = {}  
-        self.next_robot_id = 1
+        self.simulator = Simulator(nav_graph_file)
+        self.nav_graph = self.simulator.nav_graph
+        self.current_level = self.simulator.current_level
         self.selected_robot = None
         self.main_frame = ttk.Frame(root, style='Main.TFrame')
         self.main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -39,16 +41,27 @@ class FleetManagementGUI:
         self.pan_start_x = 0
         self.pan_start_y = 0
         self.vertex_positions = []
+        self.scale = 1.0
+        self.center_x = 0
+        self.center_y = 0
+        self.static_drawn = False
+        self.robot_items: Dict[int, Dict[str, int]] = {}
+        self.robot_render_state: Dict[int, Tuple] = {}
+        self.lane_items: Dict[Tuple[int, int], List[int]] = {}
+        self.drawn_reserved_lanes = set()
+        self.drawn_lanes_source = None
+        self.drawn_path_state = None
+        self.canvas.bind("<Configure>", lambda event: self.draw_graph())
         self.canvas.bind("<ButtonPress-1>", self.on_canvas_click)
         self.canvas.bind("<B1-Motion>", self.pan)
         self.canvas.bind("<ButtonRelease-1>", self.on_canvas_release)
         self.canvas.bind("<MouseWheel>", self.on_mousewheel)
         self.animation_running = False
-        self.after_id = None
+        self.scheduler = RenderScheduler(self.root, self.simulator, self.render_frame, on_stats=self.update_status)
         self.root.update_idletasks()
         self.draw_graph()
         self.start_animation()
-        log_system_event("System initialized", f"Loading graph from {nav_graph_file}")
+        log_system_event("System initialized", "Loading graph from %s", nav_graph_file)
     
     def setup_styles(self):
         """Configure custom styles for a professional look"""
@@ -114,8 +127,19 @@ class FleetManagementGUI:
         self.status_label.pack(padx=10, pady=(0, 15), fill=tk.X)
     
     def draw_graph(self):
-        """Draw the navigation graph with robots using improved visuals"""
+        """Draw the static layers (grid, lanes, vertices, legend), then the robots.
+
+        Only needed when the level, zoom or canvas size changes. Every other
+        frame goes through render_frame, which updates the existing items.
+        """
         self.canvas.delete("all")
+        self.static_drawn = False
+        self.robot_items = {}
+        self.robot_render_state = {}
+        self.lane_items = {}
+        self.drawn_reserved_lanes = set()
+        self.drawn_lanes_source = None
+        self.drawn_path_state = None
         self.draw_grid()
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
@@ -124,13 +148,13 @@ class FleetManagementGUI:
         
         vertices = self.nav_graph.get_vertices(self.current_level)
         lanes = self.nav_graph.get_lanes(self.current_level)
+        compiled = self.nav_graph.get_compiled(self.current_level)
         
         if not vertices:
             return
-        x_coords = [v[0] for v in vertices]
-        y_coords = [-v[1] for v in vertices] 
-        min_x, max_x = min(x_coords), max(x_coords)
-        min_y, max_y = min(y_coords), max(y_coords)
+        x_coords, y_coords = compiled.coords[:, 0], -compiled.coords[:, 1]
+        min_x, max_x = float(x_coords.min()), float(x_coords.max())
+        min_y, max_y = float(y_coords.min()), float(y_coords.max())
         graph_width = max(1, max_x - min_x)
         graph_height = max(1, max_y - min_y)
         self.scale = min(
@@ -139,27 +163,22 @@ class FleetManagementGUI:
          )
         self.center_x = (canvas_width / 2) - ((min_x + max_x) / 2) * self.scale
         self.center_y = (canvas_height / 2) - ((min_y + max_y) / 2) * self.scale
+        screen_points = (compiled.coords * (self.scale, -self.scale) + (self.center_x, self.center_y)).tolist()
         self.vertex_positions = []
         for lane in lanes:
             start_idx, end_idx = lane[0], lane[1]
-            start = vertices[start_idx]
-            end = vertices[end_idx]
-            x1 = start[0] * self.scale + self.center_x
-            y1 = -start[1] * self.scale + self.center_y
-            x2 = end[0] * self.scale + self.center_x
-            y2 = -end[1] * self.scale + self.center_y
-            lane_key = (start_idx, end_idx)
-            is_reserved = lane_key in self.traffic_manager.reserved_lanes
-        
-            lane_color = "#ff0000" if is_reserved else "#a0a0a0"
-            self.canvas.create_line(
+            x1, y1 = screen_points[start_idx]
+            x2, y2 = screen_points[end_idx]
+            line = self.canvas.create_line(
                 x1, y1, x2, y2, 
-                fill=lane_color, 
+                fill="#a0a0a0", 
                 width=3, 
                 arrow=tk.LAST, 
                 arrowshape=(8, 10, 5),
-                smooth=True
+                smooth=True,
+                tags="lane"
             )
+            self.lane_items.setdefault(lane_key((start_idx, end_idx)), []).append(line)
             mid_x, mid_y = (x1 + x2)/2, (y1 + y2)/2
             self.canvas.create_oval(
                 mid_x-3, mid_y-3, mid_x+3, mid_y+3, 
@@ -167,9 +186,7 @@ class FleetManagementGUI:
                 outline="#2c3e50"
             )
         for i, vertex in enumerate(vertices):
-            x, y = vertex[0], -vertex[1]
-            cx = x * self.scale + self.center_x
-            cy = y * self.scale + self.center_y
+            cx, cy = screen_points[i]
             self.vertex_positions.append((cx, cy, i))
             vertex_attrs = vertex[2] if len(vertex) > 2 else {}
             is_charger = vertex_attrs.get("is_charger", False)
@@ -201,10 +218,63 @@ class FleetManagementGUI:
                     font=("Segoe UI", 9, "bold"),
                     tags=f"label_{i}"
                 )
-        for robot_id, robot in self.robots.items():
-            self.draw_robot(robot)
         self.draw_legend()
-        self.update_status()
+        self.static_drawn = True
+        self.render_frame()
+
+    def render_frame(self, robot_ids: Optional[List[int]] = None):
+        """Bring robots, lane reservations and the selected path up to date in place.
+
+        With robot_ids, only those robots are looked at; the scheduler passes
+        the ones that changed since the previous frame. Everything is read
+        from the simulator's published world snapshot.
+        """
+        if not self.static_drawn:
+            return
+        world = self.simulator.world
+        # The reservation map is shared between snapshots until it changes
+        if world.reserved_lanes is not self.drawn_lanes_source:
+            reserved = set(world.reserved_lanes)
+            for key in reserved.symmetric_difference(self.drawn_reserved_lanes):
+                lane_color = "#ff0000" if key in reserved else "#a0a0a0"
+                for item in self.lane_items.get(key, ()):
+                    self.canvas.itemconfig(item, fill=lane_color)
+            self.drawn_reserved_lanes = reserved
+            self.drawn_lanes_source = world.reserved_lanes
+
+        created = False
+        selected = None
+        for robot_id in (world if robot_ids is None else robot_ids):
+            if robot_id not in world:
+                continue
+            robot = world.robot(robot_id)
+            created |= self.draw_robot(robot)
+            if robot_id == self.selected_robot:
+                selected = robot
+        if selected is None and self.selected_robot in world:
+            # The selected robot did not change, so neither did its path
+            selected = world.robot(self.selected_robot)
+        if robot_ids is None and len(self.robot_items) > len(world):
+            for robot_id in [robot_id for robot_id in self.robot_items if robot_id not in world]:
+                self.canvas.delete(f"robot_group_{robot_id}")
+                del self.robot_items[robot_id]
+                del self.robot_render_state[robot_id]
+
+        path_state = None if selected is None else (selected.id, selected.path_indices, selected.current_path_index)
+        if path_state != self.drawn_path_state:
+            self.canvas.delete("path")
+            if selected is not None and selected.path_indices:
+                self.draw_robot_path(selected)
+                self.canvas.tag_raise("robot")
+                created = True
+            self.drawn_path_state = path_state
+        if created:
+            self.canvas.tag_raise("legend")
+        if robot_ids is None:
+            self.update_status()
+
+    def to_screen(self, position: Tuple[float, float]) -> Tuple[float, float]:
+        return (position[0] * self.scale + self.center_x, -position[1] * self.scale + self.center_y)
     
     def draw_grid(self):
         """Draw a subtle grid in the background"""
@@ -215,76 +285,84 @@ class FleetManagementGUI:
         for y in range(0, height, 50):
             self.canvas.create_line(0, y, width, y, fill="#e0e0e0", tags="grid")
     
-    def draw_robot(self, robot: Robot):
+    def draw_robot(self, robot: RobotSnapshot) -> bool:
+        """Create a robot's canvas items, or move and restyle them if they changed.
+
+        Returns True if new items were created.
+        """
+        cx, cy = self.to_screen(robot.position)
+        selected = robot.id == self.selected_robot
+        state = (cx, cy, robot.status, selected)
+        previous = self.robot_render_state.get(robot.id)
+        if state == previous:
+            return False
+        self.robot_render_state[robot.id] = state
+
+        items = self.robot_items.get(robot.id)
+        created = items is None
+        if created:
+            items = self.create_robot_items(robot, cx, cy)
+            self.robot_items[robot.id] = items
+        elif (cx, cy) != previous[:2]:
+            self.canvas.move(f"robot_group_{robot.id}", cx - previous[0], cy - previous[1])
+
+        if created or robot.status != previous[2]:
+            status_color = self.STATUS_COLORS.get(robot.status, "#e74c3c")
+            self.canvas.itemconfig(items["status"], fill=status_color)
+            self.canvas.itemconfig(items["pulse"], state=tk.NORMAL if robot.status == "waiting" else tk.HIDDEN)
+        if created or selected != previous[3]:
+            self.canvas.itemconfig(items["highlight"], state=tk.NORMAL if selected else tk.HIDDEN)
+        return created
+
+    def create_robot_items(self, robot: RobotSnapshot, cx: float, cy: float) -> Dict[str, int]:
         """Draw a robot on the canvas with improved visuals"""
-        x, y = robot.position[0], -robot.position[1]
-        cx = x * self.scale + self.center_x
-        cy = y * self.scale + self.center_y
-        colors = ["#e74c3c", "#3498db", "#9b59b6", "#1abc9c", "#f39c12", "#d35400"]
-        robot_color = colors[robot.id % len(colors)]
-        
+        robot_color = self.ROBOT_COLORS[robot.id % len(self.ROBOT_COLORS)]
+        group = ("robot", f"robot_group_{robot.id}")
         radius = 14
-        self.canvas.create_oval(
+        status_radius = 5
+        items = {}
+        items["shadow"] = self.canvas.create_oval(
             cx-radius+2, cy-radius+2, cx+radius+2, cy+radius+2,
-            fill="#555555", outline="", tags=f"robot_shadow_{robot.id}"
+            fill="#555555", outline="", tags=group + (f"robot_shadow_{robot.id}",)
         )
-        
-        self.canvas.create_oval(
+        items["body"] = self.canvas.create_oval(
             cx-radius, cy-radius, cx+radius, cy+radius,
             fill=robot_color, outline="#2c3e50", width=1.5,
-            tags=f"robot_{robot.id}"
+            tags=group + (f"robot_{robot.id}",)
         )
-        self.canvas.create_text(
+        items["label"] = self.canvas.create_text(
             cx, cy,
             text=str(robot.id),
             fill="white",
             font=("Segoe UI", 9, "bold"),
-            tags=f"robot_label_{robot.id}"
+            tags=group + (f"robot_label_{robot.id}",)
         )
-        status_radius = 5
-        status_colors = {
-            "idle": "#95a5a6",
-            "moving": "#2ecc71",
-            "waiting": "#f1c40f",
-            "charging": "#3498db",
-            "error": "#e74c3c"
-        }
-        status_color = status_colors.get(robot.status, "#e74c3c")
-        
-        self.canvas.create_oval(
+        items["status"] = self.canvas.create_oval(
             cx+radius-8, cy+radius-8,
             cx+radius-8+status_radius*2, cy+radius-8+status_radius*2,
-            fill=status_color, outline="#2c3e50", width=1,
-            tags=f"robot_status_{robot.id}"
+            outline="#2c3e50", width=1,
+            tags=group + (f"robot_status_{robot.id}",)
         )
-        if robot.id == self.selected_robot:
-            self.canvas.create_oval(
-                cx-radius-4, cy-radius-4,
-                cx+radius+4, cy+radius+4,
-                outline="#f1c40f", width=3,
-                tags=f"robot_highlight_{robot.id}"
-            )
-        
-            if robot.path:
-                self.draw_robot_path(robot)
-
-        if robot.status == "waiting":
-            pulse_phase = (time.time() % 1.0) * 2 * math.pi
-            pulse_alpha = 0.5 + 0.3 * math.sin(pulse_phase)
-            pulse_color = self.canvas.create_oval(
-                cx-radius-2, cy-radius-2,
-                cx+radius+2, cy+radius+2,
-                outline="#f1c40f", width=2,
-                tags=f"robot_pulse_{robot.id}"
-            )
-            self.canvas.itemconfig(pulse_color, stipple="gray50")
+        items["highlight"] = self.canvas.create_oval(
+            cx-radius-4, cy-radius-4,
+            cx+radius+4, cy+radius+4,
+            outline="#f1c40f", width=3, state=tk.HIDDEN,
+            tags=group + (f"robot_highlight_{robot.id}",)
+        )
+        items["pulse"] = self.canvas.create_oval(
+            cx-radius-2, cy-radius-2,
+            cx+radius+2, cy+radius+2,
+            outline="#f1c40f", width=2, stipple="gray50", state=tk.HIDDEN,
+            tags=group + (f"robot_pulse_{robot.id}",)
+        )
+        return items
     
-    def draw_robot_path(self, robot: Robot):
+    def draw_robot_path(self, robot: RobotSnapshot):
         """Draw the path for a selected robot with segment highlighting"""
         vertices = self.nav_graph.get_vertices(self.current_level)
         path_points = []
         
-        if not hasattr(robot, 'path_indices') or not robot.path_indices:
+        if not robot.path_indices:
             return
             
         for i in range(len(robot.path_indices) - 1):
@@ -305,7 +383,7 @@ class FleetManagementGUI:
                         width=4,
                         arrow=tk.LAST,
                         arrowshape=(8, 10, 5),
-                        tags=f"robot_path_segment_{robot.id}"
+                        tags=("path", f"robot_path_segment_{robot.id}")
                     )
                 
                 path_points.extend([x1, y1, x2, y2])
@@ -319,7 +397,7 @@ class FleetManagementGUI:
                     x-3, y-3, x+3, y+3,
                     fill="#f1c40f" if i > robot.current_path_index else "#27ae60",
                     outline="#d35400",
-                    tags=f"path_marker_{robot.id}_{i}"
+                    tags=("path", f"path_marker_{robot.id}_{i}")
                 )
                     
     def draw_legend(self):
@@ -331,19 +409,19 @@ class FleetManagementGUI:
         padding = 12
         self.canvas.create_rectangle(
             legend_x+2, legend_y+2, legend_x+box_width+2, legend_y+118,
-            fill="#e0e0e0", outline="", tags="legend_shadow"
+            fill="#e0e0e0", outline="", tags=("legend", "legend_shadow")
         )
         self.canvas.create_rectangle(
             legend_x, legend_y, legend_x+box_width, legend_y+116,
             fill="white", outline="#bdc3c7", width=1,
-            tags="legend_box"
+            tags=("legend", "legend_box")
         )
         self.canvas.create_text(
             legend_x + box_width//2, legend_y + padding,
             text="LEGEND", 
             fill="#2c3e50",
             font=("Segoe UI", 10, "bold"),
-            tags="legend_header"
+            tags=("legend", "legend_header")
         )
         items = [
             ("#27ae60", "Charging Station", 8, False),
@@ -365,18 +443,18 @@ class FleetManagementGUI:
                     robot_x, y_pos-8,
                     robot_x+16, y_pos+8,
                     fill="#e74c3c", outline="#2c3e50", width=1,
-                    tags="legend_robot"
+                    tags=("legend", "legend_robot")
                 )
                 self.canvas.create_text(
                     robot_x+8, y_pos,
                     text="1", fill="white", font=("Segoe UI", 8, "bold"),
-                    tags="legend_robot_label"
+                    tags=("legend", "legend_robot_label")
                 )
                 self.canvas.create_oval(
                     robot_x+12, y_pos+4,
                     robot_x+16, y_pos+8,
                     fill="#2ecc71", outline="#27ae60", width=1,
-                    tags="legend_robot_status"
+                    tags=("legend", "legend_robot_status")
                 )
             else:
                 circle_x = legend_x + 12
@@ -384,7 +462,7 @@ class FleetManagementGUI:
                     circle_x, y_pos-radius,
                     circle_x+radius*2, y_pos+radius,
                     fill=color, outline="#2c3e50", width=1,
-                    tags=f"legend_item_{i}"
+                    tags=("legend", f"legend_item_{i}")
                 )
             text_x = legend_x + 36  
             self.canvas.create_text(
@@ -393,16 +471,18 @@ class FleetManagementGUI:
                 anchor=tk.W, 
                 fill="#2c3e50",
                 font=("Segoe UI", 9),
-                tags=f"legend_text_{i}"
+                tags=("legend", f"legend_text_{i}")
             )
 
     def update_status(self):
         """Update the system status display"""
         status_text = (
             f"System: {'Running' if self.animation_running else 'Paused'}\n"
-            f"Robots: {len(self.robots)}\n"
+            f"Robots: {len(self.simulator.world)}\n"
             f"Level: {self.current_level}\n"
-            f"Zoom: {self.zoom_level:.1f}x"
+            f"Zoom: {self.zoom_level:.1f}x\n"
+            f"FPS: {self.scheduler.fps:.0f} ({self.scheduler.frame_ms:.1f} ms/frame)\n"
+            f"Tick: {self.scheduler.tick_ms:.2f} ms"
         )
         self.status_label.config(text=status_text)
     
@@ -415,22 +495,14 @@ class FleetManagementGUI:
     
     def on_canvas_click(self, event):
         """Handle canvas click events according to problem statement"""
-        clicked_vertex = None
-        for x, y, idx in self.vertex_positions:
-            distance = sqrt((event.x - x)**2 + (event.y - y)**2)
-            if distance <= 10:  
-                clicked_vertex = idx
-                break
-        
-        clicked_robot = None
-        for robot_id, robot in self.robots.items():
-            x, y = robot.position[0], -robot.position[1]
-            cx = x * self.scale + self.center_x
-            cy = y * self.scale + self.center_y
-            distance = sqrt((event.x - cx)**2 + (event.y - cy)**2)
-            if distance <= 12:  
-                clicked_robot = robot_id
-                break
+        if not self.vertex_positions:
+            return
+        world_x = (event.x - self.center_x) / self.scale
+        world_y = -(event.y - self.center_y) / self.scale
+        clicked_vertex = self.nav_graph.find_closest_vertex(
+            self.current_level, (world_x, world_y), max_distance=10 / self.scale
+        )
+        clicked_robot = self.find_robot_at((world_x, world_y), max_distance=12 / self.scale)
         if clicked_vertex is not None:
             vertex = self.nav_graph.get_vertex_by_index(self.current_level, clicked_vertex)
             position = (vertex[0], vertex[1])
@@ -452,41 +524,47 @@ class FleetManagementGUI:
         self.pan_start_x = None
         self.pan_start_y = None
     
+    def find_robot_at(self, position: Tuple[float, float], max_distance: float) -> Optional[int]:
+        """Id of the robot nearest to a world position, if one is within max_distance"""
+        return self.simulator.world.nearest_robot(position, max_distance)
+
     def spawn_robot(self, position: Tuple[float, float]):
         """Spawn a new robot at the specified position"""
-        new_robot = self.fleet_manager.spawn_robot(position)
-        self.robots[new_robot.id] = new_robot  
-        log_system_event("Robot spawned", f"ID: {new_robot.id} at {position}")
-        self.draw_graph()
+        new_robot = self.simulator.spawn_robot(self.find_closest_vertex(position))
+        log_system_event("Robot spawned", "ID: %s at %s", new_robot.id, position)
+        self.simulator.publish()
+        self.render_frame()
     
     def select_robot(self, robot_id: int):
         """Select a robot by its ID"""
-        if robot_id in self.robots:
+        if robot_id in self.simulator.world:
             self.selected_robot = robot_id
-            log_system_event("Robot selected", f"ID: {robot_id}")
+            log_system_event("Robot selected", "ID: %s", robot_id)
             self.update_robot_info()
-            self.draw_graph()
+            self.render_frame()
     
     def clear_selection(self):
         """Clear the current robot selection"""
         self.selected_robot = None
         self.update_robot_info()
-        self.draw_graph()
+        self.render_frame()
     
     def change_level(self, level_name: str):
-        log_system_event("Level changed", f"to {level_name}")
+        log_system_event("Level changed", "to %s", level_name)
         self.current_level = level_name
+        self.simulator.current_level = level_name
         self.reset_view()
         
     def update_robot_info(self):
         """Update the robot information display"""
         if self.selected_robot is None:
             self.robot_info_label.config(text="No robot selected")
-        elif self.selected_robot in self.robots:
-            robot = self.robots[self.selected_robot]
+        elif self.selected_robot in self.simulator.world:
+            robot = self.simulator.world.robot(self.selected_robot)
             info = (
                 f"Robot ID: {robot.id}\n"
                 f"Status: {robot.status}\n"
+                f"Battery: {robot.battery:.0%}\n"
                 f"Position: {robot.position}\n"
                 f"Destination: {robot.destination if robot.destination else 'None'}"
             )
@@ -531,68 +609,20 @@ class FleetManagementGUI:
     def start_animation(self):
         """Start the animation loop"""
         self.animation_running = True
-        self.animate_robots()
+        self.scheduler.start()
     
     def stop_animation(self):
         """Stop the animation loop"""
         self.animation_running = False
-        if self.after_id:
-            self.root.after_cancel(self.after_id)
-    
-    def animate_robots(self):
-        """Update robot positions and redraw"""
-        if not self.animation_running:
-            return
-
-        self.fleet_manager.update_robots()
-        for robot_id, robot in self.fleet_manager.robots.items():
-            if robot_id in self.robots:
-                self.robots[robot_id].position = robot.position
-                self.robots[robot_id].status = robot.status
-        
-        self.draw_graph()
-        self.after_id = self.root.after(50, self.animate_robots)
+        self.scheduler.stop()
+        self.update_status()
     
     def assign_destination(self, robot_id: int, destination: Tuple[float, float]):
-        if robot_id not in self.robots:
-            log_system_event("Warning", f"Invalid robot ID: {robot_id}")
-            return
-            
-        robot = self.robots[robot_id]
-        start_idx = self.find_closest_vertex(robot.position)
-        end_idx = self.find_closest_vertex(destination)
-        
-        if start_idx == end_idx:
-            log_system_event("Warning", "Robot already at destination")
-            return
-        
-        path_coords, path_indices = self.nav_graph.find_path(self.current_level, start_idx, end_idx)
-        
-        if not path_coords:
-            log_system_event("Warning", "No valid path found")
-            return
-
-        if len(path_coords) > 0:
-            robot.position = path_coords[0]
-        
-        robot.path = path_coords
-        robot.path_indices = path_indices
-        robot.current_path_index = 0
-        robot.status = "moving"
-        self.update_robot_info()
-        self.draw_graph()
+        if self.simulator.assign_destination(robot_id, destination):
+            self.simulator.publish()
+            self.update_robot_info()
+            self.render_frame()
         
     def find_closest_vertex(self, position: Tuple[float, float]) -> int:
         """Find the index of the vertex closest to given position"""
-        vertices = self.nav_graph.get_vertices(self.current_level)
-        min_dist = float('inf')
-        closest_idx = 0
-        
-        for i, vertex in enumerate(vertices):
-            dist = sqrt((position[0] - vertex[0])**2 + (position[1] - vertex[1])**2)
-            if dist < min_dist:
-                min_dist = dist
-                closest_idx = i
-                
-        return closest_idx
-    
\ No newline at end of file
+        return self.simulator.find_closest_vertex(position)
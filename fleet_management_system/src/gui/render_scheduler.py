@@ -0,0 +1,102 @@
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+class RenderScheduler:
+    """Drives simulation ticks and display frames from the Tk event loop.
+
+    Ticks run on a fixed-step accumulator at the simulator's dt, independent
+    of how often frames are drawn. A frame is only rendered when some robot
+    changed since the last one. If ticks fall behind wall-clock time, the
+    backlog beyond max_ticks_per_frame is dropped (the simulation runs slower
+    than real time) instead of piling up Tk callbacks, and every pump leaves
+    at least min_idle seconds for Tk to handle input.
+    """
+
+    def __init__(self, root, simulator, render: Callable[[List[int]], None],
+                 on_stats: Optional[Callable[[], None]] = None, target_fps: float = 30.0,
+                 max_ticks_per_frame: int = 4, min_idle: float = 0.005, stats_interval: float = 0.5,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.root = root
+        self.simulator = simulator
+        self.render = render
+        self.on_stats = on_stats
+        self.frame_interval = 1.0 / target_fps
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.min_idle = min_idle
+        self.stats_interval = stats_interval
+        self.clock = clock
+        self.running = False
+        self.after_id = None
+        self.fps = 0.0
+        self.tick_ms = 0.0
+        self.frame_ms = 0.0
+        self.frames_skipped = 0
+        self.ticks_dropped = 0
+        self._accumulator = 0.0
+        self._last_pump = 0.0
+        self._last_stats = 0.0
+        self._frame_times = deque()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._accumulator = 0.0
+        self._last_pump = self.clock()
+        self.after_id = self.root.after(0, self._pump)
+
+    def stop(self):
+        self.running = False
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _pump(self):
+        self.after_id = None
+        if not self.running:
+            return
+        now = self.clock()
+        self._accumulator += now - self._last_pump
+        self._last_pump = now
+
+        dt = self.simulator.dt
+        ticks = min(int(self._accumulator / dt), self.max_ticks_per_frame)
+        if ticks:
+            started = self.clock()
+            for _ in range(ticks):
+                self.simulator.step()
+            self.tick_ms = self._smooth(self.tick_ms, (self.clock() - started) * 1000.0 / ticks)
+            self._accumulator -= ticks * dt
+        if self._accumulator >= dt:
+            dropped = int(self._accumulator / dt)
+            self.ticks_dropped += dropped
+            self._accumulator -= dropped * dt
+
+        self._render_if_dirty()
+        finished = self.clock()
+        if finished - self._last_stats >= self.stats_interval:
+            self._last_stats = finished
+            while self._frame_times and self._frame_times[0] < finished - 1.0:
+                self._frame_times.popleft()
+            self.fps = float(len(self._frame_times))
+            if self.on_stats is not None:
+                self.on_stats()
+
+        delay = max(self.frame_interval - (finished - now), self.min_idle)
+        self.after_id = self.root.after(max(1, int(delay * 1000)), self._pump)
+
+    def _render_if_dirty(self):
+        robot_ids = self.simulator.take_dirty_robots()
+        if not robot_ids:
+            self.frames_skipped += 1
+            return
+        started = self.clock()
+        self.render(robot_ids)
+        finished = self.clock()
+        self.frame_ms = self._smooth(self.frame_ms, (finished - started) * 1000.0)
+        self._frame_times.append(finished)
+
+    @staticmethod
+    def _smooth(average: float, sample: float, weight: float = 0.1) -> float:
+        return sample if average == 0.0 else average + weight * (sample - average)
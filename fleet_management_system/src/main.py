@@ -1,6 +1,7 @@
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, messagebox
 from src.gui.fleet_gui import FleetManagementGUI
+from src.models.graph_loader import GraphSchemaError
 from src.utils.logger import setup_logging
 
 def main():
@@ -14,7 +15,11 @@ def main():
     )
     if not nav_graph_file:
         return
-    app = FleetManagementGUI(root, nav_graph_file) 
+    try:
+        app = FleetManagementGUI(root, nav_graph_file)
+    except GraphSchemaError as e:
+        messagebox.showerror("Invalid navigation graph", str(e))
+        return
     def on_closing():
         app.stop_animation()
         root.destroy()
@@ -0,0 +1,72 @@
+from typing import Tuple
+import numpy as np
+
+def solve_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimum-cost assignment of rows to columns (Hungarian method).
+
+    cost may be rectangular; min(rows, columns) pairs are made. Returns the
+    row and column indices of the pairs, sorted by row, like SciPy's
+    linear_sum_assignment. Infinite entries are forbidden pairs and never
+    appear in the result, so fewer pairs come back when they rule out a full
+    assignment.
+
+    This is the shortest augmenting path formulation with row and column
+    potentials, O(n^2 m) for n <= m, with each augmenting step vectorized
+    over the columns.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.ndim != 2:
+        raise ValueError("cost must be a 2-D array")
+    if cost.shape[0] > cost.shape[1]:
+        cols, rows = solve_assignment(cost.T)
+        order = np.argsort(rows)
+        return rows[order], cols[order]
+    n, m = cost.shape
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    allowed = np.isfinite(cost)
+    if not allowed.all():
+        # A cost no real assignment can reach, so forbidden pairs are only used when nothing else fits
+        finite = cost[allowed]
+        spread = float(finite.max() - finite.min()) if len(finite) else 0.0
+        cost = np.where(allowed, cost, (spread + 1.0) * (n + 1) + (finite.max() if len(finite) else 0.0))
+
+    # 1-based as in the textbook form: column 0 is the virtual start, row 0 means unmatched
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for row in range(1, n + 1):
+        match[0] = row
+        column = 0
+        min_reduced = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = match[column]
+            free = ~used[1:]
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = column
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            min_reduced[1:][free] -= delta
+            column = next_column
+            if match[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    cols = np.flatnonzero(match[1:])
+    rows = match[1:][cols] - 1
+    keep = allowed[rows, cols]
+    rows, cols = rows[keep], cols[keep]
+    order = np.argsort(rows)
+    return rows[order], cols[order]
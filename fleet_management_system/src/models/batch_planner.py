@@ -0,0 +1,208 @@
+import heapq
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.utils.logger import log_system_event
+
+def shortest_paths_from(indptr: Sequence[int], indices: Sequence[int], lengths: Sequence[float],
+                        source: int, goals: Sequence[int]) -> Dict[int, List[int]]:
+    """
+    One Dijkstra from source over a CSR graph, stopped once every goal is
+    settled. Returns the vertex path to each reachable goal.
+    """
+    remaining = set(goals)
+    best = {source: 0.0}
+    came_from = {}
+    heap = [(0.0, source)]
+    inf = float('inf')
+    while heap and remaining:
+        distance, vertex = heapq.heappop(heap)
+        if distance > best[vertex]:
+            continue
+        remaining.discard(vertex)
+        for edge in range(indptr[vertex], indptr[vertex + 1]):
+            neighbor = indices[edge]
+            candidate = distance + lengths[edge]
+            if candidate < best.get(neighbor, inf):
+                best[neighbor] = candidate
+                came_from[neighbor] = vertex
+                heapq.heappush(heap, (candidate, neighbor))
+
+    paths = {}
+    for goal in goals:
+        if goal not in best:
+            continue
+        path = [goal]
+        while path[-1] != source:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        paths[goal] = path
+    return paths
+
+# Graph held by each pool worker, sent once by the pool initializer
+_worker_graph: Optional[Tuple[List[int], List[int], List[float]]] = None
+
+def _init_worker(indptr: List[int], indices: List[int], lengths: List[float]):
+    global _worker_graph
+    _worker_graph = (indptr, indices, lengths)
+
+def _plan_sources(batch: List[Tuple[int, List[int]]]) -> List[Dict[int, List[int]]]:
+    indptr, indices, lengths = _worker_graph
+    return [shortest_paths_from(indptr, indices, lengths, source, goals) for source, goals in batch]
+
+class BatchPlanner:
+    """Plans many paths on a level at once and hands them back as futures.
+
+    Requests are grouped by start vertex so each distinct start costs a
+    single Dijkstra, whatever the number of goals. Requests in the path
+    cache, and levels with a path table, are answered immediately. Otherwise
+    the searches run off the calling thread: on one background thread, or
+    with parallel on a process pool whose workers receive the level's
+    compiled adjacency once, when the pool starts. Each level has its own
+    pool, kept for the max_pools most recently planned levels, so switching
+    between levels does not restart workers; an edit to a level replaces
+    only that level's pool.
+
+    Paths found in the background go into the path cache like find_path
+    results. The cache belongs to the planning thread, so they are queued
+    by the callbacks and stored on its next find_path or submit; paths
+    planned before a level was edited are dropped then instead.
+    """
+
+    def __init__(self, nav_graph, max_workers: Optional[int] = None, sources_per_task: int = 16,
+                 max_pools: int = 4):
+        self.nav_graph = nav_graph
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.sources_per_task = sources_per_task
+        self.max_pools = max_pools
+        self._thread: Optional[ThreadPoolExecutor] = None
+        # level -> (level version the workers were given, pool), least recently used first
+        self._pools: "OrderedDict[str, Tuple[int, ProcessPoolExecutor]]" = OrderedDict()
+        # (level, version planned on, start, end, result), appended from executor callbacks
+        self._results: deque = deque()
+
+    def submit(self, level_name: str, requests: Sequence[Tuple[int, int]], parallel: bool = False) -> List[Future]:
+        """
+        One future per (start_idx, end_idx) request, in order, each resolving
+        to what find_path would return for it: (path_coords, path_indices),
+        empty when there is no path.
+        """
+        self.store_results()
+        graph = self.nav_graph.get_compiled(level_name)
+        coords = graph._coords
+        futures = [Future() for _ in requests]
+        by_source: Dict[int, List[int]] = {}
+        path_cache = self.nav_graph.path_cache
+        for i, (start_idx, end_idx) in enumerate(requests):
+            if not (0 <= start_idx < graph.num_vertices and 0 <= end_idx < graph.num_vertices):
+                futures[i].set_result(([], []))
+                continue
+            cached = path_cache.get((level_name, start_idx, end_idx, False))
+            if cached is not None:
+                futures[i].set_result(cached)
+            else:
+                by_source.setdefault(start_idx, []).append(i)
+        if not by_source:
+            return futures
+
+        table = self.nav_graph.get_path_table(level_name)
+        if table is not None:
+            for indexes in by_source.values():
+                for i in indexes:
+                    start_idx, end_idx = requests[i]
+                    path_indices = table.path_indices(start_idx, end_idx)
+                    result = ([coords[idx][:2] for idx in path_indices], path_indices)
+                    path_cache.put((level_name, start_idx, end_idx, False), result)
+                    futures[i].set_result(result)
+            return futures
+
+        batch = [(source, sorted({requests[i][1] for i in indexes})) for source, indexes in by_source.items()]
+        store = (self._results, level_name, self.nav_graph.get_version(level_name))
+        if parallel:
+            executor = self._get_pool(level_name)
+            # Spread the starts over every worker, at most sources_per_task per task
+            size = max(1, min(self.sources_per_task, -(-len(batch) // self.max_workers)))
+            chunks = [batch[i:i + size] for i in range(0, len(batch), size)]
+            for chunk in chunks:
+                self._resolve(executor.submit(_plan_sources, chunk), chunk, by_source, requests, coords, futures,
+                              store)
+        else:
+            indptr, indices, lengths = graph._indptr, graph._indices, graph._lengths
+            task = self._get_thread().submit(
+                lambda: [shortest_paths_from(indptr, indices, lengths, source, goals) for source, goals in batch]
+            )
+            self._resolve(task, batch, by_source, requests, coords, futures, store)
+        log_system_event("Paths batched", "%d requests from %d starts on level %s", len(requests), len(batch),
+                         level_name)
+        return futures
+
+    def store_results(self):
+        """Put the paths planned in the background since the last call into the path cache"""
+        results = self._results
+        if not results:
+            return
+        nav_graph = self.nav_graph
+        path_cache = nav_graph.path_cache
+        while results:
+            level_name, version, start_idx, end_idx, result = results.popleft()
+            if version == nav_graph.get_version(level_name):
+                path_cache.put((level_name, start_idx, end_idx, False), result)
+
+    @staticmethod
+    def _resolve(task: Future, batch: List[Tuple[int, List[int]]], by_source: Dict[int, List[int]],
+                 requests: Sequence[Tuple[int, int]], coords: List[Tuple[float, float]], futures: List[Future],
+                 store: Tuple[deque, str, int]):
+        """Fan a task's per-source results out to the futures of its requests, and queue them for the cache"""
+        results, level_name, version = store
+
+        def done(task: Future):
+            error = task.exception()
+            for n, (source, _) in enumerate(batch):
+                for i in by_source[source]:
+                    if error is not None:
+                        futures[i].set_exception(error)
+                        continue
+                    start_idx, end_idx = requests[i]
+                    path_indices = task.result()[n].get(end_idx, [])
+                    result = ([coords[idx][:2] for idx in path_indices], path_indices)
+                    results.append((level_name, version, start_idx, end_idx, result))
+                    futures[i].set_result(result)
+
+        task.add_done_callback(done)
+
+    def _get_thread(self) -> Executor:
+        if self._thread is None:
+            self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="path-planner")
+        return self._thread
+
+    def _get_pool(self, level_name: str) -> Executor:
+        version = self.nav_graph.get_version(level_name)
+        entry = self._pools.get(level_name)
+        if entry is not None:
+            if entry[0] == version:
+                self._pools.move_to_end(level_name)
+                return entry[1]
+            # Its workers still hold the adjacency from before the edit
+            del self._pools[level_name]
+            entry[1].shutdown(wait=False)
+        while len(self._pools) >= self.max_pools:
+            _, (_, pool) = self._pools.popitem(last=False)
+            pool.shutdown(wait=False)
+        graph = self.nav_graph.get_compiled(level_name)
+        pool = ProcessPoolExecutor(
+            max_workers=self.max_workers, initializer=_init_worker,
+            initargs=(graph._indptr, graph._indices, graph._lengths),
+        )
+        self._pools[level_name] = (version, pool)
+        log_system_event("Planner pool started", "level %s, %d workers", level_name, self.max_workers)
+        return pool
+
+    def shutdown(self):
+        """Stop the background thread and worker processes"""
+        if self._thread is not None:
+            self._thread.shutdown(wait=False)
+            self._thread = None
+        for _, pool in self._pools.values():
+            pool.shutdown(wait=False)
+        self._pools.clear()
@@ -0,0 +1,62 @@
+import heapq
+from typing import Dict, List
+import numpy as np
+from src.models.compiled_graph import CompiledLevel
+
+class ChargerField:
+    """Distance from every vertex of a level to its nearest charger.
+
+    ``chargers`` holds the charger vertices (those with ``is_charger``) and
+    ``slots`` how many robots each can charge at once (``charger_slots``,
+    default 1). ``distance[v]`` is the lane-length distance from v to the
+    closest charger and ``nearest[v]`` that charger's vertex, inf and -1
+    where no charger can be reached. Both come from one multi-source
+    Dijkstra, so lookups afterwards are single array reads.
+
+    The search relaxes edges out of the chargers, so strictly it measures
+    the distance from a charger to v. That equals the distance from v to the
+    charger because CompiledLevel is undirected (every lane is driven both
+    ways); directed lanes would need the search run on reversed edges.
+    """
+
+    def __init__(self, chargers: np.ndarray, slots: np.ndarray, distance: np.ndarray, nearest: np.ndarray):
+        self.chargers = chargers
+        self.slots = slots
+        self.distance = distance
+        self.nearest = nearest
+        for array in (chargers, slots, distance, nearest):
+            array.flags.writeable = False
+
+    @classmethod
+    def compute(cls, graph: CompiledLevel, vertex_attrs: List) -> "ChargerField":
+        slots: Dict[int, int] = {
+            index: attrs.get("charger_slots", 1)
+            for index, attrs in enumerate(vertex_attrs) if attrs and attrs.get("is_charger")
+        }
+        n = graph.num_vertices
+        inf = float('inf')
+        distance = [inf] * n
+        nearest = [-1] * n
+        heap = []
+        for charger in slots:
+            distance[charger] = 0.0
+            nearest[charger] = charger
+            heap.append((0.0, charger))
+        heapq.heapify(heap)
+        indptr, indices, lengths = graph._indptr, graph._indices, graph._lengths
+        while heap:
+            dist, vertex = heapq.heappop(heap)
+            if dist > distance[vertex]:
+                continue
+            for edge in range(indptr[vertex], indptr[vertex + 1]):
+                neighbor = indices[edge]
+                candidate = dist + lengths[edge]
+                if candidate < distance[neighbor]:
+                    distance[neighbor] = candidate
+                    nearest[neighbor] = nearest[vertex]
+                    heapq.heappush(heap, (candidate, neighbor))
+        return cls(np.array(list(slots), dtype=np.int64), np.array(list(slots.values()), dtype=np.int64),
+                   np.array(distance), np.array(nearest, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.chargers)
@@ -0,0 +1,125 @@
+from functools import cached_property
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+class CompiledLevel:
+    """Immutable CSR adjacency for a single level of the navigation graph.
+
+    Lanes are treated as undirected, matching how the planner has always read
+    them. For vertex ``v`` its outgoing edges are ``indptr[v]:indptr[v + 1]``
+    into ``indices`` (neighbor vertex), ``lane_ids`` (index into the level's
+    lane list), ``lengths`` (Euclidean edge length) and ``speed_limits``
+    (the lane's ``speed_limit`` attribute, 0 meaning unlimited). A lane
+    listed in both directions compiles to one pair of edges carrying the
+    first-listed copy's lane id and speed limit; NavGraph's lane edits
+    change every copy so the two never disagree.
+    """
+
+    def __init__(self, vertices: List[Tuple[float, float, Dict[str, Any]]], lanes: List[List[Any]]):
+        coords = np.array([(v[0], v[1]) for v in vertices], dtype=np.float64).reshape(-1, 2)
+        endpoints = np.array([(lane[0], lane[1]) for lane in lanes], dtype=np.int64).reshape(-1, 2)
+        speed_limits = np.array(
+            [(lane[2].get("speed_limit", 0) or 0) if len(lane) > 2 else 0 for lane in lanes], dtype=np.float64
+        )
+        self._build(coords, endpoints, speed_limits)
+
+    @classmethod
+    def from_arrays(cls, coords: np.ndarray, lanes: np.ndarray, speed_limits: np.ndarray) -> "CompiledLevel":
+        """Compile from typed arrays, e.g. a LevelArrays from the graph loader"""
+        level = cls.__new__(cls)
+        level._build(coords, lanes, speed_limits)
+        return level
+
+    def _build(self, coords: np.ndarray, lanes: np.ndarray, speed_limits: np.ndarray):
+        self.num_vertices = len(coords)
+        self.coords = coords
+
+        # Each lane a->b yields the directed edges a->b and b->a; a pair that
+        # appears again later in the lane list is a duplicate and is dropped
+        m = len(lanes)
+        sources = np.empty(2 * m, dtype=np.int64)
+        targets = np.empty(2 * m, dtype=np.int64)
+        sources[0::2], sources[1::2] = lanes[:, 0], lanes[:, 1]
+        targets[0::2], targets[1::2] = lanes[:, 1], lanes[:, 0]
+        _, first = np.unique(sources * max(self.num_vertices, 1) + targets, return_index=True)
+        first.sort()
+        sources, targets = sources[first], targets[first]
+        lane_ids = first // 2
+
+        # Stable sort keeps neighbors in lane-file order, like the old dict of lists
+        order = np.argsort(sources, kind="stable")
+        self.indices = targets[order]
+        self.lane_ids = lane_ids[order]
+        self.speed_limits = np.asarray(speed_limits, dtype=np.float64)[lane_ids][order]
+        self.indptr = np.zeros(self.num_vertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.num_vertices), out=self.indptr[1:])
+        src = sources[order]
+        delta = self.coords[self.indices] - self.coords[src]
+        self.lengths = np.hypot(delta[:, 0], delta[:, 1])
+        self._edge_costs: Dict[float, List[float]] = {}
+
+    # Plain-list mirrors for the Python search loops, which are much slower
+    # when every element access boxes a NumPy scalar. They are built on first
+    # use, so compiling a level a caller never searches stays cheap.
+
+    @cached_property
+    def _coords(self) -> List[List[float]]:
+        return self.coords.tolist()
+
+    @cached_property
+    def _indptr(self) -> List[int]:
+        return self.indptr.tolist()
+
+    @cached_property
+    def _indices(self) -> List[int]:
+        return self.indices.tolist()
+
+    @cached_property
+    def _lane_ids(self) -> List[int]:
+        return self.lane_ids.tolist()
+
+    @cached_property
+    def _lengths(self) -> List[float]:
+        return self.lengths.tolist()
+
+    @cached_property
+    def _edge_index(self) -> Dict[Tuple[int, int], int]:
+        src = np.repeat(np.arange(self.num_vertices), np.diff(self.indptr)).tolist()
+        return {(u, v): i for i, (u, v) in enumerate(zip(src, self._indices))}
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._indices)
+
+    def neighbors(self, vertex: int) -> List[int]:
+        return self._indices[self._indptr[vertex]:self._indptr[vertex + 1]]
+
+    def edges(self, vertex: int) -> List[Tuple[int, int, float]]:
+        """(neighbor, lane_id, length) for every edge leaving vertex"""
+        start, end = self._indptr[vertex], self._indptr[vertex + 1]
+        return list(zip(self._indices[start:end], self._lane_ids[start:end], self._lengths[start:end]))
+
+    def edge_costs(self, default_speed: float) -> List[float]:
+        """Per-edge travel time, using default_speed on lanes without a speed limit"""
+        costs = self._edge_costs.get(default_speed)
+        if costs is None:
+            speeds = np.where(self.speed_limits > 0, self.speed_limits, default_speed)
+            costs = (self.lengths / speeds).tolist()
+            self._edge_costs[default_speed] = costs
+        return costs
+
+    def max_speed(self, default_speed: float) -> float:
+        """Fastest speed allowed anywhere on the level, for an admissible time heuristic"""
+        limits = self.speed_limits[self.speed_limits > 0]
+        return max(default_speed, float(limits.max())) if len(limits) else default_speed
+
+    def has_edge(self, a: int, b: int) -> bool:
+        return (a, b) in self._edge_index
+
+    def lane_id(self, a: int, b: int) -> int:
+        """Index into the level's lane list for the lane joining a and b, or -1"""
+        edge = self._edge_index.get((a, b))
+        return -1 if edge is None else self._lane_ids[edge]
+
+    def edge_length(self, a: int, b: int) -> float:
+        return self._lengths[self._edge_index[(a, b)]]
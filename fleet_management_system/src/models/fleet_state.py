@@ -0,0 +1,170 @@
+from typing import Any, Dict, Set, Tuple
+import numpy as np
+
+STATUS_CODES: Dict[str, int] = {"idle": 0, "moving": 1, "waiting": 2, "charging": 3, "error": 4}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+IDLE = STATUS_CODES["idle"]
+MOVING = STATUS_CODES["moving"]
+WAITING = STATUS_CODES["waiting"]
+CHARGING = STATUS_CODES["charging"]
+ERROR = STATUS_CODES["error"]
+
+class FleetState:
+    """Structure-of-arrays kinematic state for a whole fleet, one row per robot.
+
+    ``Robot`` objects are thin views over a row. Moving robots that hold their
+    current lane are advanced together by ``advance``; only segment starts
+    (lane requests) and arrivals are handled per robot in Python. Rows whose
+    position or status changed are flagged in ``dirty`` until a renderer
+    collects them with ``take_dirty``. Robots given a new path are collected
+    in ``route_changes`` until the world state publishes them.
+
+    ``speed`` is in units per simulated second and every advance() covers
+    ``dt`` seconds, so motion does not depend on the tick size.
+
+    ``battery`` is each robot's charge as a fraction of a full battery. Moving
+    costs drain_per_unit of it per unit of distance, and robots with the
+    charging status gain charge_per_second of it. Drain is off (0) unless
+    something is there to recharge the robots, see Simulator.enable_chargers.
+    """
+
+    FIELDS = ("ids", "position", "seg_start", "seg_end", "direction", "remaining", "speed",
+              "status", "on_segment", "dirty", "battery")
+    # For fields missing from snapshots taken before they existed
+    DEFAULTS = {"battery": 1.0}
+
+    def __init__(self, capacity: int = 64, dt: float = 0.05, drain_per_unit: float = 0.0,
+                 charge_per_second: float = 0.04):
+        self.size = 0
+        self.rows: Dict[int, int] = {}
+        self.route_changes: Set[int] = set()
+        self.drain_per_unit = drain_per_unit
+        self.dt = dt
+        self.charge_per_second = charge_per_second
+        self._allocate(max(capacity, 1))
+
+    def _allocate(self, capacity: int):
+        old_size = self.size
+        arrays = {
+            "ids": np.zeros(capacity, dtype=np.int64),
+            "position": np.zeros((capacity, 2)),
+            "seg_start": np.zeros((capacity, 2)),
+            "seg_end": np.zeros((capacity, 2)),
+            "direction": np.zeros((capacity, 2)),
+            "remaining": np.zeros(capacity),
+            "speed": np.zeros(capacity),
+            "status": np.zeros(capacity, dtype=np.int8),
+            "on_segment": np.zeros(capacity, dtype=bool),
+            # Not in FIELDS: restored robots set their current_path_index themselves
+            "path_index": np.zeros(capacity, dtype=np.int32),
+            "dirty": np.zeros(capacity, dtype=bool),
+            "battery": np.zeros(capacity),
+        }
+        for name, array in arrays.items():
+            if old_size:
+                array[:old_size] = getattr(self, name)[:old_size]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, robot_id: int, position: Tuple[float, float], speed: float) -> int:
+        """Append a row for a new robot and return its row index"""
+        if self.size == self.capacity:
+            self._allocate(self.capacity * 2)
+        row = self.size
+        self.size += 1
+        self.rows[robot_id] = row
+        self.ids[row] = robot_id
+        self.position[row] = position
+        self.speed[row] = speed
+        self.status[row] = IDLE
+        self.on_segment[row] = False
+        self.battery[row] = 1.0
+        self.dirty[row] = True
+        return row
+
+    def start_segment(self, row: int, start: Tuple[float, float], end: Tuple[float, float]):
+        """Put a robot on the lane from start to end, keeping its current position"""
+        self.seg_start[row] = start
+        self.seg_end[row] = end
+        delta = self.seg_end[row] - self.seg_start[row]
+        length = float(np.hypot(delta[0], delta[1]))
+        if length < 0.0001:
+            self.direction[row] = 0.0
+            self.remaining[row] = 0.0
+        else:
+            self.direction[row] = delta / length
+            to_end = self.seg_end[row] - self.position[row]
+            self.remaining[row] = float(np.hypot(to_end[0], to_end[1]))
+        self.on_segment[row] = True
+
+    def rows_awaiting_segment(self) -> np.ndarray:
+        """Moving robots standing on a vertex, which must request their next lane"""
+        n = self.size
+        return np.flatnonzero((self.status[:n] == MOVING) & ~self.on_segment[:n])
+
+    def advance(self, rows: np.ndarray = None) -> np.ndarray:
+        """Move robots dt seconds along their segments and return the rows that arrived.
+
+        Defaults to every moving robot currently on a segment.
+        """
+        if rows is None:
+            n = self.size
+            rows = np.flatnonzero((self.status[:n] == MOVING) & self.on_segment[:n])
+        if not len(rows):
+            return rows
+        self.dirty[rows] = True
+        step = self.speed[rows] * self.dt
+        arrive = self.remaining[rows] <= step
+        if self.drain_per_unit:
+            moved = np.where(arrive, self.remaining[rows], step)
+            self.battery[rows] = np.maximum(self.battery[rows] - moved * self.drain_per_unit, 0.0)
+        going = rows[~arrive]
+        self.position[going] += self.direction[going] * step[~arrive, None]
+        self.remaining[going] -= step[~arrive]
+        arrived = rows[arrive]
+        self.position[arrived] = self.seg_end[arrived]
+        self.remaining[arrived] = 0.0
+        self.on_segment[arrived] = False
+        return arrived
+
+    def charge(self) -> np.ndarray:
+        """Charge the robots that are charging for one dt and return the rows that are now full"""
+        n = self.size
+        rows = np.flatnonzero(self.status[:n] == CHARGING)
+        if not len(rows):
+            return rows
+        self.battery[rows] = np.minimum(self.battery[rows] + self.charge_per_second * self.dt, 1.0)
+        self.dirty[rows] = True
+        return rows[self.battery[rows] >= 1.0]
+
+    def take_dirty(self) -> np.ndarray:
+        """Rows changed since the last call, clearing their flags"""
+        rows = np.flatnonzero(self.dirty[:self.size])
+        self.dirty[rows] = False
+        return rows
+
+    def get_state(self) -> Dict[str, Any]:
+        """Plain-list copy of the used rows and the battery rates, for snapshots"""
+        state = {name: getattr(self, name)[:self.size].tolist() for name in self.FIELDS}
+        state["drain_per_unit"] = self.drain_per_unit
+        state["charge_per_second"] = self.charge_per_second
+        return state
+
+    def set_state(self, state: Dict[str, Any]):
+        """Replace every row with the ones in a get_state() copy"""
+        size = len(state["ids"])
+        self.size = 0
+        self._allocate(max(size, 1))
+        for name in self.FIELDS:
+            array = getattr(self, name)
+            if name not in state:
+                array[:size] = self.DEFAULTS[name]
+                continue
+            array[:size] = np.asarray(state[name], dtype=array.dtype).reshape((size,) + array.shape[1:])
+        self.size = size
+        self.rows = {int(robot_id): row for row, robot_id in enumerate(state["ids"])}
+        self.drain_per_unit = state.get("drain_per_unit", self.drain_per_unit)
+        self.charge_per_second = state.get("charge_per_second", self.charge_per_second)
+
+    def all_idle(self) -> bool:
+        return bool(np.all(self.status[:self.size] == IDLE))
@@ -0,0 +1,374 @@
+import codecs
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from src.utils.logger import log_system_event
+
+CACHE_MAGIC = b"FLTG"
+CACHE_VERSION = 3
+_CACHE_SUFFIX = ".graph.bin"
+_ALIGN = 64
+
+class GraphSchemaError(ValueError):
+    """Raised when a navigation graph file does not have the expected layout"""
+
+class LevelArrays:
+    """Typed arrays for one level of a navigation graph.
+
+    ``coords`` is (n, 2) float64, ``lanes`` is (m, 2) int64 vertex indices and
+    ``speed_limits`` is (m,) float64 with 0 meaning unlimited. Vertex and lane
+    attribute dicts are kept as JSON and only decoded when asked for.
+    """
+
+    def __init__(self, coords: np.ndarray, lanes: np.ndarray, speed_limits: np.ndarray,
+                 vertex_attrs_json: bytes, lane_attrs_json: bytes):
+        self.coords = coords
+        self.lanes = lanes
+        self.speed_limits = speed_limits
+        self._vertex_attrs_json = vertex_attrs_json
+        self._lane_attrs_json = lane_attrs_json
+        self._vertex_attrs: Optional[List[Optional[Dict[str, Any]]]] = None
+        self._lane_attrs: Optional[List[Optional[Dict[str, Any]]]] = None
+
+    @property
+    def num_vertices(self) -> int:
+        return len(self.coords)
+
+    @property
+    def num_lanes(self) -> int:
+        return len(self.lanes)
+
+    @property
+    def vertex_attrs(self) -> List[Optional[Dict[str, Any]]]:
+        if self._vertex_attrs is None:
+            self._vertex_attrs = json.loads(self._vertex_attrs_json)
+        return self._vertex_attrs
+
+    @property
+    def lane_attrs(self) -> List[Optional[Dict[str, Any]]]:
+        if self._lane_attrs is None:
+            self._lane_attrs = json.loads(self._lane_attrs_json)
+        return self._lane_attrs
+
+    def vertex(self, index: int) -> List[Any]:
+        """A vertex in the file's [x, y, attrs] form"""
+        x, y = self.coords[index].tolist()
+        attrs = self.vertex_attrs[index]
+        return [x, y] if attrs is None else [x, y, attrs]
+
+    def to_lists(self) -> Dict[str, List[List[Any]]]:
+        """The level in the file's JSON form, as mutable lists"""
+        vertices = [
+            [x, y] if attrs is None else [x, y, attrs]
+            for (x, y), attrs in zip(self.coords.tolist(), self.vertex_attrs)
+        ]
+        lanes = [
+            [a, b] if attrs is None else [a, b, attrs]
+            for (a, b), attrs in zip(self.lanes.tolist(), self.lane_attrs)
+        ]
+        return {"vertices": vertices, "lanes": lanes}
+
+    @classmethod
+    def from_json(cls, level_name: str, level: Any) -> "LevelArrays":
+        """Validate one level of the JSON document and convert it"""
+        if not isinstance(level, dict):
+            raise GraphSchemaError(f"level {level_name!r}: expected an object, got {type(level).__name__}")
+        vertices = level.get("vertices", [])
+        lanes = level.get("lanes", [])
+        if not isinstance(vertices, list) or not isinstance(lanes, list):
+            raise GraphSchemaError(f"level {level_name!r}: 'vertices' and 'lanes' must be lists")
+
+        coords = np.empty((len(vertices), 2), dtype=np.float64)
+        vertex_attrs = []
+        for i, vertex in enumerate(vertices):
+            if not isinstance(vertex, list) or len(vertex) not in (2, 3):
+                raise GraphSchemaError(f"level {level_name!r}: vertex {i} must be [x, y] or [x, y, attrs]")
+            for value in vertex[:2]:
+                if not _is_number(value) or not math.isfinite(value):
+                    raise GraphSchemaError(f"level {level_name!r}: vertex {i} has a non-numeric coordinate {value!r}")
+            if len(vertex) == 3 and not isinstance(vertex[2], dict):
+                raise GraphSchemaError(f"level {level_name!r}: vertex {i} attributes must be an object")
+            if len(vertex) == 3 and "connector" in vertex[2]:
+                connector = vertex[2]["connector"]
+                cost = vertex[2].get("connector_cost", 0)
+                if not isinstance(connector, str) or not connector:
+                    raise GraphSchemaError(f"level {level_name!r}: vertex {i} has an invalid connector {connector!r}")
+                if not _is_number(cost) or cost < 0:
+                    raise GraphSchemaError(f"level {level_name!r}: vertex {i} has an invalid connector_cost {cost!r}")
+            if len(vertex) == 3 and "charger_slots" in vertex[2]:
+                slots = vertex[2]["charger_slots"]
+                if not isinstance(slots, int) or isinstance(slots, bool) or slots < 1:
+                    raise GraphSchemaError(f"level {level_name!r}: vertex {i} has an invalid charger_slots {slots!r}")
+            coords[i] = vertex[0], vertex[1]
+            vertex_attrs.append(vertex[2] if len(vertex) == 3 else None)
+
+        n = len(vertices)
+        endpoints = np.empty((len(lanes), 2), dtype=np.int64)
+        speed_limits = np.zeros(len(lanes), dtype=np.float64)
+        lane_attrs = []
+        for i, lane in enumerate(lanes):
+            if not isinstance(lane, list) or len(lane) not in (2, 3):
+                raise GraphSchemaError(f"level {level_name!r}: lane {i} must be [start, end] or [start, end, attrs]")
+            for index in lane[:2]:
+                if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < n:
+                    raise GraphSchemaError(
+                        f"level {level_name!r}: lane {i} references vertex {index!r} but the level has {n} vertices"
+                    )
+            attrs = None
+            if len(lane) == 3:
+                attrs = lane[2]
+                if not isinstance(attrs, dict):
+                    raise GraphSchemaError(f"level {level_name!r}: lane {i} attributes must be an object")
+                speed_limit = attrs.get("speed_limit", 0) or 0
+                if not _is_number(speed_limit) or speed_limit < 0:
+                    raise GraphSchemaError(f"level {level_name!r}: lane {i} has an invalid speed_limit {speed_limit!r}")
+                speed_limits[i] = speed_limit
+            endpoints[i] = lane[0], lane[1]
+            lane_attrs.append(attrs)
+        return cls(coords, endpoints, speed_limits, json.dumps(vertex_attrs).encode(), json.dumps(lane_attrs).encode())
+
+class GraphData:
+    """A whole navigation graph file as typed per-level arrays"""
+
+    def __init__(self, building_name: str, content_hash: str, levels: Dict[str, LevelArrays]):
+        self.building_name = building_name
+        self.content_hash = content_hash
+        self.levels = levels
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class _JsonLevelStream:
+    """Incremental reader for a navigation graph document.
+
+    Only one top-level value, or one level of the "levels" object, is ever
+    decoded at a time; the rest of the file is read in chunks as needed. The
+    SHA-256 of the raw bytes is computed along the way.
+    """
+
+    def __init__(self, f: BinaryIO, chunk_size: int = 1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.hash = hashlib.sha256()
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.saw_levels = False
+
+    def _fill(self, at_least: int) -> bool:
+        """Read until at_least more characters are buffered or the file ends"""
+        if self.pos > self.chunk_size:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        target = len(self.buffer) + at_least
+        while not self.eof and len(self.buffer) < target:
+            chunk = self.f.read(self.chunk_size)
+            self.hash.update(chunk)
+            self.eof = not chunk
+            self.buffer += self._decoder.decode(chunk, final=self.eof)
+        return len(self.buffer) >= target
+
+    def _peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill(1):
+                return self.buffer[self.pos:self.pos + 1]
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise GraphSchemaError(f"not valid JSON: expected {char!r} at character {self.pos}")
+        self.pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buffer, self.pos)
+            except ValueError as e:
+                # Probably cut off by the end of the buffer; read as much again and retry
+                if self.eof:
+                    raise GraphSchemaError(f"not valid JSON: {e}") from e
+                self._fill(max(len(self.buffer) - self.pos, self.chunk_size))
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self._fill(self.chunk_size)
+                continue
+            self.pos = end
+            return value
+
+    def _members(self) -> Iterator[str]:
+        """Keys of the object starting here; the caller consumes each value"""
+        self._expect("{")
+        if self._peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise GraphSchemaError(f"not valid JSON: object key expected at character {self.pos}")
+            self._expect(":")
+            yield key
+            if self._peek() == ",":
+                self.pos += 1
+                continue
+            self._expect("}")
+            return
+
+    def read(self) -> Iterator[Tuple[Optional[str], str, Any]]:
+        """(None, key, value) for top-level members and ("levels", name, level) for each level"""
+        if self._peek() != "{":
+            raise GraphSchemaError("expected an object with a 'levels' object")
+        for key in self._members():
+            if key == "levels":
+                if self._peek() != "{":
+                    raise GraphSchemaError("expected an object with a 'levels' object")
+                self.saw_levels = True
+                for name in self._members():
+                    yield "levels", name, self._value()
+            else:
+                yield None, key, self._value()
+        if self._peek():
+            raise GraphSchemaError(f"not valid JSON: extra data at character {self.pos}")
+
+def parse_graph(f: BinaryIO) -> GraphData:
+    """Parse and validate the JSON form of a navigation graph, one level at a time"""
+    stream = _JsonLevelStream(f)
+    building_name = "Unknown"
+    levels: Dict[str, LevelArrays] = {}
+    for section, key, value in stream.read():
+        if section == "levels":
+            levels[key] = LevelArrays.from_json(key, value)
+        elif key == "building_name":
+            building_name = value
+    if not stream.saw_levels:
+        raise GraphSchemaError("expected an object with a 'levels' object")
+    return GraphData(building_name, stream.hash.hexdigest(), levels)
+
+def cache_path_for(file_path: str, cache_dir: str) -> str:
+    """Cache file for the current version of file_path, keyed by its size and mtime"""
+    stat = os.stat(file_path)
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(cache_dir, f"{stem}.{stat.st_size}-{stat.st_mtime_ns}{_CACHE_SUFFIX}")
+
+def load_graph(file_path: str, cache_dir: Optional[str] = None) -> GraphData:
+    """
+    Load a navigation graph, from its binary cache when that is up to date.
+    The cache is memory-mapped, so processes loading the same graph share its
+    pages. Without cache_dir, the JSON is always parsed.
+    """
+    cache_path = cache_path_for(file_path, cache_dir) if cache_dir else None
+    if cache_path is not None:
+        graph = read_cache(cache_path)
+        if graph is not None:
+            return graph
+    with open(file_path, "rb") as f:
+        graph = parse_graph(f)
+    if cache_path is not None:
+        try:
+            write_cache(cache_path, graph)
+        except OSError as e:
+            log_system_event("Warning", "Could not cache navigation graph: %s", e)
+    return graph
+
+def write_cache(path: str, graph: GraphData):
+    """Write graph as a header followed by aligned raw arrays, replacing older caches of the same file"""
+    blobs: List[bytes] = []
+    offset = 0
+    levels_header = []
+
+    def add(data: bytes) -> Tuple[int, int]:
+        nonlocal offset
+        start = offset
+        blobs.append(data)
+        offset += len(data)
+        padding = -offset % _ALIGN
+        blobs.append(b"\0" * padding)
+        offset += padding
+        return start, len(data)
+
+    for name, level in graph.levels.items():
+        levels_header.append({
+            "name": name,
+            "num_vertices": level.num_vertices,
+            "num_lanes": level.num_lanes,
+            "coords": add(np.ascontiguousarray(level.coords, dtype="<f8").tobytes()),
+            "lanes": add(np.ascontiguousarray(level.lanes, dtype="<i8").tobytes()),
+            "speed_limits": add(np.ascontiguousarray(level.speed_limits, dtype="<f8").tobytes()),
+            "vertex_attrs": add(level._vertex_attrs_json),
+            "lane_attrs": add(level._lane_attrs_json),
+        })
+    header = json.dumps({
+        "building_name": graph.building_name,
+        "content_hash": graph.content_hash,
+        "levels": levels_header,
+    }).encode()
+    prefix = CACHE_MAGIC + struct.pack("<II", CACHE_VERSION, len(header)) + header
+    prefix += b"\0" * (-len(prefix) % _ALIGN)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(prefix)
+        f.writelines(blobs)
+    os.replace(tmp_path, path)
+
+    # Older caches of this source only; writing site.v2.json's must not delete site.json's
+    cache_name = os.path.basename(path)
+    stem = cache_name[:-len(_CACHE_SUFFIX)].rsplit(".", 1)[0]
+    stale = re.compile(re.escape(stem) + r"\.\d+-\d+" + re.escape(_CACHE_SUFFIX))
+    for name in os.listdir(os.path.dirname(path)):
+        if name != cache_name and stale.fullmatch(name):
+            try:
+                os.remove(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                pass
+
+def read_cache(path: str) -> Optional[GraphData]:
+    """Map a cache written by write_cache, or None if it is missing or unreadable"""
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if mapped[:4] != CACHE_MAGIC:
+            return None
+        version, header_length = struct.unpack_from("<II", mapped, 4)
+        if version != CACHE_VERSION:
+            return None
+        header = json.loads(mapped[12:12 + header_length])
+        base = 12 + header_length
+        base += -base % _ALIGN
+
+        def array(span: List[int], dtype: str, shape: Tuple[int, ...]) -> np.ndarray:
+            start, length = span
+            count = length // np.dtype(dtype).itemsize
+            return np.frombuffer(mapped, dtype=dtype, count=count, offset=base + start).reshape(shape)
+
+        def blob(span: List[int]) -> bytes:
+            start, length = span
+            return mapped[base + start:base + start + length]
+
+        levels = {}
+        for entry in header["levels"]:
+            n, m = entry["num_vertices"], entry["num_lanes"]
+            levels[entry["name"]] = LevelArrays(
+                array(entry["coords"], "<f8", (n, 2)),
+                array(entry["lanes"], "<i8", (m, 2)),
+                array(entry["speed_limits"], "<f8", (m,)),
+                blob(entry["vertex_attrs"]),
+                blob(entry["lane_attrs"]),
+            )
+        return GraphData(header["building_name"], header["content_hash"], levels)
+    except (KeyError, ValueError, struct.error):
+        return None
@@ -0,0 +1,174 @@
+import heapq
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# An abstract node: a vertex on a level. The search's start and goal are the
+# only non-connector nodes.
+Node = Tuple[str, int]
+
+class RouteLeg(NamedTuple):
+    """Part of a route that stays on one level"""
+    level: str
+    path: List[Tuple[float, float]]
+    path_indices: List[int]
+
+class LevelRouter:
+    """Hierarchical planner for routes between levels.
+
+    Connector vertices (lifts, stairs, ramps) carry a ``connector`` attribute;
+    vertices with the same connector id on different levels are linked, and
+    changing level there costs the larger of their ``connector_cost``
+    attributes (in lane-length units, default transfer_cost).
+
+    Routing first searches an abstract graph whose nodes are the connectors
+    and whose edges are the transfers plus the shortest distance between
+    every pair of connectors on the same level. Those intra-level distances
+    are computed with one Dijkstra per connector and cached until the level
+    changes. The connectors along the abstract route then split it into legs,
+    each refined with the level's own find_path, so a cross-building query
+    never searches more than one level's graph at a time.
+    """
+
+    def __init__(self, nav_graph, transfer_cost: float = 10.0):
+        self.nav_graph = nav_graph
+        self.transfer_cost = transfer_cost
+        self._connectors: Optional[Dict[str, Dict[int, str]]] = None
+        self._by_id: Dict[str, List[Node]] = {}
+        self._costs: Dict[Node, float] = {}
+        # level -> (level version, {connector: {other connector: distance}})
+        self._distances: Dict[str, Tuple[int, Dict[int, Dict[int, float]]]] = {}
+
+    def connectors(self, level_name: str) -> Dict[int, str]:
+        """Connector vertices of a level, mapped to their connector id"""
+        if self._connectors is None:
+            self._index_connectors()
+        return self._connectors.get(level_name, {})
+
+    def _index_connectors(self):
+        self._connectors = {}
+        for level_name in self.nav_graph.get_level_names():
+            level_connectors = {}
+            for index, attrs in enumerate(self.nav_graph.get_vertex_attrs(level_name)):
+                if attrs and attrs.get("connector"):
+                    level_connectors[index] = attrs["connector"]
+                    self._by_id.setdefault(attrs["connector"], []).append((level_name, index))
+                    self._costs[(level_name, index)] = attrs.get("connector_cost", self.transfer_cost)
+            if level_connectors:
+                self._connectors[level_name] = level_connectors
+
+    def connector_distances(self, level_name: str) -> Dict[int, Dict[int, float]]:
+        """Shortest distances between the level's connectors, cached per level version"""
+        version = self.nav_graph.get_version(level_name)
+        cached = self._distances.get(level_name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        connectors = list(self.connectors(level_name))
+        distances = {source: self.distances_from(level_name, source, connectors) for source in connectors}
+        self._distances[level_name] = (version, distances)
+        return distances
+
+    def distances_from(self, level_name: str, source: int, targets: Iterable[int]) -> Dict[int, float]:
+        """Dijkstra over lane lengths from source, stopping once every reachable target is settled"""
+        graph = self.nav_graph.get_compiled(level_name)
+        indptr, indices, lengths = graph._indptr, graph._indices, graph._lengths
+        remaining = set(targets)
+        found = {}
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap and remaining:
+            distance, vertex = heapq.heappop(heap)
+            if distance > best[vertex]:
+                continue
+            if vertex in remaining:
+                remaining.discard(vertex)
+                found[vertex] = distance
+            for edge in range(indptr[vertex], indptr[vertex + 1]):
+                neighbor = indices[edge]
+                candidate = distance + lengths[edge]
+                if candidate < best.get(neighbor, float('inf')):
+                    best[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        return found
+
+    def find_route(self, start_level: str, start_idx: int, end_level: str, end_idx: int) -> List[RouteLeg]:
+        """
+        Legs of the shortest route from start_idx on start_level to end_idx on
+        end_level, one per level visited in order, or [] if there is none.
+        Routes within a level use find_path directly and only go through
+        connectors when the level alone does not connect the two vertices.
+        """
+        nav_graph = self.nav_graph
+        if start_level == end_level:
+            path, path_indices = nav_graph.find_path(start_level, start_idx, end_idx)
+            if path_indices:
+                return [RouteLeg(start_level, path, path_indices)]
+
+        nodes = self._abstract_route((start_level, start_idx), (end_level, end_idx))
+        if nodes is None:
+            return []
+        legs = []
+        first = 0
+        for i in range(1, len(nodes) + 1):
+            # A leg ends where the next node is on another level (or the route ends)
+            if i < len(nodes) and nodes[i][0] == nodes[first][0]:
+                continue
+            level_name = nodes[first][0]
+            path, path_indices = nav_graph.find_path(level_name, nodes[first][1], nodes[i - 1][1])
+            if not path_indices:
+                return []
+            legs.append(RouteLeg(level_name, path, path_indices))
+            first = i
+        return legs
+
+    def _abstract_route(self, start: Node, goal: Node) -> Optional[List[Node]]:
+        """Dijkstra over the connector graph; returns the nodes from start to goal"""
+        start_level, end_level = start[0], goal[0]
+        start_connectors = self.connectors(start_level)
+        goal_connectors = self.connectors(end_level)
+        if not start_connectors or not goal_connectors:
+            return None
+        # Lanes are undirected, so the distances to the goal are its distances out
+        from_start = self.distances_from(start_level, start[1], start_connectors)
+        to_goal = self.distances_from(end_level, goal[1], goal_connectors)
+
+        best: Dict[Node, float] = {start: 0.0}
+        came_from: Dict[Node, Node] = {}
+        heap = []
+        if start[1] in start_connectors:
+            # Starting on a connector: it is the first node itself, not a neighbour of the start
+            heapq.heappush(heap, (0.0, start))
+        for vertex, distance in from_start.items():
+            if vertex == start[1]:
+                continue
+            node = (start_level, vertex)
+            best[node] = distance
+            came_from[node] = start
+            heapq.heappush(heap, (distance, node))
+
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > best.get(node, float('inf')):
+                continue
+            if node == goal:
+                route = [node]
+                while node != start and node in came_from:
+                    node = came_from[node]
+                    route.append(node)
+                route.reverse()
+                return route
+            level_name, vertex = node
+            neighbors = [
+                ((level_name, other), length)
+                for other, length in self.connector_distances(level_name)[vertex].items() if other != vertex
+            ]
+            for other in self._by_id[self.connectors(level_name)[vertex]]:
+                if other[0] != level_name:
+                    neighbors.append((other, max(self._costs[node], self._costs[other])))
+            if level_name == end_level and vertex in to_goal and vertex != goal[1]:
+                neighbors.append((goal, to_goal[vertex]))
+            for neighbor, length in neighbors:
+                candidate = distance + length
+                if candidate < best.get(neighbor, float('inf')):
+                    best[neighbor] = candidate
+                    came_from[neighbor] = node
+                    heapq.heappush(heap, (candidate, neighbor))
+        return None
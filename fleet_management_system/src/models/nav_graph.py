@@ -1,73 +1,429 @@
-import json
-from typing import Dict, List, Tuple, Any
+import math
+import os
+import hashlib
+from concurrent.futures import Future
+from typing import Dict, List, Sequence, Set, Tuple, Any, Optional
 import heapq
+import numpy as np
+from collections import OrderedDict
+from src.models.batch_planner import BatchPlanner
+from src.models.charger_field import ChargerField
+from src.models.compiled_graph import CompiledLevel
+from src.models.graph_loader import LevelArrays, load_graph
+from src.models.level_router import LevelRouter, RouteLeg
+from src.models.path_cache import PathCache
+from src.models.path_table import PathTable
+from src.models.spatial_index import SpatialGrid
+from src.utils.logger import log_system_event
 
 class NavGraph:
-    def __init__(self, file_path: str):
-        with open(file_path) as f:
-            self.graph_data = json.load(f)
-        
-        self.levels = self.graph_data.get("levels", {})
-        self.building_name = self.graph_data.get("building_name", "Unknown")
+    def __init__(self, file_path: str, precompute_paths: bool = False,
+                 max_table_vertices: int = 1500, cache_dir: Optional[str] = None,
+                 max_resident_levels: Optional[int] = 8, path_cache_size: int = 4096,
+                 max_distance_fields: int = 64):
+        """
+        With precompute_paths, levels of up to max_table_vertices vertices get an
+        all-pairs path table, cached on disk under cache_dir (by default a
+        .graph_cache directory next to the JSON) keyed by the file's content hash.
+        Larger levels keep using on-demand A*.
+
+        The file is validated and converted to typed arrays once, then kept in
+        a memory-mapped binary cache in the same directory, keyed by the
+        file's size and mtime. Raises GraphSchemaError for malformed files.
+        Levels are compiled on first use, and only the max_resident_levels most
+        recently used ones (None for all) keep their compiled form, path table
+        and spatial index in memory.
+
+        Up to path_cache_size find_path results are kept in an LRU cache (0
+        disables it); lane edits only drop the entries they can affect. The
+        max_distance_fields most recently used distance_field() results are
+        kept too.
+        """
+        self.file_path = file_path
+        self.precompute_paths = precompute_paths
+        self.max_table_vertices = max_table_vertices
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(file_path)), ".graph_cache")
+        self._path_tables: Dict[str, Optional[PathTable]] = {}
+        self._spatial_indexes: Dict[str, SpatialGrid] = {}
+
+        graph = load_graph(file_path, self.cache_dir)
+        self.content_hash = graph.content_hash
+        self.building_name = graph.building_name
+        self._level_arrays: Dict[str, LevelArrays] = graph.levels
+        # JSON-shaped levels, only built for callers that want the lists or edit lanes
+        self.levels: Dict[str, Dict[str, List]] = {}
+        self.max_resident_levels = max_resident_levels
+        self._compiled: "OrderedDict[str, CompiledLevel]" = OrderedDict()
+        self._versions: Dict[str, int] = {name: 0 for name in self._level_arrays}
+        self.path_cache = PathCache(path_cache_size)
+        self.max_distance_fields = max_distance_fields
+        # (level, vertex) -> (level version, distances)
+        self._distance_fields: "OrderedDict[Tuple[str, int], Tuple[int, np.ndarray]]" = OrderedDict()
+        # level -> (level version, field)
+        self._charger_fields: Dict[str, Tuple[int, ChargerField]] = {}
+        self._default_speed = 1.0
+        self.last_expansions = 0
+        self.router = LevelRouter(self)
+        self.batch_planner = BatchPlanner(self)
+        if precompute_paths:
+            for level_name in self._level_arrays:
+                self.get_path_table(level_name)
     
+    @property
+    def default_speed(self) -> float:
+        """Speed on lanes without a speed_limit, for travel-time planning"""
+        return self._default_speed
+
+    @default_speed.setter
+    def default_speed(self, speed: float):
+        if speed != self._default_speed:
+            for level_name in self._level_arrays:
+                self.path_cache.invalidate_level(level_name, use_speed_limits=True)
+        self._default_speed = speed
+
     def get_level_names(self) -> List[str]:
-        return list(self.levels.keys())
+        return list(self._level_arrays.keys())
+
+    def _get_level(self, level_name: str) -> Dict[str, List]:
+        level = self.levels.get(level_name)
+        if level is None:
+            arrays = self._level_arrays.get(level_name)
+            if arrays is None:
+                return {}
+            level = arrays.to_lists()
+            self.levels[level_name] = level
+        return level
     
     def get_vertices(self, level_name: str) -> List[Tuple[float, float, Dict[str, Any]]]:
-        level = self.levels.get(level_name, {})
-        return level.get("vertices", [])
+        return self._get_level(level_name).get("vertices", [])
     
     def get_lanes(self, level_name: str) -> List[List[int]]:
-        level = self.levels.get(level_name, {})
-        return level.get("lanes", [])
+        return self._get_level(level_name).get("lanes", [])
     
     def get_vertex_by_index(self, level_name: str, index: int) -> Tuple[float, float, Dict[str, Any]]:
+        if level_name not in self.levels and level_name in self._level_arrays:
+            arrays = self._level_arrays[level_name]
+            return arrays.vertex(index) if 0 <= index < arrays.num_vertices else None
         vertices = self.get_vertices(level_name)
         if 0 <= index < len(vertices):
             return vertices[index]
         return None
-    
 
-    #So here i have used the A* algorithm to find the shortest path as it will be the optimal algorithm in this case
-    def find_path(self, level_name: str, start_idx: int, end_idx: int) -> Tuple[List[Tuple[float, float]], List[int]]:
-        vertices = self.get_vertices(level_name)
+    def get_vertex_count(self, level_name: str) -> int:
+        arrays = self._level_arrays.get(level_name)
+        if level_name not in self.levels and arrays is not None:
+            return arrays.num_vertices
+        return len(self.get_vertices(level_name))
+
+    def get_vertex_attrs(self, level_name: str) -> List[Optional[Dict[str, Any]]]:
+        """Attribute dict of every vertex of a level (None where a vertex has none)"""
+        if level_name not in self.levels and level_name in self._level_arrays:
+            return self._level_arrays[level_name].vertex_attrs
+        return [vertex[2] if len(vertex) > 2 else None for vertex in self.get_vertices(level_name)]
+
+    def get_compiled(self, level_name: str) -> CompiledLevel:
+        """Compiled adjacency for a level, rebuilt only after the level changes"""
+        compiled = self._compiled.get(level_name)
+        if compiled is not None:
+            self._compiled.move_to_end(level_name)
+            return compiled
+        arrays = self._level_arrays.get(level_name)
+        if arrays is not None and self.get_version(level_name) == 0:
+            compiled = CompiledLevel.from_arrays(arrays.coords, arrays.lanes, arrays.speed_limits)
+        else:
+            compiled = CompiledLevel(self.get_vertices(level_name), self.get_lanes(level_name))
+        self._compiled[level_name] = compiled
+        self._evict_levels()
+        return compiled
+
+    def _evict_levels(self):
+        """Drop derived data of the least recently used levels beyond max_resident_levels"""
+        while self.max_resident_levels and len(self._compiled) > self.max_resident_levels:
+            level_name, _ = self._compiled.popitem(last=False)
+            self._path_tables.pop(level_name, None)
+            self._spatial_indexes.pop(level_name, None)
+            # Edited levels only exist as lists, so those have to stay
+            if self.get_version(level_name) == 0:
+                self.levels.pop(level_name, None)
+            log_system_event("Level evicted", "%s", level_name)
+
+    def get_version(self, level_name: str) -> int:
+        """Counter bumped on every change to a level, for consumers caching derived data"""
+        return self._versions.get(level_name, 0)
+
+    def get_spatial_index(self, level_name: str) -> SpatialGrid:
+        """Grid index of the level's vertices in world coordinates, keyed by vertex index"""
+        index = self._spatial_indexes.get(level_name)
+        if index is None:
+            coords = self.get_compiled(level_name)._coords
+            index = SpatialGrid.from_points((i, x, y) for i, (x, y) in enumerate(coords))
+            self._spatial_indexes[level_name] = index
+        return index
+
+    def find_closest_vertex(self, level_name: str, position: Tuple[float, float],
+                            max_distance: float = math.inf) -> Optional[int]:
+        """Index of the vertex nearest to position, or None if none is within max_distance"""
+        nearest = self.get_spatial_index(level_name).nearest(position[0], position[1], max_distance)
+        return None if nearest is None else nearest[0]
+
+    def get_path_table(self, level_name: str) -> Optional[PathTable]:
+        """All-pairs path table for a level, or None if disabled or the level is too large"""
+        if not self.precompute_paths:
+            return None
+        if level_name in self._path_tables:
+            return self._path_tables[level_name]
+
+        graph = self.get_compiled(level_name)
+        table = None
+        if graph.num_vertices <= self.max_table_vertices:
+            # Only the graph as loaded from disk matches the content hash
+            cache_path = self._path_table_cache_path(level_name) if self.get_version(level_name) == 0 else None
+            if cache_path and os.path.exists(cache_path):
+                table = PathTable.load(cache_path)
+                if table is not None and table.num_vertices != graph.num_vertices:
+                    table = None
+            if table is None:
+                table = PathTable.compute(graph)
+                log_system_event("Path table computed", "level %s, %d vertices", level_name, graph.num_vertices)
+                if cache_path:
+                    try:
+                        table.save(cache_path)
+                    except OSError as e:
+                        log_system_event("Warning", "Could not cache path table: %s", e)
+        self._path_tables[level_name] = table
+        return table
+
+    def distance_field(self, level_name: str, vertex_idx: int) -> np.ndarray:
+        """
+        Lane-length distance from vertex_idx to every vertex of the level
+        (inf where unreachable), as a read-only array. Lanes are undirected,
+        so it is also the distance from every vertex to vertex_idx.
+        """
+        table = self.get_path_table(level_name)
+        if table is not None:
+            # A view, so callers cannot write through it into the shared table
+            row = table.dist[vertex_idx].view()
+            row.flags.writeable = False
+            return row
+        key = (level_name, vertex_idx)
+        version = self.get_version(level_name)
+        cached = self._distance_fields.get(key)
+        if cached is not None and cached[0] == version:
+            self._distance_fields.move_to_end(key)
+            return cached[1]
+
+        graph = self.get_compiled(level_name)
+        indptr, indices, lengths = graph._indptr, graph._indices, graph._lengths
+        inf = float('inf')
+        dist = [inf] * graph.num_vertices
+        dist[vertex_idx] = 0.0
+        heap = [(0.0, vertex_idx)]
+        while heap:
+            distance, vertex = heapq.heappop(heap)
+            if distance > dist[vertex]:
+                continue
+            for edge in range(indptr[vertex], indptr[vertex + 1]):
+                neighbor = indices[edge]
+                candidate = distance + lengths[edge]
+                if candidate < dist[neighbor]:
+                    dist[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        field = np.array(dist)
+        field.flags.writeable = False
+        if self.max_distance_fields:
+            self._distance_fields[key] = (version, field)
+            while len(self._distance_fields) > self.max_distance_fields:
+                self._distance_fields.popitem(last=False)
+        return field
+
+    def get_charger_field(self, level_name: str) -> ChargerField:
+        """Nearest charger and its distance for every vertex of a level, computed once per level version"""
+        version = self.get_version(level_name)
+        cached = self._charger_fields.get(level_name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        field = ChargerField.compute(self.get_compiled(level_name), self.get_vertex_attrs(level_name))
+        self._charger_fields[level_name] = (version, field)
+        log_system_event("Charger field computed", "level %s, %d chargers", level_name, len(field))
+        return field
+
+    def _path_table_cache_path(self, level_name: str) -> str:
+        level_hash = hashlib.sha256(level_name.encode()).hexdigest()[:8]
+        stem = os.path.splitext(os.path.basename(self.file_path))[0]
+        return os.path.join(self.cache_dir, f"{stem}.{self.content_hash[:16]}.{level_hash}.paths.npz")
+
+    def invalidate(self, level_name: str):
+        """Drop everything derived from a level, including its cached paths"""
+        self._invalidate_compiled(level_name)
+        self.path_cache.invalidate_level(level_name)
+
+    def invalidate_lane(self, level_name: str, start_idx: int, end_idx: int):
+        """
+        Drop the cached paths through a lane, e.g. when it is closed or slowed
+        down outside of the graph. Paths that avoid it are still optimal.
+        """
+        self.path_cache.invalidate_lane(level_name, start_idx, end_idx)
+
+    def _invalidate_compiled(self, level_name: str):
+        self._compiled.pop(level_name, None)
+        self._path_tables.pop(level_name, None)
+        self._spatial_indexes.pop(level_name, None)
+        self._versions[level_name] = self._versions.get(level_name, 0) + 1
+
+    def path_cache_stats(self) -> Dict[str, float]:
+        """Size, hits, misses, evictions and hit rate of the path cache"""
+        return self.path_cache.stats()
+
+    def add_lane(self, level_name: str, start_idx: int, end_idx: int, attrs: Dict[str, Any] = None):
+        self._get_level(level_name).setdefault("lanes", []).append([start_idx, end_idx, attrs or {}])
+        # A new lane can shorten any path on the level
+        self.invalidate(level_name)
+
+    @staticmethod
+    def _joins(lane: List[Any], start_idx: int, end_idx: int) -> bool:
+        """Whether lane joins the two vertices, in either direction; lanes are driven both ways"""
+        return (lane[0] == start_idx and lane[1] == end_idx) or (lane[0] == end_idx and lane[1] == start_idx)
+
+    def remove_lane(self, level_name: str, start_idx: int, end_idx: int) -> bool:
+        """
+        Remove the lane between start and end, including a copy listed in the
+        other direction. Returns False if there was no such lane.
+        """
         lanes = self.get_lanes(level_name)
-        
-        graph = {i: [] for i in range(len(vertices))}
+        kept = [lane for lane in lanes if not self._joins(lane, start_idx, end_idx)]
+        if len(kept) == len(lanes):
+            return False
+        lanes[:] = kept
+        self._invalidate_compiled(level_name)
+        self.path_cache.invalidate_lane(level_name, start_idx, end_idx)
+        return True
+
+    def set_lane_speed_limit(self, level_name: str, start_idx: int, end_idx: int, speed_limit: float) -> bool:
+        """
+        Edit the speed limit of the lane between start and end, including a
+        copy listed in the other direction. Returns False if there was no such
+        lane.
+        """
+        lanes = [lane for lane in self.get_lanes(level_name) if self._joins(lane, start_idx, end_idx)]
+        if not lanes:
+            return False
+        # The compiled graph drives both directions at the first-listed copy's limit
+        old_speed = (lanes[0][2].get("speed_limit") if len(lanes[0]) > 2 else None) or self.default_speed
         for lane in lanes:
-            a, b = lane[0], lane[1]
-            graph[a].append(b)
-            graph[b].append(a)
-        
-        open_set = []
-        heapq.heappush(open_set, (0, start_idx))
+            if len(lane) < 3:
+                lane.append({})
+            lane[2]["speed_limit"] = speed_limit
+        self._invalidate_compiled(level_name)
+        # Distances are unchanged; travel times only got worse through this lane, unless it sped up
+        if (speed_limit or self.default_speed) < old_speed:
+            self.path_cache.invalidate_lane(level_name, start_idx, end_idx, use_speed_limits=True)
+        else:
+            self.path_cache.invalidate_level(level_name, use_speed_limits=True)
+        return True
+
+    def find_path(self, level_name: str, start_idx: int, end_idx: int,
+                  use_speed_limits: bool = False,
+                  avoid_lanes: Optional[Set[Tuple[int, int]]] = None) -> Tuple[List[Tuple[float, float]], List[int]]:
+        """A* over lane lengths with a Euclidean heuristic.
+
+        With use_speed_limits the cost is travel time instead of distance, each
+        lane driven at its speed_limit (or default_speed where it has none).
+        Lanes in avoid_lanes are not used in either direction.
+        The returned path runs from start_idx to end_idx inclusive. Results
+        without avoid_lanes come from, and go into, the path cache.
+        """
+        graph = self.get_compiled(level_name)
+        if not (0 <= start_idx < graph.num_vertices and 0 <= end_idx < graph.num_vertices):
+            return [], []
+        if avoid_lanes:
+            return self._search(level_name, graph, start_idx, end_idx, use_speed_limits, avoid_lanes)
+
+        self.batch_planner.store_results()
+        key = (level_name, start_idx, end_idx, use_speed_limits)
+        cached = self.path_cache.get(key)
+        if cached is not None:
+            self.last_expansions = 0
+            return cached
+        result = self._search(level_name, graph, start_idx, end_idx, use_speed_limits, None)
+        self.path_cache.put(key, result)
+        return result
+
+    def _search(self, level_name: str, graph: CompiledLevel, start_idx: int, end_idx: int, use_speed_limits: bool,
+                avoid_lanes: Optional[Set[Tuple[int, int]]]) -> Tuple[List[Tuple[float, float]], List[int]]:
+        coords = graph._coords
+
+        table = None if use_speed_limits or avoid_lanes else self.get_path_table(level_name)
+        if table is not None:
+            path_indices = table.path_indices(start_idx, end_idx)
+            return [coords[idx][:2] for idx in path_indices], path_indices
+
+        indptr, indices = graph._indptr, graph._indices
+        if use_speed_limits:
+            costs = graph.edge_costs(self.default_speed)
+            inv_speed = 1.0 / graph.max_speed(self.default_speed)
+        else:
+            costs = graph._lengths
+            inv_speed = 1.0
+        goal_x, goal_y = coords[end_idx]
+
+        def heuristic(v: int) -> float:
+            x, y = coords[v]
+            return math.hypot(goal_x - x, goal_y - y) * inv_speed
+
+        # Ties on f are broken towards the goal (smaller h) so grid-like maps
+        # don't expand every equally-short detour
+        start_h = heuristic(start_idx)
+        open_set = [(start_h, start_h, start_idx)]
         came_from = {}
-        g_score = {i: float('inf') for i in range(len(vertices))}
-        g_score[start_idx] = 0
-        
+        g_score = {start_idx: 0.0}
+        closed = set()
+        inf = float('inf')
+        self.last_expansions = 0
+
         while open_set:
-            _, current = heapq.heappop(open_set)
-            
+            _, _, current = heapq.heappop(open_set)
+            if current in closed:
+                continue
+            closed.add(current)
+            self.last_expansions += 1
+
             if current == end_idx:
-                path_indices = []
+                path_indices = [current]
                 while current in came_from:
-                    path_indices.append(current)
                     current = came_from[current]
+                    path_indices.append(current)
                 path_indices.reverse()
-                path_indices.append(end_idx)  
-
-                path_coords = []
-                for idx in path_indices:
-                    if 0 <= idx < len(vertices):
-                        path_coords.append(vertices[idx][:2])
-                
+                path_coords = [coords[idx][:2] for idx in path_indices]
                 return path_coords, path_indices
-            
-            for neighbor in graph[current]:
-                tentative_g_score = g_score[current] + 1
-                if tentative_g_score < g_score[neighbor]:
+
+            current_g = g_score[current]
+            for edge in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[edge]
+                if neighbor in closed:
+                    continue
+                if avoid_lanes and ((current, neighbor) in avoid_lanes or (neighbor, current) in avoid_lanes):
+                    continue
+                tentative_g_score = current_g + costs[edge]
+                if tentative_g_score < g_score.get(neighbor, inf):
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g_score
-                    heapq.heappush(open_set, (tentative_g_score, neighbor))
+                    h = heuristic(neighbor)
+                    heapq.heappush(open_set, (tentative_g_score + h, h, neighbor))
         
-        return [], [] 
\ No newline at end of file
+        return [], []
+
+    def find_paths(self, level_name: str, requests: Sequence[Tuple[int, int]],
+                   parallel: bool = False) -> List[Future]:
+        """
+        Plan many (start_idx, end_idx) paths without blocking the caller; one
+        future per request resolves to its (path_coords, path_indices). With
+        parallel the searches fan out over worker processes. See BatchPlanner.
+        """
+        return self.batch_planner.submit(level_name, requests, parallel)
+
+    def find_route(self, start_level: str, start_idx: int, end_level: str, end_idx: int) -> List[RouteLeg]:
+        """
+        Route between vertices on any two levels through connector vertices
+        (lifts, stairs), as one leg per level visited. See LevelRouter.
+        """
+        return self.router.find_route(start_level, start_idx, end_level, end_idx)
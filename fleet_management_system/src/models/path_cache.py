@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# (level, start_idx, end_idx, use_speed_limits)
+PathKey = Tuple[str, int, int, bool]
+PathResult = Tuple[List[Tuple[float, float]], List[int]]
+
+class PathCache:
+    """Bounded LRU cache of find_path results.
+
+    Entries are indexed by level and by every lane their path uses, so an
+    edit can drop just the paths it may have changed: closing a lane or
+    slowing it down only affects paths through it, while a new lane or a
+    faster one can shorten any path on the level. Results are copied on the
+    way in and out, so callers are free to mutate them.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[PathKey, PathResult]" = OrderedDict()
+        self._by_level: Dict[str, Set[PathKey]] = {}
+        self._by_lane: Dict[Tuple[str, int, int], Set[PathKey]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _lanes(level_name: str, path_indices: List[int]):
+        for a, b in zip(path_indices, path_indices[1:]):
+            yield (level_name, a, b) if a < b else (level_name, b, a)
+
+    def get(self, key: PathKey) -> Optional[PathResult]:
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return list(result[0]), list(result[1])
+
+    def put(self, key: PathKey, result: PathResult):
+        if self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self._discard(key)
+        path_coords, path_indices = result
+        self._entries[key] = (list(path_coords), list(path_indices))
+        self._by_level.setdefault(key[0], set()).add(key)
+        for lane in self._lanes(key[0], path_indices):
+            self._by_lane.setdefault(lane, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _discard(self, key: PathKey):
+        _, path_indices = self._entries.pop(key)
+        level_keys = self._by_level.get(key[0])
+        if level_keys is not None:
+            level_keys.discard(key)
+            if not level_keys:
+                del self._by_level[key[0]]
+        for lane in self._lanes(key[0], path_indices):
+            lane_keys = self._by_lane.get(lane)
+            if lane_keys is not None:
+                lane_keys.discard(key)
+                if not lane_keys:
+                    del self._by_lane[lane]
+
+    def invalidate_level(self, level_name: str, use_speed_limits: Optional[bool] = None) -> int:
+        """
+        Drop the level's entries, or with use_speed_limits only those of that
+        cost mode. Returns how many were dropped.
+        """
+        keys = [key for key in self._by_level.get(level_name, ())
+                if use_speed_limits is None or key[3] == use_speed_limits]
+        for key in keys:
+            self._discard(key)
+        return len(keys)
+
+    def invalidate_lane(self, level_name: str, start_idx: int, end_idx: int,
+                        use_speed_limits: Optional[bool] = None) -> int:
+        """Drop the entries whose path uses the lane, in either direction"""
+        lane = (level_name, start_idx, end_idx) if start_idx < end_idx else (level_name, end_idx, start_idx)
+        keys = [key for key in self._by_lane.get(lane, ())
+                if use_speed_limits is None or key[3] == use_speed_limits]
+        for key in keys:
+            self._discard(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_level.clear()
+        self._by_lane.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
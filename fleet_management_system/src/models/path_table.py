@@ -0,0 +1,69 @@
+import os
+from typing import List, Optional
+import numpy as np
+from src.models.compiled_graph import CompiledLevel
+
+class PathTable:
+    """All-pairs shortest distances and next hops for one level.
+
+    ``next_hop[i, j]`` is the vertex after ``i`` on a shortest path to ``j``,
+    or -1 when ``j`` is unreachable from ``i``.
+    """
+
+    def __init__(self, dist: np.ndarray, next_hop: np.ndarray):
+        self.dist = dist
+        self.next_hop = next_hop
+
+    @classmethod
+    def compute(cls, graph: CompiledLevel) -> "PathTable":
+        """Floyd-Warshall over lane lengths, vectorized one pivot row at a time"""
+        n = graph.num_vertices
+        dist = np.full((n, n), np.inf)
+        next_hop = np.full((n, n), -1, dtype=np.int64)
+        sources = np.repeat(np.arange(n), np.diff(graph.indptr))
+        dist[sources, graph.indices] = graph.lengths
+        next_hop[sources, graph.indices] = graph.indices
+        np.fill_diagonal(dist, 0.0)
+        np.fill_diagonal(next_hop, np.arange(n))
+
+        candidate = np.empty_like(dist)
+        better = np.empty((n, n), dtype=bool)
+        for k in range(n):
+            np.add(dist[:, k:k + 1], dist[k:k + 1, :], out=candidate)
+            np.less(candidate, dist, out=better)
+            np.copyto(dist, candidate, where=better)
+            np.copyto(next_hop, next_hop[:, k:k + 1].copy(), where=better)
+        return cls(dist, next_hop)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["PathTable"]:
+        try:
+            with np.load(path) as data:
+                return cls(data["dist"], data["next_hop"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, dist=self.dist, next_hop=self.next_hop)
+        os.replace(tmp_path, path)
+
+    @property
+    def num_vertices(self) -> int:
+        return len(self.dist)
+
+    def distance(self, start_idx: int, end_idx: int) -> float:
+        return float(self.dist[start_idx, end_idx])
+
+    def path_indices(self, start_idx: int, end_idx: int) -> List[int]:
+        """Vertex indices from start to end inclusive, or [] if unreachable"""
+        if self.next_hop[start_idx, end_idx] < 0:
+            return []
+        path = [start_idx]
+        current = start_idx
+        while current != end_idx:
+            current = int(self.next_hop[current, end_idx])
+            path.append(current)
+        return path
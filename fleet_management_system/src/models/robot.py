@@ -1,84 +1,191 @@
 import random
-import math
 import time
+import numpy as np
 from typing import Dict, Tuple, Optional, List
+from src.models.fleet_state import FleetState, STATUS_CODES, STATUS_NAMES
 from src.utils.logger import log_robot_action
 
+# Units per simulated second; FleetState.advance() scales it by dt
+DEFAULT_SPEED = 1.0
+
 class Robot:
-    def __init__(self, robot_id: int, initial_position: Tuple[float, float]):
+    """A single robot, stored as a row of a FleetState.
+
+    Robots spawned by FleetManager share the fleet's state arrays; a Robot
+    created on its own gets a private one-row state.
+    """
+
+    def __init__(self, robot_id: int, initial_position: Tuple[float, float],
+                 fleet_state: Optional[FleetState] = None):
         self.id = robot_id
-        self.position = initial_position
+        self._state = fleet_state if fleet_state is not None else FleetState(capacity=1)
+        self._row = self._state.add(robot_id, initial_position, DEFAULT_SPEED)
         self.destination = None
         self.path = []
-        self.path_indices = []  
+        self.path_indices = []
         self.current_path_index = 0
-        self.speed = 0.05
-        self.status = "idle"
+        self.departure_ticks: List[int] = []
         self.color = self._generate_random_color()
         self.waiting_since = None
-        log_robot_action(self.id, "Robot spawned", f"at position {initial_position}")
+        log_robot_action(self.id, "Robot spawned", "at position %s", initial_position)
+
+    @classmethod
+    def attach(cls, robot_id: int, fleet_state: FleetState) -> "Robot":
+        """View over a row that already exists, e.g. one restored from a snapshot"""
+        robot = cls.__new__(cls)
+        robot.id = robot_id
+        robot._state = fleet_state
+        robot._row = fleet_state.rows[robot_id]
+        robot.destination = None
+        robot.path = []
+        robot.path_indices = []
+        robot.current_path_index = 0
+        robot.departure_ticks = []
+        robot.color = None
+        robot.waiting_since = None
+        return robot
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        x, y = self._state.position[self._row]
+        return (float(x), float(y))
+
+    @position.setter
+    def position(self, value: Tuple[float, float]):
+        self._state.position[self._row] = (value[0], value[1])
+        self._state.dirty[self._row] = True
+
+    @property
+    def path_indices(self) -> List[int]:
+        return self._path_indices
+
+    @path_indices.setter
+    def path_indices(self, value: List[int]):
+        self._path_indices = value
+        self._state.route_changes.add(self.id)
+
+    @property
+    def current_path_index(self) -> int:
+        return int(self._state.path_index[self._row])
+
+    @current_path_index.setter
+    def current_path_index(self, value: int):
+        self._state.path_index[self._row] = value
+        self._state.dirty[self._row] = True
+
+    @property
+    def speed(self) -> float:
+        return float(self._state.speed[self._row])
+
+    @speed.setter
+    def speed(self, value: float):
+        self._state.speed[self._row] = value
+
+    @property
+    def battery(self) -> float:
+        """Charge left, as a fraction of a full battery"""
+        return float(self._state.battery[self._row])
+
+    @battery.setter
+    def battery(self, value: float):
+        self._state.battery[self._row] = min(max(value, 0.0), 1.0)
+
+    def range_left(self) -> float:
+        """Distance the robot can still drive on its battery"""
+        drain = self._state.drain_per_unit
+        return self.battery / drain if drain else float('inf')
+
+    @property
+    def status(self) -> str:
+        return STATUS_NAMES[int(self._state.status[self._row])]
+
+    @status.setter
+    def status(self, value: str):
+        if value not in STATUS_CODES:
+            raise ValueError(f"Unknown robot status: {value}")
+        self._state.status[self._row] = STATUS_CODES[value]
+        self._state.dirty[self._row] = True
+
+    @property
+    def on_segment(self) -> bool:
+        return bool(self._state.on_segment[self._row])
 
     def _generate_random_color(self) -> str:
         colors = ["red", "green", "blue", "orange", "purple", "cyan", "magenta"]
         return random.choice(colors)
-    
-    def set_destination(self, destination: Tuple[float, float], path_indices: List[int]):
+
+    def set_destination(self, destination: Tuple[float, float], path_indices: List[int],
+                        departure_ticks: Optional[List[int]] = None):
         self.destination = destination
         self.path_indices = path_indices
+        self.departure_ticks = departure_ticks or []
         self.current_path_index = 0
+        self._state.on_segment[self._row] = False
         self.status = "moving"
         self.waiting_since = None
-        log_robot_action(self.id, "Destination set", f"to {destination} via path {path_indices}")
+        log_robot_action(self.id, "Destination set", "to %s via path %s", destination, tuple(path_indices))
 
-    def update_position(self, traffic_manager) -> bool:
-        if not self.path_indices or self.status != "moving":
-            return False
-        if self.current_path_index >= len(self.path_indices) - 1:
+    def begin_segment(self, traffic_manager, tick: Optional[int] = None) -> bool:
+        """
+        Request the lane to the next waypoint and start driving it if granted.
+        A robot with a reserved schedule holds at the vertex until its departure
+        tick. Returns True if the robot has reached its destination instead.
+
+        The lane the robot arrived on stays reserved until the next one is
+        granted, since the robot still stands at its end. Robots that wait
+        therefore hold a lane, and wait-for cycles between them can form.
+        """
+        index = self.current_path_index
+        if index >= len(self.path_indices) - 1:
+            traffic_manager.release_robot(self.id)
             self.status = "idle"
-            log_robot_action(self.id, "Reached destination", f"at {self.position}")
+            log_robot_action(self.id, "Reached destination", "at %s", self.position)
             return True
-        current_vertex_idx = self.path_indices[self.current_path_index]
-        next_vertex_idx = self.path_indices[self.current_path_index + 1]
+        if self._state.battery[self._row] <= 0.0:
+            # Stranded on a vertex; give up any lane handed over while waiting so others can pass
+            traffic_manager.release_robot(self.id)
+            self.status = "error"
+            log_robot_action(self.id, "Battery depleted", "at %s", self.position)
+            return False
+        if tick is not None and self.departure_ticks and tick < self.departure_ticks[index]:
+            return False
+        current_vertex_idx = self.path_indices[index]
+        next_vertex_idx = self.path_indices[index + 1]
         lane = (current_vertex_idx, next_vertex_idx)
         if not traffic_manager.request_lane(self.id, lane):
             if self.status != "waiting":
                 self.status = "waiting"
-                self.waiting_since = time.time()
+                # Simulation ticks keep deadlock victim selection reproducible
+                self.waiting_since = time.time() if tick is None else tick
                 traffic_manager.add_waiting_robot(self.id, lane)
-                log_robot_action(self.id, "Waiting at vertex", f"for lane {lane}")
+                log_robot_action(self.id, "Waiting at vertex", "for lane %s", lane)
             return False
+        if index > 0 and self.path_indices[index - 1] != next_vertex_idx:
+            traffic_manager.release_lane((self.path_indices[index - 1], current_vertex_idx), self.id)
+        self._state.start_segment(self._row, self.path[index], self.path[index + 1])
+        return False
+
+    def finish_segment(self, traffic_manager):
+        """Arrival at the end of the current lane; it is released once the next one is granted"""
+        index = self.current_path_index + 1
+        self.current_path_index = index
+        log_robot_action(self.id, "Reached waypoint", "%d/%d", index, len(self.path_indices))
 
-        current_vertex = self.path[self.current_path_index]
-        next_vertex = self.path[self.current_path_index + 1]
-        dx = next_vertex[0] - current_vertex[0]
-        dy = next_vertex[1] - current_vertex[1]
-        distance = math.sqrt(dx**2 + dy**2)
-        
-        if distance < 0.0001:  
-            self.current_path_index += 1
+    def update_position(self, traffic_manager) -> bool:
+        """Advance just this robot by one tick; FleetManager batches this for the whole fleet"""
+        if not self.path_indices or self.status != "moving":
             return False
-        step_x = (dx / distance) * self.speed
-        step_y = (dy / distance) * self.speed
-        remaining_x = next_vertex[0] - self.position[0]
-        remaining_y = next_vertex[1] - self.position[1]
-        remaining_dist = math.sqrt(remaining_x**2 + remaining_y**2)
-        
-        if remaining_dist <= self.speed:
-            self.position = next_vertex
-            self.current_path_index += 1
-            prev_lane = (self.path_indices[self.current_path_index - 1], 
-                        self.path_indices[self.current_path_index])
-            traffic_manager.release_lane(prev_lane)
-            log_robot_action(self.id, "Reached waypoint", f"{self.current_path_index}/{len(self.path_indices)}")
-        else:
-            self.position = (
-                self.position[0] + step_x,
-                self.position[1] + step_y
-            )
+        if not self.on_segment:
+            if self.begin_segment(traffic_manager):
+                return True
+            if not self.on_segment:
+                return False
+        if len(self._state.advance(np.array([self._row]))):
+            self.finish_segment(traffic_manager)
         return False
-            
+
     def set_status(self, status: str):
         old_status = self.status
         self.status = status
         if old_status != status:
-            log_robot_action(self.id, "Status changed", f"from {old_status} to {status}")
\ No newline at end of file
+            log_robot_action(self.id, "Status changed", "from %s to %s", old_status, status)
@@ -0,0 +1,135 @@
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional, Tuple
+import numpy as np
+from src.models.fleet_state import FleetState
+
+# Header words: publish sequence, tick, robot count, capacity
+_SEQUENCE, _TICK, _SIZE, _CAPACITY = range(4)
+_HEADER_BYTES = 4 * 8
+
+class SharedFleetView(NamedTuple):
+    sequence: int
+    tick: int
+    ids: np.ndarray
+    position: np.ndarray
+    status: np.ndarray
+    path_index: np.ndarray
+
+def _layout(capacity: int) -> Tuple[Tuple[str, int, np.dtype, tuple], ...]:
+    """(name, byte offset, dtype, shape) of each column, widest first so every column stays aligned"""
+    columns = (
+        ("ids", np.dtype(np.int64), (capacity,)),
+        ("position", np.dtype(np.float64), (capacity, 2)),
+        ("path_index", np.dtype(np.int32), (capacity,)),
+        ("status", np.dtype(np.int8), (capacity,)),
+    )
+    layout = []
+    offset = _HEADER_BYTES
+    for name, dtype, shape in columns:
+        layout.append((name, offset, dtype, shape))
+        offset += dtype.itemsize * int(np.prod(shape))
+    return tuple(layout)
+
+class SharedFleetBlock:
+    """The published columns of one fleet in a shared memory block.
+
+    One process (a simulation worker) owns the fleet and calls publish()
+    after each tick; any process that knows the block's name can attach()
+    and read the robots without copying or messaging. Unlike FleetState the
+    block cannot grow, so it is created for a maximum number of robots.
+
+    publish() makes the sequence number odd while it writes and even again
+    when done. view() hands out the arrays directly, and a reader checks
+    is_current() after using them to know they were not overwritten
+    meanwhile; read() does that and retries for a consistent copy.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool):
+        self._memory = memory
+        self.owner = owner
+        self._header = np.ndarray((4,), dtype=np.int64, buffer=memory.buf)
+        self.capacity = int(self._header[_CAPACITY])
+        for name, offset, dtype, shape in _layout(self.capacity):
+            setattr(self, "_" + name, np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset))
+
+    @classmethod
+    def create(cls, capacity: int) -> "SharedFleetBlock":
+        """A new, empty block for up to capacity robots; the creator unlinks it when done"""
+        capacity = max(capacity, 1)
+        _, offset, dtype, shape = _layout(capacity)[-1]
+        memory = shared_memory.SharedMemory(create=True, size=offset + dtype.itemsize * int(np.prod(shape)))
+        header = np.ndarray((4,), dtype=np.int64, buffer=memory.buf)
+        header[:] = 0
+        header[_CAPACITY] = capacity
+        del header
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedFleetBlock":
+        """Open a block another process created"""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    @property
+    def sequence(self) -> int:
+        return int(self._header[_SEQUENCE])
+
+    def publish(self, state: FleetState, tick: int):
+        """Copy the fleet's rows into the block. Raises ValueError if they do not fit"""
+        n = state.size
+        if n > self.capacity:
+            raise ValueError(f"Fleet of {n} robots does not fit a shared block of {self.capacity}")
+        header = self._header
+        header[_SEQUENCE] += 1
+        self._ids[:n] = state.ids[:n]
+        self._position[:n] = state.position[:n]
+        self._path_index[:n] = state.path_index[:n]
+        self._status[:n] = state.status[:n]
+        header[_TICK] = tick
+        header[_SIZE] = n
+        header[_SEQUENCE] += 1
+
+    def view(self) -> SharedFleetView:
+        """
+        The published robots as read-only arrays over the shared memory
+        itself. They change under the reader when the owner publishes again;
+        check is_current() before trusting what was read.
+        """
+        header = self._header
+        sequence = int(header[_SEQUENCE])
+        n = int(header[_SIZE])
+        arrays = [self._ids[:n], self._position[:n], self._status[:n], self._path_index[:n]]
+        for array in arrays:
+            array.flags.writeable = False
+        return SharedFleetView(sequence, int(header[_TICK]), *arrays)
+
+    def is_current(self, view: SharedFleetView) -> bool:
+        """True if nothing was published since view was taken and it was not taken mid-publish"""
+        return view.sequence % 2 == 0 and self.sequence == view.sequence
+
+    def read(self, timeout: float = 1.0) -> SharedFleetView:
+        """A consistent copy of the published robots. Raises TimeoutError if the owner never stops writing"""
+        deadline = time.monotonic() + timeout
+        while True:
+            view = self.view()
+            copy = SharedFleetView(view.sequence, view.tick, *(array.copy() for array in view[2:]))
+            if self.is_current(view):
+                return copy
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No consistent read of shared fleet block {self.name}")
+            time.sleep(0)
+
+    def close(self, unlink: Optional[bool] = None):
+        """Detach from the block, and by default remove it if this process created it"""
+        if self._memory is None:
+            return
+        # The buffer cannot be released while arrays still point into it
+        self._header = self._ids = self._position = self._path_index = self._status = None
+        self._memory.close()
+        if self.owner if unlink is None else unlink:
+            self._memory.unlink()
+        self._memory = None
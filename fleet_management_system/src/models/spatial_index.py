@@ -0,0 +1,135 @@
+import math
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+class SpatialGrid:
+    """Uniform-grid spatial index over 2D points keyed by any hashable id.
+
+    Points can be moved in place, which only touches the grid when the point
+    crosses into another cell, so it is cheap to keep up to date every tick.
+    With position_of, exact positions are read live from the owner and the
+    grid only needs telling when a point changes cell.
+    """
+
+    def __init__(self, cell_size: float = 1.0,
+                 position_of: Optional[Callable[[Hashable], Tuple[float, float]]] = None):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], List[Hashable]] = {}
+        self._points: Dict[Hashable, Tuple[float, float]] = {}
+        self._position_of = position_of or self._points.__getitem__
+        self._cell_of: Dict[Hashable, Tuple[int, int]] = {}
+        self._min_cell = [0, 0]
+        self._max_cell = [-1, -1]
+
+    @classmethod
+    def from_points(cls, points: Iterable[Tuple[Hashable, float, float]], cell_size: Optional[float] = None) -> "SpatialGrid":
+        """Build an index, picking a cell size of about one point per cell if none is given"""
+        points = list(points)
+        if cell_size is None:
+            cell_size = 1.0
+            if len(points) > 1:
+                xs = [p[1] for p in points]
+                ys = [p[2] for p in points]
+                area = max(max(xs) - min(xs), 1e-9) * max(max(ys) - min(ys), 1e-9)
+                cell_size = max(math.sqrt(area / len(points)), 1e-6)
+        grid = cls(cell_size)
+        for key, x, y in points:
+            grid.insert(key, x, y)
+        return grid
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, key: Hashable, x: float, y: float):
+        if key in self._points:
+            self.move(key, x, y)
+            return
+        cell = self._cell(x, y)
+        self._points[key] = (x, y)
+        self._cell_of[key] = cell
+        self._cells.setdefault(cell, []).append(key)
+        if len(self._points) == 1:
+            self._min_cell = list(cell)
+            self._max_cell = list(cell)
+        else:
+            self._min_cell = [min(self._min_cell[0], cell[0]), min(self._min_cell[1], cell[1])]
+            self._max_cell = [max(self._max_cell[0], cell[0]), max(self._max_cell[1], cell[1])]
+
+    def remove(self, key: Hashable):
+        if key not in self._points:
+            return
+        cell = self._cell_of.pop(key)
+        del self._points[key]
+        bucket = self._cells[cell]
+        bucket.remove(key)
+        if not bucket:
+            del self._cells[cell]
+
+    def move(self, key: Hashable, x: float, y: float):
+        old_cell = self._cell_of.get(key)
+        if old_cell is None:
+            self.insert(key, x, y)
+            return
+        self._points[key] = (x, y)
+        new_cell = self._cell(x, y)
+        if new_cell != old_cell:
+            self.remove(key)
+            self.insert(key, x, y)
+
+    def _ring(self, center: Tuple[int, int], r: int) -> Iterator[Tuple[int, int]]:
+        cx, cy = center
+        if r == 0:
+            yield center
+            return
+        for dx in range(-r, r + 1):
+            yield (cx + dx, cy - r)
+            yield (cx + dx, cy + r)
+        for dy in range(-r + 1, r):
+            yield (cx - r, cy + dy)
+            yield (cx + r, cy + dy)
+
+    def nearest(self, x: float, y: float, max_distance: float = math.inf) -> Optional[Tuple[Hashable, float]]:
+        """Closest (key, distance) within max_distance, or None"""
+        if not self._points:
+            return None
+        center = self._cell(x, y)
+        # Beyond this ring every cell lies outside the occupied extent
+        max_ring = max(
+            abs(center[0] - self._min_cell[0]), abs(center[0] - self._max_cell[0]),
+            abs(center[1] - self._min_cell[1]), abs(center[1] - self._max_cell[1]),
+        )
+        best_key, best_dist = None, max_distance
+        r = 0
+        while r <= max_ring:
+            # Anything in ring r is at least (r - 1) cells away from the query
+            if (r - 1) * self.cell_size > best_dist:
+                break
+            for cell in self._ring(center, r):
+                for key in self._cells.get(cell, ()):
+                    px, py = self._position_of(key)
+                    dist = math.hypot(px - x, py - y)
+                    if dist <= best_dist and (best_key is None or dist < best_dist):
+                        best_key, best_dist = key, dist
+            r += 1
+        return None if best_key is None else (best_key, best_dist)
+
+    def query_radius(self, x: float, y: float, radius: float) -> List[Hashable]:
+        """All keys within radius of (x, y)"""
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        found = []
+        for cx in range(max(min_cx, self._min_cell[0]), min(max_cx, self._max_cell[0]) + 1):
+            for cy in range(max(min_cy, self._min_cell[1]), min(max_cy, self._max_cell[1]) + 1):
+                for key in self._cells.get((cx, cy), ()):
+                    px, py = self._position_of(key)
+                    if math.hypot(px - x, py - y) <= radius:
+                        found.append(key)
+        return found
+
+    def position(self, key: Hashable) -> Tuple[float, float]:
+        return self._position_of(key)
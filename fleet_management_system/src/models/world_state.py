@@ -0,0 +1,212 @@
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, NamedTuple, Optional, Tuple
+import numpy as np
+from src.models.fleet_state import FleetState, STATUS_NAMES
+from src.models.spatial_index import SpatialGrid
+
+LaneKey = Tuple[int, int]
+
+class Route(NamedTuple):
+    destination: Optional[Tuple[float, float]]
+    path_indices: Tuple[int, ...]
+
+class RobotSnapshot(NamedTuple):
+    id: int
+    position: Tuple[float, float]
+    status: str
+    destination: Optional[Tuple[float, float]]
+    path_indices: Tuple[int, ...]
+    current_path_index: int
+    battery: float = 1.0
+
+_NO_ROUTE = Route(None, ())
+_EMPTY: Mapping = MappingProxyType({})
+
+class _Buffer:
+    """One of the two array sets a WorldState publishes into"""
+
+    __slots__ = ("generation", "ids", "position", "status", "path_index", "battery", "_views")
+
+    def __init__(self, capacity: int):
+        self.generation = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.position = np.zeros((capacity, 2))
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.path_index = np.zeros(capacity, dtype=np.int32)
+        self.battery = np.zeros(capacity)
+        self._views: Tuple[int, Tuple[np.ndarray, ...]] = (-1, ())
+
+    @property
+    def capacity(self) -> int:
+        return len(self.ids)
+
+    def views(self, size: int) -> Tuple[np.ndarray, ...]:
+        """Read-only views of the first size rows, reused while the fleet size stays the same"""
+        if self._views[0] != size:
+            views = tuple(array[:size] for array in (self.ids, self.position, self.status, self.path_index,
+                                                        self.battery))
+            for view in views:
+                view.flags.writeable = False
+            self._views = (size, views)
+        return self._views[1]
+
+class WorldSnapshot:
+    """The fleet as it stood at the end of one tick.
+
+    ``ids``, ``position``, ``status`` (codes, see STATUS_NAMES),
+    ``path_index`` and ``battery`` are read-only arrays with one row per robot. ``rows``
+    maps robot ids to rows, ``routes`` maps them to their destination and
+    path, and ``reserved_lanes`` maps lane keys to the robot holding them;
+    all three are read-only and shared between snapshots until they change.
+
+    The arrays live in one of the publisher's two buffers, which is written
+    again two publishes later. Readers on the simulation thread can ignore
+    that; readers on other threads that hold a snapshot across ticks check
+    ``valid`` after reading and retry with the latest one if it is False.
+    """
+
+    __slots__ = ("tick", "ids", "position", "status", "path_index", "battery", "rows", "routes", "reserved_lanes",
+                 "_buffer", "_generation", "_robot_index")
+
+    def __init__(self, tick: int, buffer: _Buffer, size: int, rows: Mapping[int, int],
+                 routes: Mapping[int, Route], reserved_lanes: Mapping[LaneKey, int],
+                 robot_index: Optional[SpatialGrid] = None):
+        self.tick = tick
+        self.ids, self.position, self.status, self.path_index, self.battery = buffer.views(size)
+        self.rows = rows
+        self.routes = routes
+        self.reserved_lanes = reserved_lanes
+        self._buffer = buffer
+        self._generation = buffer.generation
+        self._robot_index = robot_index
+
+    @property
+    def valid(self) -> bool:
+        """False once the publisher has started overwriting this snapshot's arrays"""
+        return self._buffer.generation == self._generation
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nearest_robot(self, position: Tuple[float, float], max_distance: float) -> Optional[int]:
+        """
+        Id of the robot nearest to position, if one is within max_distance.
+        Goes through the publisher's robot index, which follows the latest
+        snapshot, so it is meant for readers of ``latest``.
+        """
+        if self._robot_index is None:
+            return None
+        found = self._robot_index.nearest(position[0], position[1], max_distance)
+        return None if found is None else found[0]
+
+    def __contains__(self, robot_id: int) -> bool:
+        return robot_id in self.rows
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.rows)
+
+    def robot(self, robot_id: int) -> RobotSnapshot:
+        """One robot as a tuple, for readers that want named fields"""
+        row = self.rows[robot_id]
+        x, y = self.position[row].tolist()
+        route = self.routes.get(robot_id, _NO_ROUTE)
+        return RobotSnapshot(robot_id, (x, y), STATUS_NAMES[int(self.status[row])], route.destination,
+                             route.path_indices, int(self.path_index[row]), float(self.battery[row]))
+
+class WorldState:
+    """Publishes immutable snapshots of the fleet for readers outside the tick.
+
+    Only the simulation calls publish(). It copies the fleet arrays into the
+    back one of two buffers and swaps the reference readers get from
+    ``latest``, so readers never lock and never see a half-written tick. The
+    robot-to-row map, routes and lane reservations are copied only in the
+    ticks they change, and a route change only re-reads the robots that
+    were given a new path.
+
+    ``robot_index`` is a SpatialGrid over the published robot positions for
+    sub-linear picking (WorldSnapshot.nearest_robot). Each publish moves
+    only the robots that crossed into another grid cell; exact positions
+    are read from the latest snapshot.
+    """
+
+    def __init__(self, fleet_state: FleetState, robots: Mapping, traffic_manager, robot_cell_size: float = 1.0):
+        self.fleet_state = fleet_state
+        self.robots = robots
+        self.traffic_manager = traffic_manager
+        self._buffers = [_Buffer(fleet_state.capacity), _Buffer(fleet_state.capacity)]
+        self._back = 0
+        self._rows_source: Optional[Dict[int, int]] = None
+        self._rows_size = -1
+        self._rows: Mapping[int, int] = _EMPTY
+        self._routes: Mapping[int, Route] = _EMPTY
+        self._lanes_version = -1
+        self._lanes: Mapping[LaneKey, int] = _EMPTY
+        self.robot_cell_size = robot_cell_size
+        self.robot_index = SpatialGrid(robot_cell_size, position_of=self._published_position)
+        self._index_cells = np.zeros((0, 2), dtype=np.int64)
+        self.latest: WorldSnapshot = WorldSnapshot(0, self._buffers[1], 0, _EMPTY, _EMPTY, _EMPTY)
+
+    def publish(self, tick: int) -> WorldSnapshot:
+        state = self.fleet_state
+        n = state.size
+        buffer = self._buffers[self._back]
+        if buffer.capacity < n:
+            buffer = self._buffers[self._back] = _Buffer(max(n, 2 * buffer.capacity))
+        # Bump first, so a reader finishing with the old contents sees them as invalid
+        buffer.generation += 1
+        buffer.ids[:n] = state.ids[:n]
+        buffer.position[:n] = state.position[:n]
+        buffer.status[:n] = state.status[:n]
+        buffer.path_index[:n] = state.path_index[:n]
+        buffer.battery[:n] = state.battery[:n]
+
+        rebuilt = state.rows is not self._rows_source
+        if rebuilt or len(state.rows) != self._rows_size:
+            self._rows = MappingProxyType(dict(state.rows))
+            self._rows_source = state.rows
+            self._rows_size = len(state.rows)
+        self._publish_routes(rebuilt)
+        self._update_robot_index(buffer, n, rebuilt)
+        traffic_manager = self.traffic_manager
+        if traffic_manager.version != self._lanes_version:
+            self._lanes = MappingProxyType(dict(traffic_manager.reserved_lanes))
+            self._lanes_version = traffic_manager.version
+
+        snapshot = WorldSnapshot(tick, buffer, n, self._rows, self._routes, self._lanes, self.robot_index)
+        self.latest = snapshot
+        self._back ^= 1
+        return snapshot
+
+    def _published_position(self, robot_id: int) -> Tuple[float, float]:
+        latest = self.latest
+        x, y = latest.position[latest.rows[robot_id]].tolist()
+        return x, y
+
+    def _update_robot_index(self, buffer: _Buffer, n: int, rebuild: bool):
+        """Tell the robot index about new robots and ones that crossed into another cell"""
+        if rebuild:
+            self.robot_index = SpatialGrid(self.robot_cell_size, position_of=self._published_position)
+            self._index_cells = self._index_cells[:0]
+        cells = np.floor(buffer.position[:n] / self.robot_cell_size).astype(np.int64)
+        known = len(self._index_cells)
+        changed = np.flatnonzero(np.any(cells[:known] != self._index_cells, axis=1))
+        if len(changed) or n > known:
+            index = self.robot_index
+            rows = np.concatenate([changed, np.arange(known, n)])
+            for robot_id, (x, y) in zip(buffer.ids[rows].tolist(), buffer.position[rows].tolist()):
+                index.move(robot_id, x, y)
+        self._index_cells = cells
+
+    def _publish_routes(self, rebuild: bool):
+        changed = self.fleet_state.route_changes
+        if not changed and not rebuild:
+            return
+        routes = {} if rebuild else dict(self._routes)
+        for robot_id in (self.robots if rebuild else changed):
+            robot = self.robots.get(robot_id)
+            if robot is None:
+                routes.pop(robot_id, None)
+            else:
+                routes[robot_id] = Route(robot.destination, tuple(robot.path_indices))
+        changed.clear()
+        self._routes = MappingProxyType(routes)
@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+from src.controllers.simulator import Simulator
+from src.server.control_server import ControlServer
+from src.utils.logger import setup_logging
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the fleet simulation behind a JSON control socket")
+    parser.add_argument("nav_graph_file", help="Navigation graph JSON file")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--unix", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--dt", type=float, default=0.05, help="Simulated seconds per tick")
+    parser.add_argument("--fast", action="store_true", help="Tick as fast as possible instead of every dt")
+    parser.add_argument("--level", help="Level to simulate (defaults to the first level)")
+    parser.add_argument("--cooperative", action="store_true",
+                        help="Reserve routes in space and time (cooperative A*)")
+    parser.add_argument("--max-batch", type=int, default=1024, help="Commands applied per tick at most")
+    parser.add_argument("--max-queued", type=int, default=4096,
+                        help="Commands queued before the server stops reading from clients")
+    parser.add_argument("--journal", help="Record the run to this binary event journal")
+    return parser.parse_args()
+
+async def serve(args):
+    sim = Simulator(args.nav_graph_file, dt=args.dt, cooperative=args.cooperative, journal_file=args.journal,
+                    level=args.level)
+    server = ControlServer(sim, max_batch=args.max_batch, max_queued=args.max_queued,
+                           tick_interval=0.0 if args.fast else None)
+    if args.unix:
+        await server.start_unix(args.unix)
+        print(f"Listening on {args.unix}")
+    else:
+        host, port = await server.start_tcp(args.host, args.port)
+        print(f"Listening on {host}:{port}")
+    try:
+        await server.run()
+    finally:
+        await server.close()
+        sim.close()
+
+def main():
+    args = parse_args()
+    setup_logging()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import asyncio
+import itertools
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from src.server.control_server import CommandError
+
+class ControlClient:
+    """Asyncio client for ControlServer, e.g. for scripts and tests driving a server in-process.
+
+    Requests may be sent concurrently; responses are matched to them by id.
+    Status events of a subscription are queued for next_event().
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.events: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader_task = asyncio.create_task(self._read_responses())
+
+    @classmethod
+    async def connect_tcp(cls, host: str, port: int) -> "ControlClient":
+        return cls(*await asyncio.open_connection(host, port))
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> "ControlClient":
+        return cls(*await asyncio.open_unix_connection(path))
+
+    async def _read_responses(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if "event" in message:
+                    self.events.put_nowait(message)
+                    continue
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Control server closed the connection"))
+            self._pending.clear()
+
+    async def request(self, op: str, **fields: Any) -> Dict[str, Any]:
+        """Send one request and wait for its response. Raises CommandError if the server refused it"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.writer.write(json.dumps({"id": request_id, "op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        response = await future
+        if not response.get("ok"):
+            raise CommandError(response.get("error", "Request failed"))
+        return response
+
+    async def spawn(self, vertex: Optional[int] = None, position: Optional[Tuple[float, float]] = None) -> int:
+        fields = {"vertex": vertex} if vertex is not None else {"position": list(position)}
+        return (await self.request("spawn", **fields))["robot"]
+
+    async def assign(self, robot_id: int, destination: Optional[Sequence[float]] = None,
+                     vertex: Optional[int] = None) -> List[int]:
+        """Send a robot to a point or vertex; returns the planned vertex path"""
+        fields = {"vertex": vertex} if vertex is not None else {"destination": list(destination)}
+        return (await self.request("assign", robot=robot_id, **fields))["path"]
+
+    async def status(self, robot_id: Optional[int] = None) -> Dict[str, Any]:
+        return await (self.request("status") if robot_id is None else self.request("status", robot=robot_id))
+
+    async def subscribe(self):
+        await self.request("subscribe")
+
+    async def next_event(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await asyncio.wait_for(self.events.get(), timeout)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._reader_task.cancel()
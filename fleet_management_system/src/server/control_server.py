@@ -0,0 +1,350 @@
+import asyncio
+import json
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+from src.controllers.simulator import Simulator
+from src.models.world_state import WorldSnapshot
+from src.models.fleet_state import STATUS_NAMES
+from src.utils.logger import log_system_event
+
+class CommandError(Exception):
+    """A request the server could not carry out; sent back to the client as its error"""
+
+def _robot_fields(world: WorldSnapshot, rows) -> List[Dict[str, Any]]:
+    ids = world.ids[rows].tolist()
+    positions = world.position[rows].tolist()
+    statuses = world.status[rows].tolist()
+    path_indexes = world.path_index[rows].tolist()
+    batteries = world.battery[rows].tolist()
+    return [
+        {"id": robot_id, "position": position, "status": STATUS_NAMES[status], "path_index": path_index,
+         "battery": battery}
+        for robot_id, position, status, path_index, battery in zip(ids, positions, statuses, path_indexes, batteries)
+    ]
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+def _is_index(value: Any) -> bool:
+    # bool is an int subclass, but true is not robot 1
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _point(value: Any, name: str) -> Tuple[float, float]:
+    try:
+        x, y = value
+        return (float(x), float(y))
+    except (TypeError, ValueError):
+        raise CommandError(f"{name} must be [x, y]") from None
+
+class _Subscriber:
+    """A connection receiving status events, with a bounded backlog so it cannot stall the ticks"""
+
+    def __init__(self, writer: asyncio.StreamWriter, backlog: int):
+        self.writer = writer
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(backlog)
+        # Starts with, and falls back to, a full status instead of deltas it cannot apply
+        self.resync = True
+        self.task: Optional[asyncio.Task] = None
+
+    async def send_events(self):
+        try:
+            while True:
+                self.writer.write(await self.queue.get())
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+class ControlServer:
+    """Line-delimited JSON control endpoint for a Simulator, on TCP or a Unix socket.
+
+    Every request is one JSON object per line with an ``op`` and an optional
+    ``id`` that the response echoes; responses carry ``ok`` and either the
+    result fields or an ``error``:
+
+        {"op": "spawn", "vertex": 3}                        -> {"robot": 1}
+        {"op": "assign", "robot": 1, "destination": [x, y]} -> {"path": [...]}
+        {"op": "status"} / {"op": "status", "robot": 1}     -> {"tick": t, "robots": [...]}
+        {"op": "subscribe"} / {"op": "unsubscribe"} / {"op": "stats"} / {"op": "ping"}
+
+    spawn and assign (which also takes a ``vertex`` instead of a destination)
+    are queued and applied together at the start of the next tick, up to
+    max_batch per tick, and all destinations of a tick are planned as one
+    batch. The queue holds at most max_queued commands; when it is full the
+    server stops reading from connections until the ticks catch up, so
+    clients are slowed down by the socket rather than dropped. Status
+    requests are answered at once from the published world state.
+
+    Subscribers get ``{"event": "status", "tick": t, "full": bool, "robots":
+    [...]}`` after every tick with the robots that changed; a subscriber more
+    than subscriber_backlog events behind loses them and gets a full status
+    instead. Ticks run on a worker thread so the event loop keeps serving
+    while they do, one every tick_interval seconds (the simulator's dt by
+    default, 0 for as fast as possible).
+    """
+
+    def __init__(self, simulator: Simulator, max_batch: int = 1024, max_queued: int = 4096,
+                 tick_interval: Optional[float] = None, subscriber_backlog: int = 64, max_line: int = 65536):
+        self.simulator = simulator
+        self.max_batch = max_batch
+        self.max_queued = max_queued
+        self.tick_interval = simulator.dt if tick_interval is None else tick_interval
+        self.subscriber_backlog = subscriber_backlog
+        self.max_line = max_line
+        self.stats = {"connections": 0, "commands": 0, "batches": 0, "largest_batch": 0, "resyncs": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._servers: List[asyncio.AbstractServer] = []
+        self._subscribers: Dict[asyncio.StreamWriter, _Subscriber] = {}
+        self._connections: Set[asyncio.Task] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sim-tick")
+        self._running = False
+
+    def _get_queue(self) -> asyncio.Queue:
+        # Created lazily so it belongs to the loop the server runs on
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queued)
+        return self._queue
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """Listen on host:port (0 picks a free port); returns the address actually bound"""
+        server = await asyncio.start_server(self._handle_connection, host, port, limit=self.max_line)
+        self._servers.append(server)
+        address = server.sockets[0].getsockname()[:2]
+        log_system_event("Control server listening", "on %s:%s", *address)
+        return address
+
+    async def start_unix(self, path: str):
+        server = await asyncio.start_unix_server(self._handle_connection, path, limit=self.max_line)
+        self._servers.append(server)
+        log_system_event("Control server listening", "on %s", path)
+
+    async def run(self, ticks: Optional[int] = None) -> int:
+        """Run ticks until the limit is hit or stop() is called; returns the number of ticks run"""
+        self._running = True
+        loop = asyncio.get_running_loop()
+        queue = self._get_queue()
+        executed = 0
+        next_deadline = time.perf_counter()
+        while self._running and (ticks is None or executed < ticks):
+            commands = []
+            while len(commands) < self.max_batch and not queue.empty():
+                commands.append(queue.get_nowait())
+            if commands:
+                self._apply(commands, loop)
+            await loop.run_in_executor(self._executor, self.simulator.step)
+            executed += 1
+            self._broadcast()
+            next_deadline += self.tick_interval
+            delay = next_deadline - time.perf_counter()
+            if delay < 0:
+                next_deadline = time.perf_counter()
+            await asyncio.sleep(max(delay, 0.0))
+        self._running = False
+        return executed
+
+    def stop(self):
+        self._running = False
+
+    async def close(self):
+        """Stop ticking, close the listeners and every connection"""
+        self.stop()
+        for server in self._servers:
+            server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        self._executor.shutdown(wait=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        self.stats["connections"] += 1
+        queue = self._get_queue()
+        replies: Set[asyncio.Task] = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(_encode({"ok": False, "error": f"Request longer than {self.max_line} bytes"}))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError
+                except ValueError:
+                    writer.write(_encode({"ok": False, "error": "Request is not a JSON object"}))
+                    continue
+                op = message.get("op")
+                if op in ("spawn", "assign"):
+                    future = asyncio.get_running_loop().create_future()
+                    # Blocks, and so stops reading this socket, while the command queue is full
+                    await queue.put((op, message, future))
+                    self.stats["commands"] += 1
+                    reply = asyncio.create_task(self._reply_when_done(writer, message, future))
+                    replies.add(reply)
+                    reply.add_done_callback(replies.discard)
+                else:
+                    try:
+                        result = self._answer(op, message, writer)
+                        writer.write(_encode({"id": message.get("id"), "ok": True, **result}))
+                    except CommandError as e:
+                        writer.write(_encode({"id": message.get("id"), "ok": False, "error": str(e)}))
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            for reply in replies:
+                reply.cancel()
+            self._unsubscribe(writer)
+            self._connections.discard(task)
+            writer.close()
+
+    async def _reply_when_done(self, writer: asyncio.StreamWriter, message: Dict[str, Any], future: asyncio.Future):
+        try:
+            response = {"id": message.get("id"), "ok": True, **await future}
+        except CommandError as e:
+            response = {"id": message.get("id"), "ok": False, "error": str(e)}
+        try:
+            writer.write(_encode(response))
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def _answer(self, op: Any, message: Dict[str, Any], writer: asyncio.StreamWriter) -> Dict[str, Any]:
+        """Requests that are answered right away rather than queued for the next tick"""
+        if op == "ping":
+            return {}
+        if op == "status":
+            world = self.simulator.world
+            if "robot" not in message:
+                return {"tick": world.tick, "robots": _robot_fields(world, slice(None))}
+            robot_id = message["robot"]
+            row = world.rows.get(robot_id) if _is_index(robot_id) else None
+            if row is None:
+                raise CommandError(f"Unknown robot: {message['robot']}")
+            return {"tick": world.tick, "robots": _robot_fields(world, [row])}
+        if op == "subscribe":
+            if writer not in self._subscribers:
+                subscriber = _Subscriber(writer, self.subscriber_backlog)
+                subscriber.task = asyncio.create_task(subscriber.send_events())
+                self._subscribers[writer] = subscriber
+            return {}
+        if op == "unsubscribe":
+            self._unsubscribe(writer)
+            return {}
+        if op == "stats":
+            return {"tick": self.simulator.tick_count, "queued": self._get_queue().qsize(),
+                    "subscribers": len(self._subscribers), **self.stats}
+        raise CommandError(f"Unknown op: {op}")
+
+    def _unsubscribe(self, writer: asyncio.StreamWriter):
+        subscriber = self._subscribers.pop(writer, None)
+        if subscriber is not None and subscriber.task is not None:
+            subscriber.task.cancel()
+
+    def _apply(self, commands: List[Tuple[str, Dict[str, Any], asyncio.Future]], loop: asyncio.AbstractEventLoop):
+        """Carry out one tick's queued commands, planning all the destinations in one batch"""
+        simulator = self.simulator
+        destinations: Dict[int, Tuple[float, float]] = {}
+        waiting: Dict[int, asyncio.Future] = {}
+        for op, message, future in commands:
+            if future.cancelled():
+                continue
+            try:
+                if op == "spawn":
+                    robot = simulator.spawn_robot(self._vertex(message, "position"))
+                    future.set_result({"robot": robot.id})
+                    continue
+                robot_id = message.get("robot")
+                if not _is_index(robot_id) or robot_id not in simulator.robots:
+                    raise CommandError(f"Unknown robot: {robot_id}")
+                if "vertex" in message:
+                    vertex = simulator.nav_graph.get_vertex_by_index(simulator.current_level, self._vertex(message))
+                    destination = (vertex[0], vertex[1])
+                else:
+                    destination = _point(message.get("destination"), "destination")
+                previous = waiting.pop(robot_id, None)
+                if previous is not None:
+                    previous.set_exception(CommandError("Superseded by a later assign in the same tick"))
+                destinations[robot_id] = destination
+                waiting[robot_id] = future
+            except CommandError as e:
+                future.set_exception(e)
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(commands))
+
+        try:
+            plans = simulator.assign_destinations(destinations)
+        except Exception as e:
+            log_system_event("Warning", "Planning a batch of %d destinations failed: %s", len(destinations), e)
+            plans = {}
+            error = CommandError(f"Planning failed: {e}")
+        else:
+            error = CommandError("Robot could not be planned")
+        for robot_id, future in waiting.items():
+            plan = plans.get(robot_id)
+            if plan is not None:
+                plan.add_done_callback(lambda plan, future=future: loop.call_soon_threadsafe(_resolve_plan, future, plan))
+            elif not future.done():
+                future.set_exception(error)
+
+    def _vertex(self, message: Dict[str, Any], position_key: Optional[str] = None) -> int:
+        """The vertex a command names, or the one closest to its position"""
+        simulator = self.simulator
+        if position_key is not None and "vertex" not in message:
+            return simulator.find_closest_vertex(_point(message.get(position_key), position_key))
+        vertex = message.get("vertex")
+        count = simulator.nav_graph.get_vertex_count(simulator.current_level)
+        if not _is_index(vertex) or not 0 <= vertex < count:
+            raise CommandError(f"vertex must be an index below {count}")
+        return vertex
+
+    def _broadcast(self):
+        """Queue this tick's changed robots for every subscriber"""
+        changed = self.simulator.take_dirty_robots()
+        if not self._subscribers:
+            return
+        world = self.simulator.world
+        delta = full = None
+        for subscriber in self._subscribers.values():
+            if subscriber.resync:
+                if full is None:
+                    full = _encode({"event": "status", "tick": world.tick, "full": True,
+                                    "robots": _robot_fields(world, slice(None))})
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(full)
+                subscriber.resync = False
+                continue
+            if not changed:
+                continue
+            if delta is None:
+                rows = [world.rows[robot_id] for robot_id in changed if robot_id in world.rows]
+                delta = _encode({"event": "status", "tick": world.tick, "full": False,
+                                 "robots": _robot_fields(world, rows)})
+            try:
+                subscriber.queue.put_nowait(delta)
+            except asyncio.QueueFull:
+                subscriber.resync = True
+                self.stats["resyncs"] += 1
+
+def _resolve_plan(future: asyncio.Future, plan: Future):
+    if future.cancelled():
+        return
+    error = plan.exception()
+    if error is not None:
+        future.set_exception(CommandError(f"Planning failed: {error}"))
+        return
+    _, path_indices = plan.result()
+    if len(path_indices) > 1:
+        future.set_result({"path": list(path_indices)})
+    else:
+        future.set_exception(CommandError("No path to destination, or already there"))
@@ -0,0 +1,127 @@
+import argparse
+import random
+import time
+from src.controllers.sharded_simulator import ShardedSimulator
+from src.controllers.simulator import Simulator
+from src.utils.logger import set_sampling, setup_logging
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the fleet simulation without a display")
+    parser.add_argument("nav_graph_file", help="Navigation graph JSON file")
+    parser.add_argument("--robots", type=int, default=10, help="Number of robots to spawn")
+    parser.add_argument("--ticks", type=int, default=1000, help="Number of ticks to simulate")
+    parser.add_argument("--dt", type=float, default=0.05, help="Simulated seconds per tick")
+    parser.add_argument("--realtime", action="store_true", help="Pace ticks to wall-clock time")
+    parser.add_argument("--level", help="Level to simulate (defaults to the first level)")
+    parser.add_argument("--precompute-paths", action="store_true",
+                        help="Precompute and cache all-pairs paths for small levels")
+    parser.add_argument("--cooperative", action="store_true",
+                        help="Reserve routes in space and time (cooperative A*)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the scenario")
+    parser.add_argument("--journal", help="Record the run to this binary event journal")
+    parser.add_argument("--verify-replay", action="store_true",
+                        help="After the run, replay --journal and check it ends in the same fleet state")
+    parser.add_argument("--chargers", action="store_true",
+                        help="Drain batteries and send robots running low to the level's chargers")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Simulate every level, each in a worker process (--robots per level)")
+    parser.add_argument("--workers", type=int, help="Worker processes for --sharded (defaults to the CPU count)")
+    parser.add_argument("--sample-waypoints", type=int, metavar="N",
+                        help="Log only every N-th 'Reached waypoint' event")
+    args = parser.parse_args()
+    if args.sharded and (args.journal or args.cooperative or args.level or args.realtime or args.chargers):
+        parser.error("--sharded cannot be combined with --journal, --cooperative, --level, --realtime or --chargers")
+    if args.verify_replay and not args.journal:
+        parser.error("--verify-replay needs --journal")
+    return args
+
+def keep_busy(sim: Simulator, rng: random.Random, vertex_count: int):
+    """
+    Hand every idle robot a new random destination, leaving alone the ones
+    the charger scheduler has claimed or that are due for a charge
+    """
+    chargers = sim.chargers
+    for robot in sim.robots.values():
+        if robot.status != "idle":
+            continue
+        if chargers is not None and (chargers.claims(robot.id) or robot.battery < chargers.low_battery):
+            continue
+        target = sim.nav_graph.get_vertex_by_index(sim.current_level, rng.randrange(vertex_count))
+        sim.assign_destination(robot.id, (target[0], target[1]))
+
+def verify_replay(journal_file: str, fleet_manager) -> bool:
+    """Replay journal_file and check the fleet ends where fleet_manager, the recorded run, did"""
+    replayed, replayer = Simulator.replay(journal_file)
+    replayer.run(until_tick=fleet_manager.tick)
+    replayed.close()
+    return (replayed.fleet_manager.tick == fleet_manager.tick
+            and replayed.fleet_manager.fleet_state.get_state() == fleet_manager.fleet_state.get_state())
+
+def run_sharded(args):
+    rng = random.Random(args.seed)
+    sim = ShardedSimulator(args.nav_graph_file, workers=args.workers, dt=args.dt,
+                           max_robots_per_level=max(args.robots, 1))
+    vertex_counts = {level_name: sim.nav_graph.get_vertex_count(level_name) for level_name in sim.levels}
+    for level_name, vertex_count in vertex_counts.items():
+        sim.spawn_robots(level_name, [rng.randrange(vertex_count) for _ in range(args.robots)])
+
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        destinations = {}
+        for level_name, vertex_count in vertex_counts.items():
+            for robot_id in sim.idle_robots(level_name):
+                target = sim.nav_graph.get_vertex_by_index(level_name, rng.randrange(vertex_count))
+                destinations[robot_id] = (target[0], target[1])
+        if destinations:
+            sim.assign_destinations(destinations)
+        sim.step()
+    elapsed = time.perf_counter() - start
+    deadlocks = sim.get_deadlock_metrics()
+    sim.close()
+
+    print(f"Simulated {sim.tick_count} ticks ({sim.tick_count * sim.dt:.1f}s) on {len(sim.levels)} levels with "
+          f"{args.robots * len(sim.levels)} robots in {elapsed:.2f}s "
+          f"({sim.tick_count / max(elapsed, 1e-9):.0f} ticks/s)")
+    print(f"Deadlocks detected: {deadlocks['detected']}, resolved: {deadlocks['resolved']}")
+
+def main():
+    args = parse_args()
+    setup_logging()
+    if args.sample_waypoints:
+        set_sampling("Reached waypoint", args.sample_waypoints)
+    if args.sharded:
+        run_sharded(args)
+        return
+    rng = random.Random(args.seed)
+    sim = Simulator(args.nav_graph_file, dt=args.dt, realtime=args.realtime,
+                    precompute_paths=args.precompute_paths, cooperative=args.cooperative,
+                    journal_file=args.journal, level=args.level)
+    if args.chargers:
+        sim.enable_chargers()
+    vertex_count = sim.nav_graph.get_compiled(sim.current_level).num_vertices
+    for _ in range(args.robots):
+        sim.spawn_robot(rng.randrange(vertex_count))
+
+    # Keep every robot busy by handing idle ones a new random destination
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        keep_busy(sim, rng, vertex_count)
+        sim.run(ticks=1)
+    elapsed = time.perf_counter() - start
+    sim.close()
+
+    print(f"Simulated {sim.tick_count} ticks ({sim.sim_time:.1f}s) with {len(sim.robots)} robots "
+          f"in {elapsed:.2f}s ({sim.tick_count / max(elapsed, 1e-9):.0f} ticks/s)")
+    deadlocks = sim.traffic_manager.get_deadlock_metrics()
+    print(f"Deadlocks detected: {deadlocks['detected']}, resolved: {deadlocks['resolved']}")
+    if sim.chargers is not None:
+        stranded = sum(robot.status == "error" for robot in sim.robots.values())
+        print(f"Chargers: {sim.chargers.stats()}, robots stranded: {stranded}")
+    if args.verify_replay:
+        same = verify_replay(args.journal, sim.fleet_manager)
+        print("Replay matches the recorded run" if same else "Replay diverged from the recorded run")
+        if not same:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
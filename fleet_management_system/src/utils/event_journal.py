@@ -0,0 +1,285 @@
+import json
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from src.models.fleet_state import STATUS_NAMES
+
+MAGIC = b"FLTJ"
+VERSION = 2
+
+SPAWN = 1
+DESTINATION = 2
+LANE_RESERVED = 3
+LANE_RELEASED = 4
+WAIT = 5
+RESUME = 6
+ARRIVAL = 7
+SNAPSHOT = 8
+END = 9
+STATUS = 10
+BATTERY_RATES = 11
+
+EVENT_NAMES = {
+    SPAWN: "spawn",
+    DESTINATION: "destination",
+    LANE_RESERVED: "lane_reserved",
+    LANE_RELEASED: "lane_released",
+    WAIT: "wait",
+    RESUME: "resume",
+    ARRIVAL: "arrival",
+    SNAPSHOT: "snapshot",
+    END: "end",
+    STATUS: "status",
+    BATTERY_RATES: "battery_rates",
+}
+
+# Every record is a fixed header (type, tick, payload length) followed by the payload
+_RECORD = struct.Struct("<BII")
+_SPAWN = struct.Struct("<idd")
+_DESTINATION = struct.Struct("<iBddII")
+_LANE = struct.Struct("<iii")
+_ARRIVAL = struct.Struct("<ii")
+_STATUS = struct.Struct("<iBd")
+_BATTERY_RATES = struct.Struct("<dd")
+
+class JournalEvent(NamedTuple):
+    kind: int
+    tick: int
+    robot_id: Optional[int]
+    data: Tuple
+
+    @property
+    def name(self) -> str:
+        return EVENT_NAMES[self.kind]
+
+class SnapshotEntry(NamedTuple):
+    tick: int
+    offset: int
+    end_offset: int
+
+class EventJournal:
+    """Append-only binary journal of fleet events.
+
+    Records are length-prefixed structs. spawn, commanded destination, status
+    (set from outside the tick, e.g. charging) and battery rate events are
+    the inputs of a run; lane, wait, resume and arrival events are
+    what the fleet did with them. Every snapshot_interval ticks the full
+    FleetManager state is written as a compressed snapshot so readers can
+    seek without replaying from the start.
+    """
+
+    def __init__(self, path: str, header: Optional[Dict[str, Any]] = None, snapshot_interval: int = 500,
+                 buffer_size: int = 1 << 16):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.buffer_size = buffer_size
+        self.tick = 0
+        self._buffer = bytearray()
+        self._file = open(path, "wb")
+        header = dict(header or {}, version=VERSION, snapshot_interval=snapshot_interval, created=time.time())
+        encoded = json.dumps(header).encode()
+        self._file.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+
+    def _append(self, kind: int, payload: bytes):
+        self._buffer += _RECORD.pack(kind, self.tick, len(payload))
+        self._buffer += payload
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def record_spawn(self, robot_id: int, position: Tuple[float, float]):
+        self._append(SPAWN, _SPAWN.pack(robot_id, position[0], position[1]))
+
+    def record_destination(self, robot_id: int, destination: Tuple[float, float], path: List[Tuple[float, float]],
+                           path_indices: List[int], departure_ticks: Optional[List[int]], commanded: bool):
+        departure_ticks = departure_ticks or []
+        n = len(path_indices)
+        payload = _DESTINATION.pack(robot_id, commanded, destination[0], destination[1], n, len(departure_ticks))
+        payload += struct.pack(f"<{n}i{2 * n}d{len(departure_ticks)}i", *path_indices,
+                               *(c for point in path for c in point[:2]), *departure_ticks)
+        self._append(DESTINATION, payload)
+
+    def record_lane(self, kind: int, robot_id: int, lane: Tuple[int, int]):
+        self._append(kind, _LANE.pack(robot_id, lane[0], lane[1]))
+
+    def record_arrival(self, robot_id: int, vertex: int):
+        self._append(ARRIVAL, _ARRIVAL.pack(robot_id, vertex))
+
+    def record_status(self, robot_id: int, status: int, battery: float):
+        self._append(STATUS, _STATUS.pack(robot_id, status, battery))
+
+    def record_battery_rates(self, drain_per_unit: float, charge_per_second: float):
+        self._append(BATTERY_RATES, _BATTERY_RATES.pack(drain_per_unit, charge_per_second))
+
+    def record_snapshot(self, state: Dict[str, Any]):
+        self._append(SNAPSHOT, zlib.compress(json.dumps(state).encode()))
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._append(END, b"")
+        self.flush()
+        self._file.close()
+
+class JournalReader:
+    """Reads a journal written by EventJournal and indexes its snapshots"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        if self.data[:4] != MAGIC:
+            raise ValueError(f"{path} is not a fleet event journal")
+        (header_length,) = struct.unpack_from("<I", self.data, 4)
+        self.header: Dict[str, Any] = json.loads(self.data[8:8 + header_length])
+        # Version 2 only added event kinds, so version 1 journals still replay
+        if self.header.get("version") not in (1, VERSION):
+            raise ValueError(f"Unsupported journal version {self.header.get('version')}")
+        self.data_offset = 8 + header_length
+        self.snapshots: List[SnapshotEntry] = []
+        self.end_tick = 0
+        for kind, tick, offset, end in self._records(self.data_offset):
+            self.end_tick = tick
+            if kind == SNAPSHOT:
+                self.snapshots.append(SnapshotEntry(tick, offset, end))
+
+    def _records(self, offset: int) -> Iterator[Tuple[int, int, int, int]]:
+        """(kind, tick, payload offset, next record offset) of each record, stopping at a torn tail"""
+        data = self.data
+        while offset + _RECORD.size <= len(data):
+            kind, tick, length = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            offset = start + length
+            if offset > len(data):
+                return
+            yield kind, tick, start, offset
+
+    def events(self, offset: Optional[int] = None) -> Iterator[Tuple[JournalEvent, int]]:
+        """Decoded events with the offset of the record after each one; snapshots are skipped"""
+        for kind, tick, start, end in self._records(self.data_offset if offset is None else offset):
+            if kind != SNAPSHOT:
+                yield self._decode(kind, tick, start), end
+
+    def _decode(self, kind: int, tick: int, start: int) -> JournalEvent:
+        data = self.data
+        if kind == SPAWN:
+            robot_id, x, y = _SPAWN.unpack_from(data, start)
+            return JournalEvent(kind, tick, robot_id, ((x, y),))
+        if kind == DESTINATION:
+            robot_id, commanded, dx, dy, n, m = _DESTINATION.unpack_from(data, start)
+            values = struct.unpack_from(f"<{n}i{2 * n}d{m}i", data, start + _DESTINATION.size)
+            path_indices = list(values[:n])
+            coords = values[n:3 * n]
+            path = [(coords[2 * i], coords[2 * i + 1]) for i in range(n)]
+            departure_ticks = list(values[3 * n:]) or None
+            return JournalEvent(kind, tick, robot_id, ((dx, dy), path, path_indices, departure_ticks, bool(commanded)))
+        if kind in (LANE_RESERVED, LANE_RELEASED, WAIT, RESUME):
+            robot_id, a, b = _LANE.unpack_from(data, start)
+            return JournalEvent(kind, tick, robot_id, ((a, b),))
+        if kind == ARRIVAL:
+            robot_id, vertex = _ARRIVAL.unpack_from(data, start)
+            return JournalEvent(kind, tick, robot_id, (vertex,))
+        if kind == STATUS:
+            robot_id, status, battery = _STATUS.unpack_from(data, start)
+            return JournalEvent(kind, tick, robot_id, (status, battery))
+        if kind == BATTERY_RATES:
+            return JournalEvent(kind, tick, None, _BATTERY_RATES.unpack_from(data, start))
+        return JournalEvent(kind, tick, None, ())
+
+    def snapshot_before(self, tick: int) -> Optional[SnapshotEntry]:
+        """The latest snapshot taken at or before tick"""
+        best = None
+        for entry in self.snapshots:
+            if entry.tick > tick:
+                break
+            best = entry
+        return best
+
+    def read_snapshot(self, entry: SnapshotEntry) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(self.data[entry.offset:entry.end_offset]))
+
+class JournalReplayer:
+    """Drives a fresh FleetManager through a recorded run.
+
+    Only the inputs (spawns, commanded destinations, status changes and
+    battery rates) are applied; the
+    fleet reproduces everything else by stepping, so the replay is exact as
+    long as the FleetManager uses the same deadlock policy as the recording.
+    """
+
+    def __init__(self, reader: JournalReader, fleet_manager):
+        self.reader = reader
+        self.fleet_manager = fleet_manager
+        self.dt = reader.header.get("dt", 0.05)
+        self._initial_state = fleet_manager.get_state()
+        self._offset = reader.data_offset
+
+    @property
+    def tick(self) -> int:
+        return self.fleet_manager.tick
+
+    def seek(self, tick: int):
+        """Restore the fleet to the start of tick, from the nearest snapshot before it"""
+        entry = self.reader.snapshot_before(tick)
+        if entry is None:
+            self.fleet_manager.set_state(self._initial_state)
+            self._offset = self.reader.data_offset
+        else:
+            self.fleet_manager.set_state(self.reader.read_snapshot(entry))
+            self._offset = entry.end_offset
+        self.run(until_tick=tick)
+
+    def run(self, until_tick: Optional[int] = None, speed: Optional[float] = None) -> int:
+        """
+        Replay up to the start of until_tick (default: the end of the run).
+        With speed, ticks are paced to speed times the recorded real-time rate.
+        Returns the number of ticks stepped.
+        """
+        if until_tick is None:
+            until_tick = self.reader.end_tick
+        start_tick = self.tick
+        started = time.perf_counter()
+        for event, next_offset in self.reader.events(self._offset):
+            if event.tick >= until_tick:
+                break
+            self._offset = next_offset
+            if event.kind in (SPAWN, STATUS, BATTERY_RATES) or (event.kind == DESTINATION and event.data[4]):
+                self._step_to(event.tick, speed, start_tick, started)
+                self._apply(event)
+        self._step_to(until_tick, speed, start_tick, started)
+        return self.tick - start_tick
+
+    def _step_to(self, tick: int, speed: Optional[float], start_tick: int, started: float):
+        while self.tick < tick:
+            self.fleet_manager.update_robots()
+            if speed:
+                delay = started + (self.tick - start_tick) * self.dt / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _apply(self, event: JournalEvent):
+        fleet_manager = self.fleet_manager
+        if event.kind == SPAWN:
+            robot = fleet_manager.spawn_robot(event.data[0])
+            if robot.id != event.robot_id:
+                raise ValueError(f"Replay diverged: spawned robot {robot.id}, journal has {event.robot_id}")
+            return
+        if event.kind == STATUS:
+            status, battery = event.data
+            robot = fleet_manager.robots[event.robot_id]
+            robot.status = STATUS_NAMES[status]
+            robot.battery = battery
+            return
+        if event.kind == BATTERY_RATES:
+            fleet_manager.set_battery_rates(*event.data)
+            return
+        destination, path, path_indices, departure_ticks, _ = event.data
+        robot = fleet_manager.robots[event.robot_id]
+        robot.position = path[0]
+        robot.path = path
+        fleet_manager.assign_destination(event.robot_id, destination, path_indices, departure_ticks)
@@ -1,21 +1,232 @@
 import os
+import atexit
+import queue
+import threading
+import time
 import logging
-from datetime import datetime
+import logging.handlers
+from typing import Dict, List, Optional
 
-def setup_logging():
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_logger = logging.getLogger("fleet")
+_writer: Optional["BatchedLogWriter"] = None
+_events: Optional[queue.SimpleQueue] = None
+_max_queue_size = 100000
+# Every event is logged unless a category is opted in through set_sampling
+_sampling: Dict[str, int] = {}
+_rate_limits: Dict[str, float] = {}
+_sample_counters: Dict[str, int] = {}
+_rate_windows: Dict[str, List[float]] = {}
+_stats: Dict[str, int] = {"sampled_out": 0, "rate_limited": 0, "dropped": 0}
+
+class _EventMessage:
+    """Log message that is only formatted when the writer thread emits it"""
+
+    __slots__ = ("kind", "subject", "name", "details", "args")
+
+    def __init__(self, kind: str, subject, name: str, details: str, args: tuple):
+        self.kind = kind
+        self.subject = subject
+        self.name = name
+        self.details = details
+        self.args = args
+
+    def __str__(self) -> str:
+        details = self.details % self.args if self.args else self.details
+        if self.subject is None:
+            return f"{self.kind}: {self.name}. {details}"
+        return f"{self.kind} {self.subject}: {self.name}. {details}"
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues records unformatted and drops them when the
+    queue is full, so callers never block on or pay for formatting.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= _max_queue_size:
+            _stats["dropped"] += 1
+        else:
+            self.queue.put(record)
+
+class BatchedLogWriter:
+    """Background thread that drains a log queue and writes records in batches.
+
+    The queue holds LogRecords from LazyQueueHandler and the (created,
+    message) tuples that log_robot_action and log_system_event enqueue
+    directly. Stream handlers are written to directly and flushed once per
+    batch; any other handler gets its records through handle().
+    """
+
+    _sentinel = None
+
+    def __init__(self, log_queue: queue.SimpleQueue, handlers: List[logging.Handler],
+                 batch_size: int = 256, flush_interval: float = 0.25):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write out everything queued so far, stop the thread and close the handlers"""
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size and batch[-1] is not self._sentinel:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is self._sentinel
+            if stop:
+                batch.pop()
+            self._write([self._to_record(item) for item in batch])
+            if stop:
+                return
+
+    @staticmethod
+    def _to_record(item) -> logging.LogRecord:
+        if isinstance(item, logging.LogRecord):
+            return item
+        created, message = item
+        record = _logger.makeRecord(_logger.name, logging.INFO, "", 0, message, None, None)
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        return record
+
+    def _write(self, records: List[logging.LogRecord]):
+        for handler in self.handlers:
+            records_for_handler = [record for record in records if record.levelno >= handler.level]
+            if not records_for_handler:
+                continue
+            if isinstance(handler, logging.StreamHandler):
+                handler.acquire()
+                try:
+                    handler.stream.write("".join(
+                        handler.format(record) + handler.terminator for record in records_for_handler
+                    ))
+                    handler.flush()
+                except Exception:
+                    handler.handleError(records_for_handler[-1])
+                finally:
+                    handler.release()
+            else:
+                for record in records_for_handler:
+                    handler.handle(record)
+
+def setup_logging(asynchronous: bool = True, batch_size: int = 256, flush_interval: float = 0.25,
+                  max_queue_size: int = 100000):
+    """
+    Log to src/logs/fleet_logs.txt and the console. By default records are
+    handed to a background writer through a bounded queue, so logging from
+    the simulation loop costs only an enqueue. Calling it again replaces the
+    previous setup: its writer is flushed and stopped first.
+    """
+    global _writer, _events, _max_queue_size
+    shutdown_logging()
     os.makedirs(os.path.join(os.path.dirname(__file__), '..', 'logs'), exist_ok=True)
-    
+
     log_file = os.path.join(os.path.dirname(__file__), '..', 'logs', 'fleet_logs.txt')
-    
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler() 
-        ]
-    )
-def log_robot_action(robot_id: int, action: str, details: str = ""):
-    logging.info(f"Robot {robot_id}: {action}. {details}")
-def log_system_event(event: str, details: str = ""):
-    logging.info(f"System: {event}. {details}")
\ No newline at end of file
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    if not asynchronous:
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, handlers=handlers, force=True)
+        return
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    _max_queue_size = max_queue_size
+    _events = queue.SimpleQueue()
+    _writer = BatchedLogWriter(_events, handlers, batch_size, flush_interval)
+    _writer.start()
+    logging.basicConfig(level=logging.INFO, handlers=[LazyQueueHandler(_events)], force=True)
+    # Registered once however often logging is set up
+    atexit.unregister(shutdown_logging)
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush the background writer; safe to call more than once"""
+    global _writer, _events
+    _events = None
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+def set_sampling(category: str, every: int):
+    """Only log every n-th event of a category (an action or event name); 1 logs them all"""
+    if every <= 1:
+        _sampling.pop(category, None)
+    else:
+        _sampling[category] = every
+    _sample_counters.pop(category, None)
+
+def set_rate_limit(category: str, per_second: Optional[float]):
+    """Log at most per_second events of a category per second; None removes the limit"""
+    if per_second is None:
+        _rate_limits.pop(category, None)
+    else:
+        _rate_limits[category] = per_second
+    _rate_windows.pop(category, None)
+
+def get_logging_stats() -> Dict[str, int]:
+    """Events suppressed by sampling and rate limits, and dropped because the queue was full"""
+    return dict(_stats)
+
+def _admit(category: str) -> bool:
+    every = _sampling.get(category)
+    if every is not None:
+        count = _sample_counters.get(category, 0)
+        _sample_counters[category] = count + 1
+        if count % every:
+            _stats["sampled_out"] += 1
+            return False
+    limit = _rate_limits.get(category)
+    if limit is not None:
+        now = time.monotonic()
+        window = _rate_windows.setdefault(category, [now, 0])
+        if now - window[0] >= 1.0:
+            window[0], window[1] = now, 0
+        if window[1] >= limit:
+            _stats["rate_limited"] += 1
+            return False
+        window[1] += 1
+    return True
+
+def _log(message: _EventMessage):
+    events = _events
+    if events is None:
+        _logger.info(message)
+    elif events.qsize() >= _max_queue_size:
+        _stats["dropped"] += 1
+    else:
+        events.put((time.time(), message))
+
+def log_robot_action(robot_id: int, action: str, details: str = "", *args):
+    """Log a robot event. With args, details is a %-format string formatted by the writer"""
+    # The level check comes first, so a raised level costs neither sampling nor a queue slot
+    if _logger.isEnabledFor(logging.INFO) and _admit(action):
+        _log(_EventMessage("Robot", robot_id, action, details, args))
+
+def log_system_event(event: str, details: str = "", *args):
+    """Log a system event. With args, details is a %-format string formatted by the writer"""
+    if _logger.isEnabledFor(logging.INFO) and _admit(event):
+        _log(_EventMessage("System", None, event, details, args))
@@ -0,0 +1,37 @@
+import itertools
+import numpy as np
+import pytest
+from src.models.assignment import solve_assignment
+
+def _brute_force(cost: np.ndarray) -> float:
+    if cost.shape[0] > cost.shape[1]:
+        return _brute_force(cost.T)
+    rows = range(cost.shape[0])
+    return min(sum(cost[row, col] for row, col in zip(rows, cols))
+               for cols in itertools.permutations(range(cost.shape[1]), cost.shape[0]))
+
+def test_matches_brute_force_on_small_matrices():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        n, m = rng.integers(1, 7, 2)
+        # Small integer costs, so there are plenty of ties
+        cost = rng.integers(0, 20, (n, m)).astype(np.float64)
+        rows, cols = solve_assignment(cost)
+        assert len(rows) == min(n, m)
+        assert len(set(rows.tolist())) == len(rows) and len(set(cols.tolist())) == len(cols)
+        assert list(rows) == sorted(rows)
+        assert cost[rows, cols].sum() == pytest.approx(_brute_force(cost))
+
+def test_forbidden_pairs_are_never_assigned():
+    cost = np.array([[1.0, np.inf], [np.inf, np.inf], [2.0, 3.0]])
+    rows, cols = solve_assignment(cost)
+    assert np.isfinite(cost[rows, cols]).all()
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 0), (2, 1)]
+    rows, cols = solve_assignment(np.full((2, 2), np.inf))
+    assert len(rows) == len(cols) == 0
+
+def test_empty_and_invalid_input():
+    rows, cols = solve_assignment(np.zeros((0, 3)))
+    assert len(rows) == len(cols) == 0
+    with pytest.raises(ValueError):
+        solve_assignment(np.zeros(3))
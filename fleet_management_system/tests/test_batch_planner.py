@@ -0,0 +1,63 @@
+import json
+from concurrent.futures import wait
+import pytest
+from src.models.nav_graph import NavGraph
+
+def _ladder(n: int):
+    """Two rails of n vertices joined by a rung at every vertex"""
+    vertices = [[float(i), float(rail)] for rail in (0, 1) for i in range(n)]
+    lanes = [[i, i + 1] for rail in (0, n) for i in range(rail, rail + n - 1)]
+    lanes += [[i, i + n] for i in range(n)]
+    return {"vertices": vertices, "lanes": lanes}
+
+def _length(graph, path_indices) -> float:
+    return sum(graph.edge_length(a, b) for a, b in zip(path_indices, path_indices[1:]))
+
+def _nav_graph(tmp_path) -> NavGraph:
+    graph_file = tmp_path / "floors.json"
+    graph_file.write_text(json.dumps({"levels": {"ground": _ladder(12), "first": _ladder(8)}}))
+    nav_graph = NavGraph(str(graph_file), cache_dir=str(tmp_path / "cache"), path_cache_size=0)
+    nav_graph.batch_planner.max_workers = 1
+    return nav_graph
+
+def _plan(nav_graph: NavGraph, level_name: str, requests):
+    futures = nav_graph.find_paths(level_name, requests, parallel=True)
+    wait(futures)
+    graph = nav_graph.get_compiled(level_name)
+    for (start_idx, end_idx), future in zip(requests, futures):
+        _, path_indices = future.result()
+        _, expected = nav_graph.find_path(level_name, start_idx, end_idx)
+        assert path_indices[0] == start_idx and path_indices[-1] == end_idx
+        # Dijkstra and A* may break ties differently, and edge_length() fails on a removed lane
+        assert _length(graph, path_indices) == pytest.approx(_length(graph, expected))
+
+def test_pools_are_kept_per_level(tmp_path):
+    nav_graph = _nav_graph(tmp_path)
+    planner = nav_graph.batch_planner
+    try:
+        _plan(nav_graph, "ground", [(0, 23), (5, 12)])
+        ground_pool = planner._get_pool("ground")
+        _plan(nav_graph, "first", [(0, 15), (3, 9)])
+        first_pool = planner._get_pool("first")
+        _plan(nav_graph, "ground", [(1, 22)])
+        assert planner._get_pool("ground") is ground_pool
+
+        # An edit replaces only the edited level's pool, and its workers see the new lanes
+        assert nav_graph.remove_lane("ground", 0, 1)
+        _plan(nav_graph, "ground", [(0, 11)])
+        assert planner._get_pool("ground") is not ground_pool
+        assert planner._get_pool("first") is first_pool
+    finally:
+        planner.shutdown()
+
+def test_least_recently_used_pool_is_dropped(tmp_path):
+    nav_graph = _nav_graph(tmp_path)
+    planner = nav_graph.batch_planner
+    planner.max_pools = 1
+    try:
+        _plan(nav_graph, "ground", [(0, 23)])
+        _plan(nav_graph, "first", [(0, 15)])
+        assert list(planner._pools) == ["first"]
+    finally:
+        planner.shutdown()
+    assert not planner._pools
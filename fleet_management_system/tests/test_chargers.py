@@ -0,0 +1,38 @@
+import random
+from src.controllers.simulator import Simulator
+from src.simulate import keep_busy
+
+GRAPH = "data/nav_graph_1.json"
+
+def test_busy_fleet_recharges_instead_of_stranding():
+    sim = Simulator(GRAPH)
+    # Fast drain, so a full battery lasts about 2000 ticks of driving
+    chargers = sim.enable_chargers(low_battery=0.3, drain_per_unit=0.01, charge_per_second=0.2)
+    rng = random.Random(0)
+    vertex_count = sim.nav_graph.get_vertex_count(sim.current_level)
+    for _ in range(6):
+        sim.spawn_robot(rng.randrange(vertex_count))
+    slots = dict(zip(chargers.field.chargers.tolist(), chargers.field.slots.tolist()))
+    for _ in range(8000):
+        keep_busy(sim, rng, vertex_count)
+        sim.run(ticks=1)
+        charging = {}
+        for robot_id, booking in chargers.bookings.items():
+            charging[booking.charger] = charging.get(booking.charger, 0) + 1
+        assert all(count <= slots[charger] for charger, count in charging.items())
+    sim.close()
+
+    assert chargers.charges_completed >= len(sim.robots)
+    assert not [robot.id for robot in sim.robots.values() if robot.status == "error"]
+
+def test_trip_out_of_range_is_refused():
+    sim = Simulator(GRAPH)
+    chargers = sim.enable_chargers(drain_per_unit=0.01)
+    robot = sim.spawn_robot(chargers.field.chargers[0])
+    far = int(chargers.field.distance.argmax())
+    target = sim.nav_graph.get_vertex_by_index(sim.current_level, far)
+    robot.battery = 0.01
+    assert not sim.assign_destination(robot.id, (target[0], target[1]))
+    robot.battery = 1.0
+    assert sim.assign_destination(robot.id, (target[0], target[1]))
+    sim.close()
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import pytest
+from src.controllers.simulator import Simulator
+from src.server.control_client import ControlClient
+from src.server.control_server import CommandError, ControlServer
+
+GRAPH = "data/nav_graph_1.json"
+
+def _serve(scenario):
+    """Run scenario(server, client, simulator) against a server ticking as fast as it can"""
+    async def main():
+        simulator = Simulator(GRAPH)
+        server = ControlServer(simulator, tick_interval=0)
+        host, port = await server.start_tcp()
+        ticking = asyncio.create_task(server.run())
+        client = await ControlClient.connect_tcp(host, port)
+        try:
+            return await scenario(server, client, simulator)
+        finally:
+            await client.close()
+            server.stop()
+            await ticking
+            await server.close()
+            simulator.close()
+    return asyncio.run(main())
+
+def test_spawn_assign_and_status():
+    async def scenario(server, client, simulator):
+        robot_id = await client.spawn(vertex=2)
+        path = await client.assign(robot_id, vertex=9)
+        assert path[0] == 2 and path[-1] == 9
+        status = await client.status(robot_id)
+        assert [robot["id"] for robot in status["robots"]] == [robot_id]
+        for _ in range(1000):
+            if status["robots"][0]["status"] == "idle" and status["robots"][0]["path_index"] > 0:
+                break
+            await asyncio.sleep(0.01)
+            status = await client.status(robot_id)
+        target = simulator.nav_graph.get_vertex_by_index(simulator.current_level, 9)
+        assert status["robots"][0]["position"] == pytest.approx(target[:2])
+        assert (await client.status())["tick"] >= status["tick"]
+        assert (await client.request("ping"))["ok"]
+    _serve(scenario)
+
+def test_concurrent_commands_are_batched_into_ticks():
+    async def scenario(server, client, simulator):
+        vertex_count = simulator.nav_graph.get_vertex_count(simulator.current_level)
+        robot_ids = await asyncio.gather(*[client.spawn(vertex=i) for i in range(6)])
+        assert sorted(robot_ids) == list(range(1, 7))
+        paths = await asyncio.gather(*[client.assign(robot_id, vertex=(i + 5) % vertex_count)
+                                       for i, robot_id in enumerate(robot_ids)])
+        assert [path[-1] for path in paths] == [(i + 5) % vertex_count for i in range(6)]
+        stats = await client.request("stats")
+        assert stats["commands"] == 12 and stats["batches"] < 12
+    _serve(scenario)
+
+@pytest.mark.parametrize("op, fields, message", [
+    ("assign", {"robot": 99, "vertex": 0}, "Unknown robot"),
+    ("assign", {"robot": 1, "vertex": 10 ** 6}, "vertex must be an index"),
+    ("assign", {"robot": 1, "destination": "north"}, "destination must be"),
+    ("spawn", {"position": [1]}, "position must be"),
+    ("assign", {"robot": True, "vertex": 0}, "Unknown robot"),
+    ("assign", {"robot": 1, "vertex": False}, "vertex must be an index"),
+    ("spawn", {"vertex": True}, "vertex must be an index"),
+    ("status", {"robot": 99}, "Unknown robot"),
+    ("status", {"robot": True}, "Unknown robot"),
+    ("fly", {}, "Unknown op"),
+])
+def test_bad_requests_get_an_error_response(op, fields, message):
+    async def scenario(server, client, simulator):
+        await client.spawn(vertex=0)
+        with pytest.raises(CommandError, match=message):
+            await client.request(op, **fields)
+        # The connection stays usable
+        await client.request("ping")
+    _serve(scenario)
+
+def test_lines_that_are_not_json_objects_are_answered_with_errors():
+    async def scenario(server, client, simulator):
+        reader, writer = await asyncio.open_connection(*server._servers[0].sockets[0].getsockname()[:2])
+        responses = []
+        for line in (b"not json\n", b"[1, 2]\n", b"\n", b'{"op": "ping", "id": "x"}\n'):
+            writer.write(line)
+        await writer.drain()
+        for _ in range(3):
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        assert [response["ok"] for response in responses] == [False, False, True]
+        assert responses[2]["id"] == "x"
+    _serve(scenario)
+
+def test_subscribers_get_a_full_status_then_deltas():
+    async def scenario(server, client, simulator):
+        robot_ids = [await client.spawn(vertex=i) for i in range(3)]
+        await client.subscribe()
+        first = await client.next_event(5)
+        assert first["full"] and sorted(robot["id"] for robot in first["robots"]) == robot_ids
+        await client.assign(robot_ids[0], vertex=9)
+        while True:
+            event = await client.next_event(5)
+            if event["robots"]:
+                break
+        assert not event["full"]
+        assert [robot["id"] for robot in event["robots"]] == [robot_ids[0]]
+        assert event["tick"] > first["tick"]
+    _serve(scenario)
+
+@pytest.mark.parametrize("planner, message", [
+    (lambda destinations: 1 / 0, "Planning failed: division by zero"),
+    (lambda destinations: {}, "could not be planned"),
+])
+def test_every_assign_of_a_failed_batch_gets_an_answer(planner, message):
+    async def scenario(server, client, simulator):
+        robot_ids = await asyncio.gather(*[client.spawn(vertex=i) for i in range(3)])
+        simulator.assign_destinations = planner
+        results = await asyncio.wait_for(asyncio.gather(
+            *[client.assign(robot_id, vertex=9) for robot_id in robot_ids], return_exceptions=True), 5)
+        assert all(isinstance(result, CommandError) and message in str(result) for result in results)
+    _serve(scenario)
@@ -0,0 +1,72 @@
+import pytest
+from src.controllers.deadlock import BackOffPolicy, PreemptPolicy, ReplanYoungestPolicy
+from src.controllers.fleet_manager import FleetManager
+
+# A unit square 0-1-2-3 with a hub 4 in the middle wired to every corner
+VERTICES = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0), (0.5, 0.5)]
+# Each robot drives one side of the square, then wants the side its neighbour just drove
+ROUTES = [[0, 1, 2], [1, 2, 3], [2, 3, 0], [3, 0, 1]]
+
+def _send(fleet_manager: FleetManager, robot_id: int, path_indices):
+    path = [VERTICES[index] for index in path_indices]
+    fleet_manager.robots[robot_id].path = path
+    fleet_manager.assign_destination(robot_id, path[-1], list(path_indices))
+
+def _detour_via_hub(fleet_manager: FleetManager):
+    def replan(robot_id, blocked_lane):
+        robot = fleet_manager.robots[robot_id]
+        _send(fleet_manager, robot_id, [robot.path_indices[robot.current_path_index], 4, robot.path_indices[-1]])
+        return True
+    return replan
+
+def _check_consistent(fleet_manager: FleetManager):
+    traffic_manager = fleet_manager.traffic_manager
+    for robot in fleet_manager.robots.values():
+        assert (robot.status == "waiting") == (robot.id in traffic_manager.waiting_robots)
+    for robot_id, lane in traffic_manager.waiting_robots.items():
+        assert robot_id in traffic_manager.get_waiting_robots(lane)
+
+@pytest.mark.parametrize("make_policy", [
+    lambda fleet_manager: BackOffPolicy(),
+    lambda fleet_manager: PreemptPolicy(),
+    lambda fleet_manager: ReplanYoungestPolicy(_detour_via_hub(fleet_manager)),
+    lambda fleet_manager: ReplanYoungestPolicy(lambda robot_id, blocked_lane: False),
+], ids=["back_off", "preempt", "replan_youngest", "replan_falls_back"])
+def test_wait_cycle_is_detected_and_resolved(make_policy):
+    fleet_manager = FleetManager()
+    fleet_manager.deadlock_policy = make_policy(fleet_manager)
+    for route in ROUTES:
+        robot = fleet_manager.spawn_robot(VERTICES[route[0]])
+        _send(fleet_manager, robot.id, route)
+
+    traffic_manager = fleet_manager.traffic_manager
+    for _ in range(200):
+        fleet_manager.update_robots()
+        _check_consistent(fleet_manager)
+        if all(robot.status == "idle" for robot in fleet_manager.robots.values()):
+            break
+
+    # All four reach the end of their side together and each holds the lane the next one needs
+    assert traffic_manager.recent_deadlocks[0] == (4, 1, 2, 3)
+    assert traffic_manager.deadlocks_resolved == traffic_manager.deadlocks_detected
+    for robot, route in zip(fleet_manager.robots.values(), ROUTES):
+        assert robot.status == "idle"
+        assert robot.position == VERTICES[route[-1]]
+    assert not traffic_manager.reserved_lanes and not traffic_manager.waiting_robots
+
+def test_back_off_requeues_the_victim_behind_the_lane_it_released():
+    fleet_manager = FleetManager(BackOffPolicy())
+    for route in ROUTES:
+        robot = fleet_manager.spawn_robot(VERTICES[route[0]])
+        _send(fleet_manager, robot.id, route)
+    traffic_manager = fleet_manager.traffic_manager
+    while not traffic_manager.deadlocks_detected:
+        fleet_manager.update_robots()
+
+    # Robot 4 waited last, so it released lane 3-0 to robot 3 and still waits for 0-1
+    victim = fleet_manager.robots[4]
+    assert victim.status == "waiting"
+    assert traffic_manager.waiting_robots[4] == (0, 1)
+    assert 4 not in traffic_manager.robot_lanes
+    assert traffic_manager.get_lane_holder((3, 0)) == 3
+    assert fleet_manager.robots[3].status == "moving"
@@ -0,0 +1,52 @@
+import random
+from src.controllers.simulator import Simulator
+from src.simulate import verify_replay
+from src.utils.event_journal import JournalReader, SPAWN, DESTINATION
+
+GRAPH = "data/nav_graph_1.json"
+
+def _record(journal_file: str, ticks: int, seek_ticks=()):
+    sim = Simulator(GRAPH, journal_file=journal_file, snapshot_interval=100)
+    rng = random.Random(3)
+    vertex_count = sim.nav_graph.get_vertex_count(sim.current_level)
+    for _ in range(8):
+        sim.spawn_robot(rng.randrange(vertex_count))
+    states = {}
+    for _ in range(ticks):
+        # A seek lands at the start of a tick, before that tick's commands
+        if sim.fleet_manager.tick in seek_ticks:
+            states[sim.fleet_manager.tick] = sim.fleet_manager.fleet_state.get_state()
+        for robot in sim.robots.values():
+            if robot.status == "idle":
+                target = sim.nav_graph.get_vertex_by_index(sim.current_level, rng.randrange(vertex_count))
+                sim.assign_destination(robot.id, (target[0], target[1]))
+        sim.step()
+    sim.close()
+    return sim, states
+
+def test_replay_ends_where_the_recording_did(tmp_path):
+    journal_file = str(tmp_path / "run.fltj")
+    sim, _ = _record(journal_file, 1500)
+    reader = JournalReader(journal_file)
+    assert reader.end_tick == sim.fleet_manager.tick
+    kinds = {event.kind for event, _ in reader.events()}
+    assert {SPAWN, DESTINATION} <= kinds
+    assert verify_replay(journal_file, sim.fleet_manager)
+
+def test_seek_restores_the_recorded_state(tmp_path):
+    journal_file = str(tmp_path / "run.fltj")
+    _, states = _record(journal_file, 1500, seek_ticks=(1, 250, 999))
+    replayed, replayer = Simulator.replay(journal_file)
+    # Backwards too, which starts over from an earlier snapshot
+    for tick in (999, 250, 1):
+        replayer.seek(tick)
+        assert replayer.tick == tick
+        assert replayed.fleet_manager.fleet_state.get_state() == states[tick]
+    replayed.close()
+
+def test_replay_of_a_changed_run_does_not_match(tmp_path):
+    journal_file = str(tmp_path / "run.fltj")
+    sim, _ = _record(journal_file, 500)
+    robot = next(iter(sim.robots.values()))
+    robot.position = (robot.position[0] + 1.0, robot.position[1])
+    assert not verify_replay(journal_file, sim.fleet_manager)
@@ -0,0 +1,30 @@
+import numpy as np
+from src.models.fleet_state import FleetState, MOVING, CHARGING
+
+def _ticks_to_arrive(dt: float, speed: float, length: float) -> int:
+    state = FleetState(dt=dt)
+    row = state.add(0, (0.0, 0.0), speed)
+    state.status[row] = MOVING
+    state.start_segment(row, (0.0, 0.0), (length, 0.0))
+    ticks = 0
+    while state.on_segment[row]:
+        state.advance()
+        ticks += 1
+    return ticks
+
+def test_travel_time_does_not_depend_on_tick_size():
+    # 3 units at 1.5 units/s take 2 simulated seconds whatever dt is
+    for dt in (0.01, 0.05, 0.1, 0.25):
+        assert np.isclose(_ticks_to_arrive(dt, 1.5, 3.0) * dt, 2.0, atol=dt)
+
+def test_charging_rate_is_per_second():
+    charged = []
+    for dt in (0.01, 0.1):
+        state = FleetState(dt=dt, charge_per_second=0.1)
+        row = state.add(0, (0.0, 0.0), 1.0)
+        state.battery[row] = 0.5
+        state.status[row] = CHARGING
+        for _ in range(round(1.0 / dt)):
+            state.charge()
+        charged.append(state.battery[row])
+    assert np.allclose(charged, 0.6)
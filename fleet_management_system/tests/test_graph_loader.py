@@ -0,0 +1,112 @@
+import hashlib
+import io
+import json
+import os
+import numpy as np
+import pytest
+from src.models.graph_loader import GraphSchemaError, LevelArrays, cache_path_for, load_graph, parse_graph
+
+DOCUMENT = {
+    "building_name": "Depot",
+    "levels": {
+        "ground": {
+            "vertices": [[0, 0, {"name": "dock", "is_charger": True}], [1.5, 0], [1.5, -2.25, {"name": "end"}]],
+            "lanes": [[0, 1, {"speed_limit": 0.5}], [1, 2]],
+        },
+        "mezzanine": {"vertices": [[10, 10]], "lanes": []},
+    },
+}
+
+class _Trickle(io.RawIOBase):
+    """Hands out a few bytes per read, so every value of the document straddles reads"""
+
+    def __init__(self, data: bytes, size: int):
+        self._data = io.BytesIO(data)
+        self._size = size
+
+    def read(self, size: int = -1) -> bytes:
+        return self._data.read(min(size, self._size))
+
+def _assert_same_level(level: LevelArrays, expected: dict):
+    vertices, lanes = expected["vertices"], expected["lanes"]
+    assert level.coords.tolist() == [[float(v[0]), float(v[1])] for v in vertices]
+    assert level.lanes.tolist() == [lane[:2] for lane in lanes]
+    assert level.speed_limits.tolist() == [(lane[2].get("speed_limit", 0) if len(lane) > 2 else 0) for lane in lanes]
+    assert level.vertex_attrs == [v[2] if len(v) > 2 else None for v in vertices]
+    assert level.to_lists() == {"vertices": [[float(v[0]), float(v[1]), *v[2:]] for v in vertices], "lanes": lanes}
+
+@pytest.mark.parametrize("read_size", [1, 7, 1 << 20])
+def test_streaming_parse_matches_the_document(read_size):
+    data = json.dumps(DOCUMENT, indent=1).encode()
+    graph = parse_graph(_Trickle(data, read_size))
+    assert graph.building_name == "Depot"
+    assert graph.content_hash == hashlib.sha256(data).hexdigest()
+    assert list(graph.levels) == ["ground", "mezzanine"]
+    for name, level in graph.levels.items():
+        _assert_same_level(level, DOCUMENT["levels"][name])
+
+@pytest.mark.parametrize("document, message", [
+    (b"[]", "'levels' object"),
+    (b'{"building_name": "x"}', "'levels' object"),
+    (b'{"levels": {"a": {"vertices": [[0, 0]], "lanes": [[0, 1]]}}}', "references vertex 1"),
+    (b'{"levels": {"a": {"vertices": [[0, "x"]], "lanes": []}}}', "non-numeric"),
+    (b'{"levels": {"a": {"vertices": [[0, 0]], "lanes": [[0, true]]}}}', "references vertex True"),
+    (b'{"levels": {"a": {"vertices": [], "lanes": []}', "not valid JSON"),
+    (b'{"levels": {}} {}', "extra data"),
+])
+def test_malformed_documents_are_rejected(document, message):
+    with pytest.raises(GraphSchemaError, match=message):
+        parse_graph(io.BytesIO(document))
+
+def test_cache_is_written_once_and_mapped_after(tmp_path):
+    graph_file = tmp_path / "depot.json"
+    graph_file.write_text(json.dumps(DOCUMENT))
+    cache_dir = str(tmp_path / "cache")
+    parsed = load_graph(str(graph_file), cache_dir)
+    cache_path = cache_path_for(str(graph_file), cache_dir)
+    assert os.listdir(cache_dir) == [os.path.basename(cache_path)]
+
+    cached = load_graph(str(graph_file), cache_dir)
+    assert cached.content_hash == parsed.content_hash
+    for name, level in cached.levels.items():
+        # Read-only views of the mapped file rather than parsed copies
+        assert not level.coords.flags.writeable
+        assert np.array_equal(level.coords, parsed.levels[name].coords)
+        _assert_same_level(level, DOCUMENT["levels"][name])
+
+def test_edited_file_replaces_its_cache(tmp_path):
+    graph_file = tmp_path / "depot.json"
+    graph_file.write_text(json.dumps(DOCUMENT))
+    cache_dir = str(tmp_path / "cache")
+    load_graph(str(graph_file), cache_dir)
+
+    edited = json.loads(json.dumps(DOCUMENT))
+    edited["levels"]["ground"]["vertices"][1] = [2.5, 0]
+    graph_file.write_text(json.dumps(edited, indent=2))
+    graph = load_graph(str(graph_file), cache_dir)
+    assert graph.levels["ground"].coords[1].tolist() == [2.5, 0.0]
+    assert os.listdir(cache_dir) == [os.path.basename(cache_path_for(str(graph_file), cache_dir))]
+
+def test_caches_of_files_sharing_a_prefix_are_kept(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    names = ["site.json", "site.v2.json", "site-b.json"]
+    for name in names:
+        (tmp_path / name).write_text(json.dumps(DOCUMENT))
+        load_graph(str(tmp_path / name), cache_dir)
+    expected = {os.path.basename(cache_path_for(str(tmp_path / name), cache_dir)) for name in names}
+    assert set(os.listdir(cache_dir)) == expected
+    # Rewriting one of them only replaces its own cache
+    (tmp_path / "site.json").write_text(json.dumps(DOCUMENT, indent=2))
+    load_graph(str(tmp_path / "site.json"), cache_dir)
+    expected = {os.path.basename(cache_path_for(str(tmp_path / name), cache_dir)) for name in names}
+    assert set(os.listdir(cache_dir)) == expected
+
+def test_unreadable_cache_falls_back_to_the_json(tmp_path):
+    graph_file = tmp_path / "depot.json"
+    graph_file.write_text(json.dumps(DOCUMENT))
+    cache_dir = str(tmp_path / "cache")
+    load_graph(str(graph_file), cache_dir)
+    with open(cache_path_for(str(graph_file), cache_dir), "wb") as f:
+        f.write(b"not a cache")
+    graph = load_graph(str(graph_file), cache_dir)
+    _assert_same_level(graph.levels["ground"], DOCUMENT["levels"]["ground"])
@@ -0,0 +1,39 @@
+import atexit
+import logging
+import threading
+import pytest
+from src.utils import logger
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    logger.shutdown_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+def _writer_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "log-writer"]
+
+def test_setting_up_again_replaces_the_writer(restore_logging, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    monkeypatch.setattr(atexit, "unregister", lambda func: registered.remove(func) if func in registered else None)
+    before = len(_writer_threads())
+    for _ in range(3):
+        logger.setup_logging()
+    assert len(_writer_threads()) == before + 1
+    assert registered == [logger.shutdown_logging]
+    queue_handlers = [handler for handler in logging.getLogger().handlers
+                      if isinstance(handler, logger.LazyQueueHandler)]
+    assert len(queue_handlers) == 1 and queue_handlers[0].queue is logger._events
+    logger.shutdown_logging()
+    assert len(_writer_threads()) == before
+
+def test_sampling_is_opt_in(monkeypatch):
+    monkeypatch.setattr(logger, "_sampling", dict(logger._sampling))
+    monkeypatch.setattr(logger, "_sample_counters", {})
+    assert all(logger._admit("Reached waypoint") for _ in range(20))
+    logger.set_sampling("Reached waypoint", 10)
+    assert sum(logger._admit("Reached waypoint") for _ in range(20)) == 2
@@ -0,0 +1,54 @@
+import math
+import random
+import numpy as np
+import pytest
+from benchmarks.generators import generated_graph_file
+from src.models.nav_graph import NavGraph
+
+def _length(nav_graph: NavGraph, level_name: str, path_indices) -> float:
+    graph = nav_graph.get_compiled(level_name)
+    return sum(graph.edge_length(a, b) for a, b in zip(path_indices, path_indices[1:]))
+
+@pytest.mark.parametrize("kind", ["grid", "corridors", "rgg"])
+def test_astar_matches_path_table(tmp_path, kind):
+    graph_file = generated_graph_file(kind, 400, str(tmp_path), seed=1)
+    cache_dir = str(tmp_path / "cache")
+    astar = NavGraph(graph_file, cache_dir=cache_dir, path_cache_size=0)
+    tabled = NavGraph(graph_file, precompute_paths=True, cache_dir=cache_dir, path_cache_size=0)
+    level_name = astar.get_level_names()[0]
+    table = tabled.get_path_table(level_name)
+    assert table is not None
+
+    rng = random.Random(0)
+    n = astar.get_vertex_count(level_name)
+    for _ in range(300):
+        start, end = rng.randrange(n), rng.randrange(n)
+        _, astar_path = astar.find_path(level_name, start, end)
+        _, table_path = tabled.find_path(level_name, start, end)
+        if not math.isfinite(table.distance(start, end)):
+            assert astar_path == table_path == []
+            continue
+        for nav_graph, path in ((astar, astar_path), (tabled, table_path)):
+            assert path[0] == start and path[-1] == end
+            # Ties may pick different routes, but never a longer one
+            assert _length(nav_graph, level_name, path) == pytest.approx(table.distance(start, end))
+
+def test_path_table_is_reloaded_from_disk(tmp_path):
+    graph_file = generated_graph_file("grid", 100, str(tmp_path))
+    cache_dir = str(tmp_path / "cache")
+    first = NavGraph(graph_file, precompute_paths=True, cache_dir=cache_dir)
+    level_name = first.get_level_names()[0]
+    second = NavGraph(graph_file, precompute_paths=True, cache_dir=cache_dir)
+    assert np.array_equal(first.get_path_table(level_name).dist, second.get_path_table(level_name).dist)
+    assert np.array_equal(first.get_path_table(level_name).next_hop, second.get_path_table(level_name).next_hop)
+
+def test_avoided_lanes_are_not_used(tmp_path):
+    graph_file = generated_graph_file("grid", 100, str(tmp_path))
+    nav_graph = NavGraph(graph_file, precompute_paths=True, cache_dir=str(tmp_path / "cache"))
+    level_name = nav_graph.get_level_names()[0]
+    _, direct = nav_graph.find_path(level_name, 0, 99)
+    blocked = (direct[1], direct[0])
+    _, detour = nav_graph.find_path(level_name, 0, 99, avoid_lanes={blocked})
+    assert detour[0] == 0 and detour[-1] == 99
+    assert (0, direct[1]) not in set(zip(detour, detour[1:]))
+    assert _length(nav_graph, level_name, detour) == pytest.approx(_length(nav_graph, level_name, direct))
@@ -0,0 +1,49 @@
+from src.controllers.traffic_manager import TrafficManager
+
+def test_released_lane_goes_to_waiting_robots_in_fifo_order():
+    granted = []
+    traffic_manager = TrafficManager(on_lane_granted=lambda robot_id, lane: granted.append((robot_id, lane)))
+    assert traffic_manager.request_lane(1, (3, 4))
+    for robot_id in (2, 3, 4):
+        assert not traffic_manager.request_lane(robot_id, (4, 3))
+        traffic_manager.add_waiting_robot(robot_id, (4, 3))
+    assert traffic_manager.get_waiting_robots((3, 4)) == [2, 3, 4]
+
+    traffic_manager.release_lane((3, 4), 1)
+    assert granted == [(2, (4, 3))]
+    assert traffic_manager.get_lane_holder((3, 4)) == 2
+    assert traffic_manager.get_waiting_robots((3, 4)) == [3, 4]
+
+    traffic_manager.release_lane((4, 3), 2)
+    traffic_manager.release_lane((4, 3), 3)
+    assert [robot_id for robot_id, _ in granted] == [2, 3, 4]
+    traffic_manager.release_lane((3, 4), 4)
+    assert not traffic_manager.reserved_lanes and not traffic_manager.lane_queues
+
+def test_queued_robot_is_not_overtaken_by_a_newcomer():
+    traffic_manager = TrafficManager()
+    traffic_manager.request_lane(1, (0, 1))
+    traffic_manager.add_waiting_robot(2, (0, 1))
+    # Freed without a hand-over, e.g. restored from a snapshot mid-queue
+    del traffic_manager.reserved_lanes[(0, 1)]
+    assert not traffic_manager.request_lane(3, (0, 1))
+    assert traffic_manager.request_lane(2, (0, 1))
+    assert traffic_manager.get_waiting_robots((0, 1)) == []
+
+def test_cancelled_wait_skips_to_the_next_robot():
+    granted = []
+    traffic_manager = TrafficManager(on_lane_granted=lambda robot_id, lane: granted.append(robot_id))
+    traffic_manager.request_lane(1, (0, 1))
+    traffic_manager.add_waiting_robot(2, (0, 1))
+    traffic_manager.add_waiting_robot(3, (0, 1))
+    traffic_manager.cancel_wait(2)
+    traffic_manager.release_lane((0, 1), 1)
+    assert granted == [3]
+    assert 2 not in traffic_manager.waiting_robots
+
+def test_release_by_a_robot_that_lost_the_lane_is_ignored():
+    traffic_manager = TrafficManager()
+    traffic_manager.request_lane(1, (0, 1))
+    traffic_manager.preempt_lane((0, 1), 2)
+    traffic_manager.release_lane((0, 1), 1)
+    assert traffic_manager.get_lane_holder((0, 1)) == 2
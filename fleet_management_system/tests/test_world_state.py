@@ -0,0 +1,37 @@
+import math
+import random
+from src.controllers.simulator import Simulator
+
+def brute_force_nearest(world, position, max_distance):
+    best, best_dist = None, max_distance
+    for robot_id in world:
+        x, y = world.robot(robot_id).position
+        dist = math.hypot(x - position[0], y - position[1])
+        if dist <= best_dist:
+            best, best_dist = robot_id, dist
+    return best, best_dist
+
+def test_nearest_robot_follows_published_positions():
+    sim = Simulator("data/nav_graph_1.json")
+    rng = random.Random(4)
+    vertex_count = sim.nav_graph.get_vertex_count(sim.current_level)
+    for _ in range(10):
+        sim.spawn_robot(rng.randrange(vertex_count))
+    for tick in range(600):
+        for robot in sim.robots.values():
+            if robot.status == "idle":
+                target = sim.nav_graph.get_vertex_by_index(sim.current_level, rng.randrange(vertex_count))
+                sim.assign_destination(robot.id, (target[0], target[1]))
+        sim.step()
+        if tick % 50 == 0:
+            world = sim.world
+            for _ in range(20):
+                position = (rng.uniform(-5, 15), rng.uniform(-15, 5))
+                expected, expected_dist = brute_force_nearest(world, position, 3.0)
+                found = world.nearest_robot(position, 3.0)
+                if expected is None:
+                    assert found is None
+                else:
+                    x, y = world.robot(found).position
+                    assert math.isclose(math.hypot(x - position[0], y - position[1]), expected_dist)
+    sim.close()